@@ -388,4 +388,25 @@ def test_write_audioclip():
         assert ffmpegio.audio.read(fname)[1].shape == (44100, 1)
     finally:
         if fname:
-            os.remove(fname)
\ No newline at end of file
+            os.remove(fname)
+
+
+def test_write_audiofile_vectorized(tmp_path):
+    data = np.random.default_rng(0).uniform(-1, 1, (1000, 2)).astype(np.float32)
+    clip = AudioClip(duration=1, fps=1000)
+    clip.set_data(data)
+    clip.channels = 2
+    expected = np.array([clip.get_frame_at_t(t) for t in np.arange(0, 1, 1 / 1000)])
+    blocks = list(clip._iter_output_blocks(1000, block_size=300))
+    assert [len(block) for block in blocks] == [300, 300, 300, 100]
+    assert np.array_equal(np.concatenate(blocks), expected)
+
+    path = str(tmp_path / "vectorized.wav")
+    clip.write_audiofile(path, **{"c:a": "pcm_f32le"})
+    assert np.array_equal(ffmpegio.audio.read(path, sample_fmt="flt")[1], expected)
+
+    # an effect which replaced get_frame_at_t is still honoured
+    clip.get_frame_at_t = lambda t: np.full(2, 0.5, dtype=np.float32)
+    clip.write_audiofile(path)
+    assert np.all(ffmpegio.audio.read(path, sample_fmt="flt")[1] == 0.5)
+
@@ -1,12 +1,17 @@
 import tempfile
 import os
+import ffmpegio
 import numpy as np
 from vidiopy.audio.AudioClip import (
     SilenceClip,
     AudioFileClip,
     AudioArrayClip,
     AudioClip,
+    ConcatenateAudioClip,
     concatenate_audioclips,
+    composite_audioclips,
+    channel_mix_matrix,
+    SOFT_CLIP_KNEE,
 )
 
 
@@ -61,3 +66,218 @@ def test_AudioArrayClip_init():
     assert audio_clip._original_dur == duration
     assert audio_clip.channels == 2
     assert np.array_equal(audio_clip._audio_data, audio_data)
+
+
+def test_AudioFileClip_sub_clip_decodes_window():
+    path = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    path.close()
+    path = path.name
+    fps = 8000
+    data = (np.sin(np.arange(fps * 4) / 10) * 10000).astype(np.int16)[:, None]
+    AudioArrayClip(data, fps, 4.0).write_audiofile(path)
+
+    try:
+        clip = AudioFileClip(path)
+        sub = clip.sub_clip_copy(1.0, 2.5)
+        assert clip._samples is None and sub._samples is None
+        assert sub.duration == 1.5
+        sub.sub_clip(0.5, 1.0)
+        assert sub._window == (1.5, 0.5)
+        assert sub._samples is None
+
+        full = AudioFileClip(path)._audio_data
+        assert len(full) == len(data)
+        assert np.array_equal(sub._audio_data, full[int(1.5 * fps) : int(2.0 * fps)])
+    finally:
+        os.remove(path)
+
+
+def test_AudioFileClip_reads_blocks(tmp_path):
+    path = str(tmp_path / "blocks.wav")
+    fps = 8000
+    data = (np.sin(np.arange(fps * 4) / 10) * 10000).astype(np.int16)[:, None]
+    AudioArrayClip(data, fps, 4.0).write_audiofile(path)
+
+    data = ffmpegio.audio.read(path, sample_fmt="flt")[1]
+    clip = AudioFileClip(path)
+    times = np.arange(2.0, 2.5, 1 / fps)
+    expected = AudioFileClip(path).get_frames_at_t(times)
+    # backwards, forwards and overlapping blocks, without decoding the whole file
+    assert np.array_equal(clip.get_frames_at_t(times[2000:]), expected[2000:])
+    assert np.array_equal(clip.get_frames_at_t(times), expected)
+    assert np.array_equal(clip.get_frame_at_t(0.0), data[-1])
+    assert np.array_equal(clip._read_samples(100, 300), data[100:300])
+    assert clip._deferred
+
+    sub = AudioFileClip(path).sub_clip(1.0, 3.0)
+    assert np.array_equal(sub._read_samples(0, 8000), data[8000:16000])
+    assert sub._sample_count() == 2 * fps
+    assert sub._deferred
+
+
+def test_AudioFileClip_memmap(tmp_path, monkeypatch):
+    from vidiopy import config
+
+    monkeypatch.setattr(config, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    path = str(tmp_path / "mapped.wav")
+    fps = 8000
+    data = (np.sin(np.arange(fps * 2) / 10) * 10000).astype(np.int16)[:, None]
+    AudioArrayClip(data, fps, 2.0).write_audiofile(path)
+    data = ffmpegio.audio.read(path)[1]
+
+    first = AudioFileClip(path, memmap=True)
+    second = AudioFileClip(path, memmap=True).sub_clip(0.5, 1.5)
+    assert first._audio_data.dtype == np.float32
+    assert np.allclose(first._audio_data, data / 32768)
+    # both clips map the same scratch file
+    assert len(os.listdir(tmp_path / "scratch")) == 1
+    assert np.shares_memory(first._audio_data, second._audio_data)
+    assert np.array_equal(second._audio_data, first._audio_data[4000:12000])
+
+
+def test_AudioFileClip_counts_decoded_samples(tmp_path, monkeypatch):
+    from vidiopy import config
+
+    monkeypatch.setattr(config, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    path = str(tmp_path / "padded.mp3")
+    # the probed duration of an mp3 counts the padding of its last frame
+    ffmpegio.transcode([("sine=duration=3", {"f": "lavfi"})], path, overwrite=True)
+    decoded = len(ffmpegio.audio.read(path, sample_fmt="flt")[1])
+
+    deferred = AudioFileClip(path)
+    assert deferred._sample_count() == decoded
+    times = np.array([0.5, 1.0, 2.5, 2.99])
+    before = deferred.get_frames_at_t(times)
+    assert deferred._deferred
+    loaded = AudioFileClip(path)
+    assert len(loaded._audio_data) == decoded
+    assert np.array_equal(loaded.get_frames_at_t(times), before)
+    assert np.array_equal(loaded.get_frame_at_t(2.5), deferred.get_frame_at_t(2.5))
+    mapped = AudioFileClip(path, memmap=True)
+    assert np.array_equal(mapped.get_frames_at_t(times), before)
+
+    cut = AudioFileClip(path).sub_clip(2.0, AudioFileClip(path).duration)
+    assert cut._sample_count() == decoded - 2 * cut.fps == len(cut._audio_data)
+
+
+def test_channel_mix_matrix():
+    assert np.array_equal(channel_mix_matrix(2, 2), np.eye(2))
+    assert np.array_equal(channel_mix_matrix(1, 2), [[1.0], [1.0]])
+    assert np.array_equal(channel_mix_matrix(2, 1), [[0.5, 0.5]])
+    six_to_two = channel_mix_matrix(6, 2)
+    assert np.allclose(six_to_two.sum(axis=1), 1)
+    assert np.allclose(six_to_two[0], [1 / 3, 0, 1 / 3, 0, 1 / 3, 0])
+
+
+def test_composite_audioclips_places_and_mixes():
+    fps = 100
+    stereo = AudioArrayClip(np.full((200, 2), 0.25), fps, 2.0)
+    mono = AudioArrayClip(np.full((100, 1), 0.5), fps, 1.0)
+    mono.start, mono.end = 1.0, 2.0
+    mixed = composite_audioclips([stereo, mono], fps=fps, use_bg_audio=True)
+    assert isinstance(mixed, AudioArrayClip)
+    assert mixed._audio_data.shape == (200, 2)
+    assert np.allclose(mixed._audio_data[:100], 0.25)
+    assert np.allclose(mixed._audio_data[100:], 0.75)
+
+    loud = composite_audioclips(
+        [stereo, mono], fps=fps, use_bg_audio=True, gain=[1.0, 2.0], block_size=30
+    )
+    assert np.allclose(loud._audio_data[100:], 1.0)
+    unclipped = composite_audioclips(
+        [stereo, mono], fps=fps, use_bg_audio=True, gain=[1.0, 2.0], clipping=None
+    )
+    assert np.allclose(unclipped._audio_data[100:], 1.25)
+    soft = composite_audioclips(
+        [stereo, mono], fps=fps, use_bg_audio=True, gain=[1.0, 2.0], clipping="soft"
+    )
+    # the quiet samples are kept, the loud ones bend below full scale
+    assert np.array_equal(soft._audio_data[:100], np.full((100, 2), 0.25, np.float32))
+    headroom = 1 - SOFT_CLIP_KNEE
+    knee = SOFT_CLIP_KNEE + headroom * np.tanh((1.25 - SOFT_CLIP_KNEE) / headroom)
+    assert np.allclose(soft._audio_data[100:], knee) and knee < 1
+
+    # a clip between samples covers the samples at times in [start, end]
+    short = AudioArrayClip(np.full((100, 1), 0.5), fps, 1.0)
+    short.start, short.end = 0.505, 0.8
+    placed = composite_audioclips([stereo, short], fps=fps, use_bg_audio=True, block_size=7)
+    assert np.flatnonzero(placed._audio_data[:, 0] > 0.5).tolist() == list(range(51, 81))
+
+
+def test_concatenate_audioclips():
+    stereo = AudioArrayClip(np.arange(20, dtype=float).reshape(10, 2), 10, 1.0)
+    mono = AudioArrayClip(np.arange(10, dtype=float)[:, None] * 10, 5, 2.0)
+    result = concatenate_audioclips([stereo, mono], fps=10)
+    assert isinstance(result, AudioArrayClip)
+    assert result.duration == 3.0
+    assert result._audio_data.shape == (30, 2)
+    assert np.array_equal(result._audio_data[:10], stereo._audio_data)
+    # the mono clip is upmixed and resampled from 5 to 10 samples per second
+    assert np.allclose(result._audio_data[10::2, 0], np.arange(10) * 10, atol=1e-2)
+    assert np.array_equal(result._audio_data[10:, 0], result._audio_data[10:, 1])
+
+    lazy = concatenate_audioclips([stereo, mono], fps=10, lazy=True)
+    assert isinstance(lazy, ConcatenateAudioClip)
+    times = np.arange(0, 3, 1 / 10)
+    assert np.array_equal(lazy.get_frames_at_t(times), result._audio_data)
+    assert np.array_equal(lazy.get_frame_at_t(1.5), result._audio_data[15])
+    assert lazy._rendered is None
+    assert np.array_equal(lazy._audio_data, result._audio_data)
+
+
+
+def test_audio_sample_format(tmp_path, monkeypatch):
+    from vidiopy import config
+
+    silence = SilenceClip(60, 44100, 2)
+    assert silence._audio_data.shape == (60 * 44100, 2)
+    assert silence._audio_data.strides[0] == 0
+    assert silence._audio_data.dtype == np.float32
+
+    data = np.linspace(-1, 1, 1000)[:, None] * 0.5
+    clip = AudioArrayClip(data, 1000, 1.0)
+    assert clip._audio_data.dtype == np.float32
+    assert next(clip._iter_output_blocks(1000)).dtype == np.float32
+
+    monkeypatch.setattr(config, "AUDIO_SAMPLE_FORMAT", "int16")
+    clip = AudioArrayClip(data, 1000, 1.0)
+    assert clip._audio_data.dtype == np.int16
+    assert np.allclose(clip._audio_data / 32768, data, atol=1e-4)
+    mixed = composite_audioclips([clip, clip], fps=1000)
+    assert mixed._audio_data.dtype == np.int16
+    expected = np.array([clip.get_frame_at_t(t) for t in np.arange(0, 1, 1 / 1000)]) / 32768
+    assert np.allclose(mixed._audio_data / 32768, np.clip(2 * expected, -1, 1), atol=1e-4)
+
+    path = str(tmp_path / "int16.wav")
+    clip.write_audiofile(path)
+    assert AudioFileClip(path)._audio_data.dtype == np.int16
+    assert AudioFileClip(path).get_frames_at_t(np.array([0.5])).dtype == np.int16
+
+
+def test_gain_keeps_int16_scale(tmp_path, monkeypatch):
+    from vidiopy import config
+    from vidiopy.audio.fx import fadein, volumex
+
+    monkeypatch.setattr(config, "AUDIO_SAMPLE_FORMAT", "int16")
+    path = str(tmp_path / "gain.wav")
+    fps = 1000
+    data = (np.sin(np.arange(fps) / 10) * 0.5)[:, None]
+    AudioArrayClip(data, fps, 1.0).write_audiofile(path)
+    times = np.arange(0, 1, 1 / fps)
+    source = AudioFileClip(path).get_frames_at_t(times)
+    assert source.dtype == np.int16
+
+    clip = fadein(volumex(AudioFileClip(path), 0.5), 0.5)
+    expected = np.rint(source * 0.5 * np.minimum(times / 0.5, 1)[:, None])
+    block = next(clip._iter_output_blocks(fps, block_size=fps))
+    assert block.dtype == np.int16
+    assert np.abs(block.astype(int) - expected).max() <= 1
+
+    mixed = composite_audioclips([clip, volumex(AudioFileClip(path), 0.25)], fps=fps)
+    assert np.abs(mixed._audio_data.astype(int) - (expected + np.rint(source * 0.25))).max() <= 2
+
+    # integer arrays kept as they are in float32 mode are scaled on their own scale too
+    monkeypatch.setattr(config, "AUDIO_SAMPLE_FORMAT", "float32")
+    pcm = AudioArrayClip(np.full((fps, 1), 16384, dtype=np.int16), fps, 1.0)
+    block = next(volumex(pcm, 0.5)._iter_output_blocks(fps))
+    assert np.allclose(block, 0.25)
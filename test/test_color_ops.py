@@ -0,0 +1,69 @@
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps
+from vidiopy import ImageSequenceClip
+from vidiopy.video.color_ops import (
+    BrightnessOp,
+    ColorOpsNode,
+    ContrastOp,
+    FadeInOp,
+    GrayscaleOp,
+    InvertOp,
+    SaturationOp,
+    run_color_ops,
+)
+from vidiopy.video.fx import blackwhite, brightness, contrast, fadein, fadeout
+
+
+def random_frame(channels=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (12, 16, channels), dtype=np.uint8)
+
+
+def test_tables_match_pil_exactly():
+    frame = random_frame(4)
+    ops = (BrightnessOp(1.3), ContrastOp(0.7), BrightnessOp(0.9), ContrastOp(1.6))
+    result = run_color_ops(frame, ops)
+
+    image = Image.fromarray(frame)
+    image = ImageEnhance.Brightness(image).enhance(1.3)
+    image = ImageEnhance.Contrast(image).enhance(0.7)
+    image = ImageEnhance.Brightness(image).enhance(0.9)
+    image = ImageEnhance.Contrast(image).enhance(1.6)
+    assert np.array_equal(result, np.asarray(image))
+
+    inverted = run_color_ops(frame, (InvertOp(),))
+    assert np.array_equal(inverted, np.asarray(ImageOps.invert(Image.fromarray(frame).convert("RGB"))))
+    # the input frame is never written to
+    assert np.array_equal(frame, random_frame(4))
+
+
+def test_matrices_match_pil():
+    frame = random_frame()
+    result = run_color_ops(frame, (SaturationOp(0.4), InvertOp(), GrayscaleOp()))
+    image = ImageEnhance.Color(Image.fromarray(frame)).enhance(0.4)
+    image = ImageOps.grayscale(ImageOps.invert(image)).convert("RGB")
+    assert np.abs(result.astype(int) - np.asarray(image)).max() <= 1
+
+    grey = run_color_ops(random_frame(4), (GrayscaleOp(),))
+    assert grey.shape == (12, 16, 3)
+    assert np.array_equal(grey[..., 0], grey[..., 2])
+
+
+def test_fades_and_fusion():
+    frame = random_frame(4)
+    assert run_color_ops(frame, (FadeInOp(2, (0, 0, 0)),), t=3) is frame
+    half = run_color_ops(frame, (FadeInOp(2, (255, 255, 255)),), t=1)
+    assert np.array_equal(half[..., :3], (frame[..., :3] * 0.5 + 127.5).astype(np.uint8))
+    assert np.array_equal(half[..., 3], (frame[..., 3] * 0.5).astype(np.uint8))
+
+    clip = ImageSequenceClip(np.stack([random_frame(3, seed) for seed in range(4)]), fps=2)
+    fadeout(fadein(contrast(brightness(clip, 1.2), 0.8), 1), 1)
+    blackwhite(clip)
+    assert isinstance(clip.graph, ColorOpsNode)
+    assert len(clip.graph.ops) == 5
+    assert clip.graph.input.clip is clip
+    assert np.all(clip.make_frame_array(0) == 0)
+    frame = Image.fromarray(random_frame(3, 2))
+    frame = ImageEnhance.Contrast(ImageEnhance.Brightness(frame).enhance(1.2)).enhance(0.8)
+    expected = np.asarray(ImageOps.grayscale(frame).convert("RGB"))
+    assert np.abs(clip.make_frame_array(1.0).astype(int) - expected).max() <= 1
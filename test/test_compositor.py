@@ -0,0 +1,58 @@
+import copy
+import numpy as np
+from PIL import Image
+from vidiopy.video.compositor import FrameCompositor
+
+
+def test_opaque_layers_are_copied():
+    compositor = FrameCompositor((8, 6), channels=3)
+    compositor.start((10, 20, 30))
+    layer = np.full((4, 4, 4), 200, dtype=np.uint8)
+    layer[..., 3] = 255
+    compositor.paste(layer, (6, -2))
+    frame = compositor.result()
+    assert frame.shape == (6, 8, 3)
+    # only the part of the layer on the canvas is drawn
+    assert np.all(frame[:2, 6:] == 200)
+    assert np.all(frame[2:, :] == (10, 20, 30))
+    assert np.all(frame[:, :6] == (10, 20, 30))
+
+
+def test_translucent_layers_match_pil():
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    layer = rng.integers(0, 256, (10, 10, 4), dtype=np.uint8)
+
+    compositor = FrameCompositor((16, 16), channels=3)
+    compositor.start(background)
+    compositor.paste(layer, (3, 4))
+    expected = Image.fromarray(background)
+    expected.paste(Image.fromarray(layer), (3, 4), Image.fromarray(layer))
+    assert np.abs(compositor.result().astype(int) - np.asarray(expected)).max() <= 1
+
+
+def test_transparent_canvas_uses_over():
+    compositor = FrameCompositor((4, 4))
+    compositor.start((0, 0, 0, 0))
+    compositor.paste(np.full((4, 4, 4), (255, 0, 0, 128), dtype=np.uint8), (0, 0))
+    compositor.paste(np.full((2, 2, 4), (0, 0, 255, 128), dtype=np.uint8), (0, 0))
+    frame = compositor.result()
+    assert tuple(frame[3, 3]) == (255, 0, 0, 128)
+    expected = Image.new("RGBA", (4, 4))
+    expected.alpha_composite(Image.new("RGBA", (4, 4), (255, 0, 0, 128)))
+    expected.alpha_composite(Image.new("RGBA", (2, 2), (0, 0, 255, 128)))
+    assert np.abs(frame.astype(int) - np.asarray(expected)).max() <= 1
+
+
+def test_uint16_and_reused_canvas():
+    compositor = FrameCompositor((2, 2), channels=3, dtype=np.uint16)
+    compositor.start(np.zeros((2, 2, 3), dtype=np.uint16))
+    compositor.paste(np.full((2, 2, 4), (65535, 0, 0, 32768), dtype=np.uint16), (0, 0))
+    out = np.empty((2, 2, 3), dtype=np.uint16)
+    assert compositor.result(out) is out
+    assert tuple(out[0, 0]) == (32768, 0, 0)
+    # uint8 layers are scaled to the output type
+    compositor.start((0, 0, 0))
+    compositor.paste(np.full((1, 1, 3), 255, dtype=np.uint8), (1, 1))
+    assert tuple(compositor.result()[1, 1]) == (65535, 65535, 65535)
+    assert not np.shares_memory(copy.copy(compositor)._buffer, compositor._buffer)
@@ -0,0 +1,65 @@
+import copy
+import pickle
+import numpy as np
+from vidiopy import ColorClip, ImageSequenceClip, CompositeVideoClip
+from vidiopy.video.effect_graph import (
+    CompositeNode,
+    FrameOpNode,
+    FunctionNode,
+    SourceNode,
+    TimeRemapNode,
+)
+from vidiopy.video.color_ops import ColorOpsNode
+from vidiopy.video.fx import fadein, invert_colors, loop, resize
+
+
+def numbered_clip(n=4, fps=2):
+    frames = np.stack([np.full((4, 4, 3), 10 * i, dtype=np.uint8) for i in range(n)])
+    return ImageSequenceClip(frames, fps=fps)
+
+
+def test_effects_build_a_graph():
+    clip = numbered_clip()
+    assert isinstance(clip.graph, SourceNode) and clip.graph.clip is clip
+    resize(loop(invert_colors(clip), n=2), (2, 2))
+    nodes = list(clip.graph.walk())
+    assert [type(node) for node in nodes] == [
+        FrameOpNode,
+        TimeRemapNode,
+        ColorOpsNode,
+        SourceNode,
+    ]
+    # the loop maps the time with the duration of one pass, not of the looped clip
+    assert clip.duration == 4
+    assert nodes[1].func_t(2.75) == 0.75
+    assert np.all(clip.make_frame_array(0) == 255)
+    assert clip.make_frame_array(2.75).shape == (2, 2, 3)
+    assert np.array_equal(clip.make_frame_pil(2.75), clip.make_frame_array(2.75))
+    # the operations are module level functions, so they pickle
+    pickle.dumps((nodes[0].func, nodes[1].func_t, nodes[2].ops))
+
+
+def test_functions_set_by_hand_and_copies():
+    clip = numbered_clip()
+    clip.make_frame_array = lambda t: np.zeros((4, 4, 3), dtype=np.uint8)
+    assert isinstance(clip.graph, FunctionNode)
+    assert np.all(fadein(clip, 1).make_frame_array(0.5) == 0)
+
+    clip = fadein(numbered_clip(), 1)
+    copied = copy.copy(clip)
+    assert copied.graph.input.clip is copied
+    copied.clip = copied.clip[::-1].copy()
+    assert np.all(copied.make_frame_array(1.5) == 0)
+    assert np.all(clip.make_frame_array(1.5) == 30)
+
+
+def test_lazy_clips_add_nodes():
+    background = ColorClip((0, 0, 255), size=(4, 4), fps=2, duration=2)
+    layer = numbered_clip(n=2)
+    composite = CompositeVideoClip([background, invert_colors(layer)])
+    composite.fl_clip_transform(lambda frame, t: frame // 2)
+    top = composite.graph
+    assert isinstance(top, FrameOpNode) and top.timed
+    assert isinstance(top.input, CompositeNode)
+    assert top.input.inputs[1] is layer.graph
+    assert np.all(composite.make_frame_array(0.75)[..., :3] == 245 // 2)
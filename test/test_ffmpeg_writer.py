@@ -0,0 +1,101 @@
+import os
+import tempfile
+import pytest
+import numpy as np
+import ffmpegio
+from vidiopy.video.ffmpeg_writer import (
+    FFmpegVideoWriter,
+    concat_video_files,
+    supports_audio_pipe,
+)
+
+
+@pytest.fixture
+def out_file():
+    fil = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    yield fil
+    os.remove(fil)
+
+
+def test_write_frames(out_file: str):
+    frames = [np.full((16, 32, 3), i * 20, dtype=np.uint8) for i in range(10)]
+    with FFmpegVideoWriter(out_file, 10, {"crf": 0, "pix_fmt": "yuv444p"}, queue_size=2) as writer:
+        assert writer._queue.maxsize == 2
+        for frame in frames:
+            writer.write_frame(frame)
+    assert writer.frames_written == 10
+
+    fps, written = ffmpegio.video.read(out_file)
+    assert fps == 10
+    assert written.shape == (10, 16, 32, 3)
+    assert np.abs(written.astype(int) - np.stack(frames)).max() <= 2
+
+
+def test_write_gray_frames(out_file: str):
+    with FFmpegVideoWriter(out_file, 5) as writer:
+        for i in range(3):
+            writer.write_frame(np.full((8, 8), 100, dtype=np.uint8))
+    assert ffmpegio.video.read(out_file)[1].shape[:3] == (3, 8, 8)
+
+
+def test_shape_mismatch(out_file: str):
+    with pytest.raises(ValueError):
+        with FFmpegVideoWriter(out_file, 5) as writer:
+            writer.write_frame(np.zeros((8, 8, 3), dtype=np.uint8))
+            writer.write_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+    assert writer._proc is None
+
+
+def test_ffmpeg_error(out_file: str):
+    with pytest.raises(IOError):
+        with FFmpegVideoWriter(out_file, 5, {"c:v": "no-such-codec"}) as writer:
+            for _ in range(50):
+                writer.write_frame(np.zeros((8, 8, 3), dtype=np.uint8))
+
+
+def test_no_frames(out_file: str):
+    with pytest.raises(IOError):
+        FFmpegVideoWriter(out_file, 5).close()
+
+
+@pytest.mark.skipif(not supports_audio_pipe(), reason="needs fd passing")
+def test_write_audio(tmp_path):
+    out_file = str(tmp_path / "out.mkv")
+    samples = (np.sin(np.arange(8000) / 5) * 10000).astype(np.int16)[:, None]
+    blocks = (samples[i : i + 1000] for i in range(0, len(samples), 1000))
+    with FFmpegVideoWriter(
+        out_file, 10, {"c:a": "pcm_s16le"}, audio=blocks, audio_fps=8000
+    ) as writer:
+        for _ in range(10):
+            writer.write_frame(np.zeros((8, 8, 3), dtype=np.uint8))
+
+    assert len(ffmpegio.video.read(out_file)[1]) == 10
+    rate, audio = ffmpegio.audio.read(out_file)
+    assert rate == 8000
+    assert np.array_equal(audio, samples)
+
+
+def test_audio_needs_fps(out_file: str):
+    with pytest.raises(ValueError):
+        FFmpegVideoWriter(out_file, 5, audio=[np.zeros((10, 1))])
+
+
+def test_concat_video_files(tmp_path):
+    parts = []
+    for i in range(3):
+        part = str(tmp_path / f"part '{i}'.mp4")
+        with FFmpegVideoWriter(part, 10, {"crf": 0, "pix_fmt": "yuv444p"}) as writer:
+            for _ in range(4):
+                writer.write_frame(np.full((16, 16, 3), i * 60, dtype=np.uint8))
+        parts.append(part)
+    output = str(tmp_path / "joined.mp4")
+    concat_video_files(parts, output, audio=[np.zeros((44100, 1), np.int16)], audio_fps=44100)
+
+    frames = ffmpegio.video.read(output)[1]
+    assert len(frames) == 12
+    assert np.allclose([frame.mean() for frame in frames[::4]], [0, 60, 120], atol=2)
+    assert ffmpegio.probe.audio_streams_basic(output)[0]["channels"] == 1
+    assert sorted(os.listdir(tmp_path)) == sorted(["joined.mp4", *map(os.path.basename, parts)])
+
+    with pytest.raises(ValueError):
+        concat_video_files([], output)
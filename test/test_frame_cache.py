@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+import os
+import ffmpegio
+import tempfile
+from copy import copy
+from vidiopy import VideoFileClip, config
+from vidiopy.video.frame_cache import FrameCache, frame_cache
+
+
+def test_lru_eviction():
+    cache = FrameCache(max_bytes=300)
+    frames = [np.full(100, i, dtype=np.uint8) for i in range(4)]
+    for i, frame in enumerate(frames[:3]):
+        cache.put(("src", i, "gray", None), frame)
+    assert len(cache) == 3
+    assert cache.nbytes == 300
+
+    # Touch frame 0 so frame 1 is the least recently used one
+    assert cache.get(("src", 0, "gray", None)) is frames[0]
+    cache.put(("src", 3, "gray", None), frames[3])
+    assert ("src", 1, "gray", None) not in cache
+    assert ("src", 0, "gray", None) in cache
+    assert cache.nbytes == 300
+    assert cache.get(("src", 1, "gray", None)) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+        "frames": 3,
+        "nbytes": 300,
+        "max_bytes": 300,
+    }
+
+
+def test_frames_are_read_only():
+    cache = FrameCache(max_bytes=1000)
+    frame = cache.put(("src", 0, "gray", None), np.zeros(10, dtype=np.uint8))
+    with pytest.raises(ValueError):
+        frame[0] = 1
+
+
+def test_budget_from_config(monkeypatch):
+    cache = FrameCache()
+    monkeypatch.setattr(config, "FRAME_CACHE_MAX_BYTES", 50)
+    cache.put(("src", 0, "gray", None), np.zeros(100, dtype=np.uint8))
+    assert len(cache) == 0
+    monkeypatch.setattr(config, "FRAME_CACHE_MAX_BYTES", 0)
+    cache.put(("src", 0, "gray", None), np.zeros(1, dtype=np.uint8))
+    assert len(cache) == 0
+
+
+def test_max_bytes_setter_evicts():
+    cache = FrameCache(max_bytes=1000)
+    for i in range(5):
+        cache.put(("src", i, "gray", None), np.zeros(100, dtype=np.uint8))
+    cache.max_bytes = 200
+    assert len(cache) == 2
+    assert cache.evictions == 3
+
+
+def test_video_file_clips_share_frames():
+    fil = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    clip = np.asarray(
+        tuple(np.full((16, 16, 3), i * 20, dtype=np.uint8) for i in range(10)),
+        dtype=np.uint8,
+    )
+    ffmpegio.video.write(fil, 10, clip, overwrite=True)
+    try:
+        frame_cache.clear()
+        first = VideoFileClip(fil, audio=False)
+        frames = [first.make_frame_array(i / 10) for i in range(10)]
+
+        hits, misses = frame_cache.hits, frame_cache.misses
+        second = copy(first)
+        assert second._reader is not first._reader
+        for i in range(10):
+            assert second.make_frame_array(i / 10) is frames[i]
+        # The copy decoded nothing, every frame came from the shared cache
+        assert frame_cache.misses == misses
+        assert frame_cache.hits > hits
+        first.close()
+        second.close()
+    finally:
+        os.remove(fil)
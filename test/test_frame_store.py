@@ -0,0 +1,100 @@
+import gc
+import os
+import tempfile
+from copy import copy
+import pytest
+import numpy as np
+import ffmpegio
+from PIL import Image
+from vidiopy import VideoFileClip, ImageSequenceClip, ImageClip, config
+from vidiopy.video.frame_store import FrameStore, write_frame_store, open_frame_store
+from vidiopy.video.mixing_clip import composite_videoclips
+
+
+@pytest.fixture
+def scratch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRATCH_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_write_frame_store(scratch_dir):
+    frames = [np.full((4, 6, 3), i, dtype=np.uint8) for i in range(5)]
+    store = write_frame_store(iter(frames))
+    assert isinstance(store, FrameStore)
+    assert os.path.dirname(store.filename) == str(scratch_dir)
+    assert np.array_equal(store, np.stack(frames))
+    assert np.array_equal(store[1:3], np.stack(frames)[1:3])
+
+    # Another process can map the same file
+    other = open_frame_store(store.filename, store.shape)
+    assert np.array_equal(other, store)
+    del other
+
+    # The file lives as long as a view of the store does
+    path = store.filename
+    view = store[2:]
+    del store
+    gc.collect()
+    assert os.path.exists(path)
+    del view
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_write_frame_store_errors(scratch_dir):
+    with pytest.raises(ValueError):
+        write_frame_store([])
+    with pytest.raises(ValueError):
+        write_frame_store([np.zeros((2, 2)), np.zeros((3, 3))])
+    assert os.listdir(scratch_dir) == []
+
+
+def test_copy_stays_on_disk(scratch_dir):
+    store = write_frame_store(np.zeros((4, 4, 3), dtype=np.uint8) for _ in range(3))
+    copied = copy(store)
+    assert isinstance(copied, FrameStore)
+    assert copied.filename != store.filename
+    copied[0] = 1
+    assert store[0].max() == 0
+
+
+def test_video_file_clip_memmap(scratch_dir):
+    fil = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    frames = np.asarray(
+        tuple(np.full((16, 16, 3), i * 20, dtype=np.uint8) for i in range(10)),
+        dtype=np.uint8,
+    )
+    ffmpegio.video.write(fil, 10, frames, overwrite=True)
+    try:
+        eager = VideoFileClip(fil, audio=False, lazy=False)
+        mapped = VideoFileClip(fil, audio=False, lazy=False, memmap=True)
+        assert isinstance(mapped.clip, FrameStore)
+        assert np.array_equal(mapped.clip, eager.clip)
+
+        lazy = VideoFileClip(fil, audio=False, memmap=True)
+        lazy.sub_clip(0.2, 0.6)
+        eager.sub_clip(0.2, 0.6)
+        assert isinstance(lazy.clip, FrameStore)
+        assert np.array_equal(lazy.clip, eager.clip)
+    finally:
+        os.remove(fil)
+
+
+def test_image_sequence_clip_memmap(scratch_dir):
+    frames = np.stack([np.full((8, 8, 3), i, dtype=np.uint8) for i in range(4)])
+    # Stacked frames are used as they are
+    assert ImageSequenceClip(frames, fps=4).clip is frames
+
+    clip = ImageSequenceClip(tuple(frames), fps=4, memmap=True)
+    assert isinstance(clip.clip, FrameStore)
+    assert np.array_equal(clip.clip, frames)
+    assert np.array_equal(clip.make_frame_array(0.5), frames[2])
+
+
+def test_composite_videoclips_memmap(scratch_dir):
+    clip1 = ImageClip(Image.new("RGB", (20, 10), "red"), duration=1, fps=5)
+    clip2 = ImageClip(Image.new("RGB", (5, 5), "blue"), duration=1, fps=5)
+    result = composite_videoclips([clip1, clip2], audio=False)
+    mapped = composite_videoclips([clip1, clip2], audio=False, memmap=True)
+    assert isinstance(mapped.clip, FrameStore)
+    assert np.array_equal(mapped.clip, result.clip)
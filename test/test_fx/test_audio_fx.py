@@ -41,3 +41,54 @@ def test_audio_loop(base_audio):
     assert looped.duration == 10
     looped_dur = audio_loop(base_audio, duration=7)
     assert looped_dur.duration == 7
+
+@pytest.fixture
+def data_audio():
+    clip = AudioClip(duration=2, fps=1000)
+    clip.set_data(np.random.default_rng(1).uniform(-1, 1, (2000, 2)))
+    clip.channels = 2
+    return clip
+
+def test_fx_chain_blocks_match_frames(data_audio):
+    clip = fadeout(fadein(volumex(data_audio, 0.5), duration=0.5), duration=0.5)
+    clip.fl_time_transform(lambda t: t * 0.9)
+    times = np.arange(0, 2, 1 / 1000)
+    expected = np.array([clip.get_frame_at_t(t) for t in times])
+    assert np.allclose(clip.get_frames_at_t(times), expected)
+    # the whole chain runs on blocks, without a loop over get_frame_at_t
+    assert clip._frames_function() is clip._frames_at_times
+
+def test_time_transform_scalar_function(data_audio):
+    data_audio.fl_time_transform(lambda t: max(0.0, t - 0.5))
+    times = np.arange(0, 1, 1 / 1000)
+    expected = np.array([data_audio.get_frame_at_t(t) for t in times])
+    assert np.array_equal(data_audio.get_frames_at_t(times), expected)
+
+def test_replaced_frame_function_is_honoured(base_audio):
+    quiet = volumex(base_audio, 0.5)
+    assert np.all(quiet.get_frames_at_t(np.array([0.0, 1.0])) == 0.5)
+    quiet.get_frame_at_t = lambda t: np.zeros((2, 1024))
+    assert np.all(quiet.get_frames_at_t(np.array([0.0, 1.0])) == 0)
+
+def test_gain_effects_merge_into_one_envelope(data_audio):
+    clip = fadeout(fadein(volumex(data_audio, 0.5), duration=0.5), duration=0.5)
+    envelope = clip._gain_envelope[1]
+    assert len(envelope.factors) == 1
+    assert np.allclose(envelope(np.array([0.0, 0.25, 1.0, 1.75, 2.0])), [0, 0.25, 0.5, 0.25, 0])
+    times = np.arange(0, 2, 1 / 1000)
+    expected = clip._gain_envelope[3](times) * envelope(times)[:, None]
+    assert np.allclose(clip.get_frames_at_t(times), expected)
+
+def test_overlapping_fades_stay_exact(data_audio):
+    clip = fadeout(fadein(data_audio, duration=2), duration=2)
+    times = np.array([0.5, 1.0, 1.5])
+    assert len(clip._gain_envelope[1].factors) == 2
+    assert np.allclose(clip._gain_envelope[1](times), times / 2 * (2 - times) / 2)
+
+def test_gain_after_other_effect_wraps_it(data_audio):
+    clip = volumex(data_audio, 0.5).fl_time_transform(lambda t: t * 0.5)
+    copy = clip.copy()
+    volumex(clip, 0.5)
+    assert len(clip._gain_envelope[1].factors) == 1
+    times = np.array([0.5, 1.0])
+    assert np.allclose(clip.get_frames_at_t(times), copy.get_frames_at_t(times) * 0.5)
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
-from PIL import Image
-from vidiopy import ColorClip
+from PIL import Image, ImageOps
+from vidiopy import ColorClip, ImageSequenceClip
 from vidiopy.video.fx import (
     fadein, fadeout, speedx, time_mirror, loop, 
     resize, rotate, margin, invert_colors, blackwhite, mask_color
@@ -87,3 +87,26 @@ def test_blackwhite(base_clip):
     frame = bw.make_frame_array(0)
     # Grayscale RGB means R=G=B
     assert frame[0, 0, 0] == frame[0, 0, 1] == frame[0, 0, 2]
+
+def test_array_paths_match_pil():
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, (2, 6, 8, 4), dtype=np.uint8)
+    image = Image.fromarray(frames[0])
+
+    clip = margin(ImageSequenceClip(frames, fps=2), top=1, left=2, right=3, color=(9, 8, 7))
+    expected = ImageOps.expand(image, border=(2, 1, 3, 0), fill=(9, 8, 7))
+    assert np.array_equal(clip.make_frame_array(0), np.asarray(expected))
+
+    for angle, expand in ((90, True), (180, False), (30, True)):
+        clip = rotate(ImageSequenceClip(frames, fps=2), angle=angle, expand=expand)
+        expected = image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=expand)
+        assert np.array_equal(clip.make_frame_array(0), np.asarray(expected))
+        assert clip.size == expected.size
+
+    clip = mask_color(ImageSequenceClip(frames[..., :3], fps=2), color=tuple(frames[0, 0, 0, :3]))
+    frame = clip.make_frame_array(0)
+    assert frame[0, 0, 3] == 0 and np.all(frame[..., :3] == frames[0, ..., :3])
+    # the PIL frame of an RGBA array wraps it without a copy
+    image = clip.make_frame_pil(0)
+    assert image.mode == "RGBA" and image.readonly
+    assert np.array_equal(np.asarray(image), frame)
@@ -95,5 +95,25 @@ def test_fl_frame_transform(image_sequence_clip: ImageSequenceClip):
     assert all(Image.fromarray(frame).mode == "L" for frame in transformed_clip.clip)
 
 
+def test_lazy_image_files(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"image{i}.png"
+        Image.new("RGB", (20, 10), color=(i * 40, 0, 0)).save(path)
+        paths.append(str(path))
+
+    clip = ImageSequenceClip(tuple(paths), fps=4)
+    assert clip.lazy
+    assert clip._clip is None
+    assert clip.size == (20, 10)
+    assert clip.make_frame_array(0.5)[0, 0, 0] == 80
+    # Only the requested image is decoded
+    assert clip._clip is None
+
+    eager = ImageSequenceClip(tuple(paths), fps=4, lazy=False)
+    assert not eager.lazy
+    assert clip == eager
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
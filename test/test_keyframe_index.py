@@ -0,0 +1,73 @@
+import os
+import tempfile
+import ffmpegio
+import numpy as np
+import pytest
+from vidiopy import config
+from vidiopy.video.keyframe_index import KeyframeIndex
+
+
+@pytest.fixture
+def gop_file():
+    fil = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    clip = np.asarray(
+        tuple(np.full((32, 32, 3), i * 8, dtype=np.uint8) for i in range(30)),
+        dtype=np.uint8,
+    )
+    # a keyframe every 10 frames
+    ffmpegio.video.write(fil, 10, clip, overwrite=True, g=10, bf=0, sc_threshold=0)
+    yield fil
+    os.remove(fil)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(KeyframeIndex, "_loaded", {})
+    return tmp_path
+
+
+def test_build(gop_file: str):
+    index = KeyframeIndex.build(gop_file)
+    assert len(index) == 30
+    assert index.keyframes.tolist() == [0, 10, 20]
+    assert np.allclose(index.pts, np.arange(30) / 10)
+    assert index.keyframe_before(0) == 0
+    assert index.keyframe_before(15) == 10
+    assert index.keyframe_before(20) == 20
+    assert index.keyframe_after(15) == 20
+    assert index.keyframe_after(25) is None
+    assert index.time_of(12) == pytest.approx(1.2)
+
+
+def test_load_persists_sidecar(gop_file: str, cache_dir):
+    index = KeyframeIndex.load(gop_file)
+    sidecar = KeyframeIndex.cache_path(KeyframeIndex.cache_key(gop_file))
+    assert os.path.exists(sidecar)
+    assert KeyframeIndex.load(gop_file) is index
+
+    # a new process only reads the sidecar
+    KeyframeIndex._loaded.clear()
+    reloaded = KeyframeIndex.load(gop_file)
+    assert reloaded is not index
+    assert np.array_equal(reloaded.pts, index.pts)
+    assert np.array_equal(reloaded.keyframes, index.keyframes)
+
+
+def test_cache_key_changes_with_file(gop_file: str):
+    key = KeyframeIndex.cache_key(gop_file)
+    with open(gop_file, "ab") as f:
+        f.write(b"\0")
+    assert KeyframeIndex.cache_key(gop_file) != key
+
+
+def test_reader_seeks_with_index(gop_file: str, cache_dir):
+    from vidiopy import VideoFileClip
+
+    lazy = VideoFileClip(gop_file, audio=False)
+    eager = VideoFileClip(gop_file, audio=False, lazy=False)
+    for t in (2.5, 0.5, 1.7, 1.2, 0.0, 2.95, 1.05):
+        assert np.array_equal(lazy.make_frame_array(t), eager.make_frame_array(t))
+    assert lazy._reader.index is not None
+    assert lazy.keyframe_index is lazy._reader.index
+    lazy.close()
@@ -0,0 +1,31 @@
+import copy
+from vidiopy.video.layer_index import LayerIndex
+
+
+def test_active_layers_keep_stacking_order():
+    index = LayerIndex([(0, 10), (2, 3), (5, None), (2.5, 2.6), (9.5, 12)])
+    assert index.active(2.55) == [0, 1, 3]
+    assert index.active(3.0) == [0]
+    assert index.active(9.7) == [0, 2, 4]
+    assert index.active(11.0) == [2, 4]
+    assert index.active(-1.0) == []
+
+
+def test_matches_linear_scan():
+    intervals = [((i * 0.37) % 100, (i * 0.37) % 100 + 0.5 + i % 7) for i in range(5000)]
+    intervals[10] = (0.0, None)
+    intervals[20] = (1.0, 1e6)
+    index = LayerIndex(intervals)
+    for t in (0.0, 1.0, 13.37, 50.5, 99.9, 104.0):
+        expected = [
+            i for i, (start, end) in enumerate(intervals) if start <= t < (end or float("inf"))
+        ]
+        assert index.active(t) == expected
+
+
+def test_add_is_incremental():
+    index = LayerIndex([(0, 1)])
+    other = copy.copy(index)
+    assert index.add(0.5, 2) == 1
+    assert index.active(0.7) == [0, 1]
+    assert other.active(0.7) == [0]
@@ -129,3 +129,91 @@ def test_concatenate_videoclips():
     clips = [clip1, clip2]
     with pytest.raises(ValueError):
         concatenate_videoclips(clips, fps=30)
+
+
+def test_CompositeVideoClip(tmp_path):
+    import numpy as np
+    import ffmpegio
+    from vidiopy import CompositeVideoClip
+
+    background = ImageClip(Image.new("RGB", (40, 30), "red"), duration=2, fps=10)
+    square = ImageClip(Image.new("RGB", (10, 10), "blue"), duration=1, fps=10)
+    square.set_position(("center", "bottom"))
+    square.start, square.end = 0.5, 1.5
+    clips = [background, square]
+
+    lazy = composite_videoclips(clips, use_bg_clip=True, audio=False, lazy=True)
+    assert isinstance(lazy, CompositeVideoClip)
+    assert lazy.size == (40, 30) and lazy.duration == 2 and lazy.fps == 10
+    eager = composite_videoclips(clips, use_bg_clip=True, audio=False)
+    for t in (0.0, 0.6, 1.2, 1.9):
+        assert np.array_equal(lazy.make_frame_array(t), eager.make_frame_array(t))
+    frame = lazy.make_frame_array(1.0)
+    assert tuple(frame[25, 20]) == (0, 0, 255) and tuple(frame[5, 5]) == (255, 0, 0)
+
+    # a composite is a layer like any other
+    nested = CompositeVideoClip([lazy, square.copy().set_position((0, 0))], audio=False)
+    assert tuple(nested.make_frame_array(1.0)[25, 20]) == (0, 0, 255, 255)
+    assert tuple(nested.make_frame_array(1.0)[5, 5]) == (0, 0, 255, 255)
+    assert tuple(nested.make_frame_array(0.1)[5, 5]) == (255, 0, 0, 255)
+
+    cut = lazy.sub_clip_copy(0.5, 1.5).fl_frame_transform(lambda f: 255 - f)
+    assert cut.duration == 1.0 and lazy.duration == 2
+    assert tuple(cut.make_frame_array(0.0)[25, 20]) == (255, 255, 0)
+
+    path = str(tmp_path / "composite.mp4")
+    lazy.write_videofile(path, logger=None)
+    frames = ffmpegio.video.read(path)[1]
+    assert len(frames) == 20
+
+
+def test_CompositeVideoClip_add_clip():
+    import numpy as np
+    from vidiopy import CompositeVideoClip
+
+    background = ImageClip(Image.new("RGB", (20, 20), "red"), duration=4, fps=10)
+    composite = CompositeVideoClip([background], use_bg_clip=True, audio=False)
+    for i in range(40):
+        sticker = ImageClip(Image.new("RGB", (2, 2), "blue"), duration=0.1, fps=10)
+        sticker.set_position((i % 10 * 2, 0))
+        sticker.start, sticker.end = i * 0.1, i * 0.1 + 0.1
+        composite.add_clip(sticker)
+    assert len(composite.clips) == 40
+    frame = composite.make_frame_array(1.25)
+    assert tuple(frame[0, 4]) == (0, 0, 255)
+    assert tuple(frame[0, 6]) == (255, 0, 0)
+    assert np.array_equal(
+        composite.make_frame_array(3.95)[0, 18], (0, 0, 255)
+    )
+
+
+def test_ConcatenateVideoClip(tmp_path):
+    import numpy as np
+    import ffmpegio
+    from vidiopy import ConcatenateVideoClip
+    from vidiopy.audio.AudioClip import ConcatenateAudioClip
+
+    red = ImageClip(Image.new("RGB", (40, 30), "red"), duration=1, fps=10)
+    blue = ImageClip(Image.new("RGB", (20, 10), "blue"), duration=2, fps=10)
+    green = ImageClip(Image.new("RGB", (40, 30), "lime"), duration=0.5, fps=10)
+    clips = [red, blue, green]
+
+    for strategy in ("scale_same", "scale_up", "scale_down"):
+        lazy = concatenate_videoclips(clips, scaling_strategy=strategy, lazy=True)
+        assert isinstance(lazy, ConcatenateVideoClip)
+        assert lazy.duration == 3.5 and lazy.size == (40, 30)
+        eager = concatenate_videoclips(clips, scaling_strategy=strategy)
+        for t in (0.35, 1.55, 2.55, 3.45):
+            assert np.array_equal(lazy.make_frame_array(t), eager.make_frame_array(t))
+
+    lazy = concatenate_videoclips(clips, lazy=True)
+    assert lazy.clip_at(0.0) == (0, 0.0)
+    assert lazy.clip_at(1.5) == (1, 0.5)
+    assert lazy.clip_at(10.0)[0] == 2
+    assert isinstance(lazy.audio, ConcatenateAudioClip)
+    assert tuple(lazy.make_frame_array(1.5)[15, 20]) == (0, 0, 255)
+    assert tuple(lazy.make_frame_array(1.5)[0, 0]) == (0, 0, 0)
+
+    path = str(tmp_path / "concat.mp4")
+    lazy.write_videofile(path, logger=None)
+    assert len(ffmpegio.video.read(path)[1]) == 35
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from vidiopy.audio.AudioClip import AudioArrayClip
+from vidiopy.audio.resample import filter_bank, input_span, resample, resampled_length
+
+
+def tone(frequency, rate, seconds=1.0):
+    return np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate)
+
+
+@pytest.mark.parametrize("in_rate, out_rate", [(22050, 44100), (48000, 44100), (44100, 8000)])
+def test_resample_keeps_tone(in_rate, out_rate):
+    output = resample(tone(440, in_rate), in_rate, out_rate)
+    assert len(output) == resampled_length(in_rate, out_rate, in_rate) == out_rate
+    # away from the edges, where the input is padded with silence
+    assert np.allclose(output[500:-500], tone(440, out_rate)[500:-500], atol=1e-3)
+
+
+def test_resample_filters_aliases():
+    output = resample(tone(6000, 44100), 44100, 8000)
+    assert np.abs(output[100:-100]).max() < 1e-3
+
+
+def test_resample_blocks_match_whole():
+    samples = np.random.default_rng(0).uniform(-1, 1, (9000, 2))
+    whole = resample(samples, 48000, 44100)
+    first, last = input_span(48000, 44100, 3000, 5000)
+    block = resample(samples[first:last], 48000, 44100, np.arange(3000, 5000), offset=first)
+    assert np.allclose(block, whole[3000:5000])
+
+
+def test_filter_bank_is_cached():
+    up, down, bank = filter_bank(48000, 44100)
+    assert (up, down) == (147, 160)
+    assert bank.shape[0] == up
+    assert filter_bank(48000, 44100)[2] is bank
+    assert filter_bank(44100, 44100)[:2] == (1, 1)
+
+
+def test_iterate_frames_at_fps_upsamples():
+    clip = AudioArrayClip(tone(100, 22050)[:, None], 22050, 1.0)
+    frames = np.array(list(clip.iterate_frames_at_fps(44100)))
+    assert frames.shape == (44100, 1)
+    assert np.allclose(frames[500:-500, 0], tone(100, 44100)[500:-500], atol=1e-3)
+    # blocks of a clip at another rate, like the ones written or muxed
+    blocks = np.concatenate(list(clip._iter_output_blocks(44100, block_size=10000)))
+    assert np.allclose(blocks, frames)
@@ -6,6 +6,7 @@ from fractions import Fraction
 from PIL import Image
 import numpy as np
 from vidiopy import VideoClip, SilenceClip, AudioClip
+from vidiopy import config
 
 
 @pytest.fixture
@@ -364,6 +365,39 @@ def test_write_videofile_audio(vid_clip: VideoClip):
             os.remove(pth)
 
 
+def test_write_videofile_audio_two_pass(vid_clip: VideoClip, tmp_path):
+    vid_clip.set_end(1)
+    vid_clip.set_fps(5)
+    vid_clip.make_frame_array = lambda t: np.zeros((100, 100, 3), dtype=np.uint8)
+    vid_clip.audio = SilenceClip(vid_clip.end, 44100, 2)
+    single = str(tmp_path / "single.mp4")
+    two_pass = str(tmp_path / "two_pass.mp4")
+    vid_clip.write_videofile(single, audio=True)
+    vid_clip.write_videofile(two_pass, audio=True, single_pass=False)
+    for pth in (single, two_pass):
+        assert len(ffmpegio.video.read(pth)[1]) == 5
+        assert ffmpegio.probe.audio_streams_basic(pth)[0]["channels"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["single.mp4", "two_pass.mp4"]
+
+
+def test_write_videofile_workers(vid_clip: VideoClip, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    vid_clip.set_end(2)
+    vid_clip.set_fps(10)
+    vid_clip.make_frame_array = lambda t: np.full((64, 64, 3), int(t * 100), dtype=np.uint8)
+    vid_clip.audio = SilenceClip(vid_clip.end, 44100, 2)
+    sequential = str(tmp_path / "sequential.mp4")
+    parallel = str(tmp_path / "parallel.mp4")
+    vid_clip.write_videofile(sequential, audio=False, ffmpeg_params={"g": 5})
+    vid_clip.write_videofile(parallel, ffmpeg_params={"g": 5}, workers=3)
+    expected = ffmpegio.video.read(sequential)[1]
+    frames = ffmpegio.video.read(parallel)[1]
+    assert len(frames) == 20
+    assert np.abs(frames.astype(int) - expected.astype(int)).max() <= 2
+    assert ffmpegio.probe.audio_streams_basic(parallel)[0]["channels"] == 2
+    assert os.listdir(tmp_path / "scratch") == []
+
+
 def test_write_gif(vid_clip: VideoClip, tmp_path):
     vid_clip.fps = 10
     vid_clip.duration = 1
@@ -6,6 +6,8 @@ import os
 import ffmpegio
 import tempfile
 from vidiopy import VideoFileClip, AudioClip
+from vidiopy.video.ffmpeg_reader import FFmpegVideoReader
+from vidiopy.video.keyframe_index import KeyframeIndex
 
 
 @pytest.fixture
@@ -34,6 +36,21 @@ def file_clip():
     os.remove(fil)
 
 
+@pytest.fixture
+def varying_file():
+    fil = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    # 20 frames which all look different, so a wrong frame index is noticed
+    clip = np.asarray(
+        tuple(
+            np.full((32, 32, 3), i * 12, dtype=np.uint8) for i in range(20)
+        ),
+        dtype=np.uint8,
+    )
+    ffmpegio.video.write(fil, 10, clip, overwrite=True)
+    yield fil
+    os.remove(fil)
+
+
 def test_init_no_audio(file_clip_no_audio: VideoFileClip):
     # Assert the attributes are set correctly
     assert file_clip_no_audio.filename
@@ -211,5 +228,292 @@ def test_make_frame_pil(file_clip: VideoFileClip):
         file_clip.make_frame_pil(t)
 
 
+def test_lazy_does_not_decode(varying_file: str):
+    clip = VideoFileClip(varying_file, audio=False)
+    assert clip.lazy
+    assert clip._clip is None
+    assert clip._frame_count == 20
+    assert clip.duration == 2
+    clip.make_frame_array(1.0)
+    assert clip._clip is None
+    clip.close()
+
+
+def test_lazy_matches_eager(varying_file: str):
+    lazy = VideoFileClip(varying_file, audio=False, buffer_size=3)
+    eager = VideoFileClip(varying_file, audio=False, lazy=False)
+    assert not eager.lazy
+    # random access, going backwards and forwards
+    for t in (0, 1.5, 0.3, 1.9, 1.95, 0.1, 1.0, 0.0):
+        assert np.array_equal(lazy.make_frame_array(t), eager.make_frame_array(t))
+        assert len(lazy._reader._buffer) <= 3
+    for a, b in zip(lazy.iterate_frames_array_t(10), eager.iterate_frames_array_t(10)):
+        assert np.array_equal(a, b)
+    assert lazy.make_frame_pil(0.5) == eager.make_frame_pil(0.5)
+    assert np.array_equal(lazy.clip, eager.clip)
+    lazy.close()
+
+
+def test_reader_past_end(varying_file: str, monkeypatch):
+    reader = FFmpegVideoReader(varying_file, 10, (32, 32), buffer_size=2, cache=None)
+    opened = []
+    open_ = FFmpegVideoReader._open
+    monkeypatch.setattr(FFmpegVideoReader, "_open", lambda self, index: opened.append(index) or open_(self, index))
+    last = reader.get_frame(19)
+    for index in range(20, 40):
+        assert np.array_equal(reader.get_frame(index), last)
+    assert reader._eof == 20
+    # reading on past the end, with the last frame evicted, needs no new ffmpeg process
+    reader.get_frame(0)
+    reader.get_frame(1)
+    count = len(opened)
+    for index in range(20, 40):
+        assert np.array_equal(reader.get_frame(index), last)
+    assert len(opened) <= count + 1
+    for index in range(20, 40):
+        reader.get_frame(index)
+    assert len(opened) <= count + 1
+    reader.close()
+
+
+def test_lazy_with_ffmpeg_options(varying_file: str):
+    # the options change the rate and size the probe reports
+    slower = VideoFileClip(varying_file, audio=False, ffmpeg_options={"r": 5})
+    assert slower.fps == 5
+    assert not slower.lazy
+    assert slower._frame_window == (0, len(slower.clip))
+    assert slower.make_frame_array(1.9).shape == (32, 32, 3)
+    smaller = VideoFileClip(varying_file, audio=False, ffmpeg_options={"vf": "scale=16:8"})
+    assert smaller.size == (16, 8)
+    assert smaller.make_frame_array(1.0).shape == (8, 16, 3)
+
+
+def test_lazy_sub_clip(varying_file: str):
+    lazy = VideoFileClip(varying_file, audio=False)
+    eager = VideoFileClip(varying_file, audio=False, lazy=False)
+    sub = lazy.sub_clip_copy(0.5, 1.5)
+    sub_eager = eager.sub_clip_copy(0.5, 1.5)
+    assert sub._clip is None
+    assert sub._frame_count == len(sub_eager.clip)
+    for t in (0, 0.35, 0.9):
+        assert np.array_equal(sub.make_frame_array(t), sub_eager.make_frame_array(t))
+    assert sub == sub_eager
+    lazy.sub_clip(0.5, 1.5)
+    assert lazy == sub
+    lazy.close()
+    sub.close()
+
+
+def test_sub_clip_decodes_range(varying_file: str, monkeypatch):
+    eager = VideoFileClip(varying_file, audio=False, lazy=False)
+    lazy = VideoFileClip(varying_file, audio=False)
+    lazy.sub_clip(0.7, 1.3)
+    eager.sub_clip(0.7, 1.3)
+
+    calls = []
+    read = ffmpegio.video.read
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(ffmpegio.video, "read", spy)
+    assert np.array_equal(lazy.clip, eager.clip)
+    assert len(calls) == 1
+    assert calls[0]["vframes"] == len(eager.clip)
+    assert calls[0]["ss_in"] > 0
+    lazy.close()
+
+
+@pytest.fixture
+def keyframed_file(tmp_path):
+    fil = str(tmp_path / "keyframed.mp4")
+    clip = np.asarray(
+        tuple(np.full((32, 32, 3), i * 8, dtype=np.uint8) for i in range(30)),
+        dtype=np.uint8,
+    )
+    ffmpegio.video.write(fil, 10, clip, overwrite=True, g=5, sc_threshold=0)
+    return fil
+
+
+def no_decode(*args, **kwargs):
+    raise AssertionError("the stream copy decoded a frame")
+
+
+def test_write_stream_copy(keyframed_file: str, tmp_path, monkeypatch):
+    source = ffmpegio.video.read(keyframed_file)[1]
+    keyframes = KeyframeIndex.load(keyframed_file).keyframes
+    assert 10 in keyframes
+    clip = VideoFileClip(keyframed_file, audio=False)
+    monkeypatch.setattr(FFmpegVideoReader, "get_frame", no_decode)
+    monkeypatch.setattr(VideoFileClip, "_import_video_clip", no_decode)
+
+    out = str(tmp_path / "copy.mp4")
+    clip.write_videofile(out)
+    assert np.array_equal(ffmpegio.video.read(out)[1], source)
+
+    clip.sub_clip(1.0, 2.5)
+    clip.write_videofile(out)
+    assert np.array_equal(ffmpegio.video.read(out)[1], source[10:25])
+
+
+def test_write_smart_cut(keyframed_file: str, tmp_path):
+    source = ffmpegio.video.read(keyframed_file)[1]
+    clip = VideoFileClip(keyframed_file, audio=False).sub_clip(1.2, 2.5)
+    out = str(tmp_path / "smart.mp4")
+    start, end = clip._frame_window
+    assert start % 5
+    clip.write_videofile(out, smart_cut=True)
+    frames = ffmpegio.video.read(out)[1]
+    assert len(frames) == end - start
+    assert np.abs(frames.astype(int) - source[start:end]).max() <= 3
+
+
+def test_write_changed_frames_reencodes(keyframed_file: str, tmp_path):
+    clip = VideoFileClip(keyframed_file, audio=False)
+    assert clip._write_stream_copy(str(tmp_path / "copy.mp4"), None)
+    clip.make_frame_array = lambda t: np.zeros((32, 32, 3), dtype=np.uint8)
+    assert not clip._write_stream_copy(str(tmp_path / "copy.mp4"), None)
+    out = str(tmp_path / "changed.mp4")
+    clip.write_videofile(out)
+    assert ffmpegio.video.read(out)[1].max() <= 3
+    # a cut which does not start on a keyframe is re-encoded without smart_cut
+    clip = VideoFileClip(keyframed_file, audio=False).sub_clip(1.2, 2.5)
+    assert not clip._write_stream_copy(str(tmp_path / "copy.mp4"), None)
+
+
+def test_concatenate_stream_copy(keyframed_file: str, tmp_path, monkeypatch):
+    from vidiopy import (
+        ConcatenateVideoClip,
+        concatenate_videoclips,
+        ImageClip,
+        ImageSequenceClip,
+    )
+
+    source = ffmpegio.video.read(keyframed_file)[1]
+    clips = [
+        VideoFileClip(keyframed_file, audio=False),
+        VideoFileClip(keyframed_file, audio=False).sub_clip(1.0, 2.5),
+    ]
+    assert isinstance(concatenate_videoclips(clips), ImageSequenceClip)
+    result = concatenate_videoclips(clips, lazy=True)
+    assert isinstance(result, ConcatenateVideoClip)
+    monkeypatch.setattr(FFmpegVideoReader, "get_frame", no_decode)
+    monkeypatch.setattr(VideoFileClip, "_import_video_clip", no_decode)
+    out = str(tmp_path / "joined.mp4")
+    result.write_videofile(out)
+    assert np.array_equal(
+        ffmpegio.video.read(out)[1], np.concatenate([source, source[10:25]])
+    )
+    monkeypatch.undo()
+
+    # other formats, or other clips, are rendered
+    other = str(tmp_path / "other.mp4")
+    ffmpegio.video.write(other, 10, source, overwrite=True, pix_fmt="yuv420p")
+    mixed = concatenate_videoclips(clips + [VideoFileClip(other, audio=False)], lazy=True)
+    assert mixed._stream_copy_parts() is None
+    image = ImageClip(np.zeros((32, 32, 3), dtype=np.uint8), duration=1, fps=10)
+    assert concatenate_videoclips(clips + [image], lazy=True)._stream_copy_parts() is None
+
+
+@pytest.fixture
+def av_file(tmp_path):
+    fil = str(tmp_path / "av.mp4")
+    # 3 seconds of video with a keyframe every half second, and of audio
+    ffmpegio.transcode(
+        [
+            ("testsrc=size=32x32:rate=10:duration=3", {"f": "lavfi"}),
+            ("sine=duration=3", {"f": "lavfi"}),
+        ],
+        fil,
+        overwrite=True,
+        g=5,
+        sc_threshold=0,
+        pix_fmt="yuv420p",
+    )
+    return fil
+
+
+def test_concatenate_stream_copy_cut_with_audio(av_file: str, tmp_path):
+    from vidiopy import ConcatenateVideoClip
+
+    fil = av_file
+    # the end of the cut stays 2, it plays for 1 second
+    cut = VideoFileClip(fil).sub_clip(1, 2)
+    concatenation = ConcatenateVideoClip([VideoFileClip(fil), cut])
+    assert concatenation.durations == [3, 1]
+    assert concatenation.duration == 4 and concatenation.audio.duration == 4
+    assert concatenation._stream_copy_parts() is not None
+
+    out = str(tmp_path / "joined.mp4")
+    concatenation.write_videofile(out)
+    streams = ffmpegio.probe.full_details(
+        out, show_format=False, show_streams=("codec_type", "duration")
+    )["streams"]
+    durations = {stream["codec_type"]: stream["duration"] for stream in streams}
+    assert durations["video"] == pytest.approx(4, abs=0.05)
+    assert durations["audio"] == pytest.approx(4, abs=0.05)
+
+
+def test_stream_copy_keeps_timestamps(av_file: str, tmp_path):
+    source = ffmpegio.video.read(av_file)[1]
+    # the frames are decoded out of order, which made the copies start late
+    assert ffmpegio.probe.full_details(
+        av_file, show_format=False, select_streams="v:0", show_streams=("has_b_frames",)
+    )["streams"][0]["has_b_frames"]
+
+    def start_times(path):
+        streams = ffmpegio.probe.full_details(
+            path, show_format=False, show_streams=("codec_type", "start_time")
+        )["streams"]
+        return {stream["codec_type"]: stream["start_time"] for stream in streams}
+
+    out = str(tmp_path / "copy.mp4")
+    VideoFileClip(av_file).write_videofile(out)
+    assert np.array_equal(ffmpegio.video.read(out)[1], source)
+    assert start_times(out) == start_times(av_file) == {"video": 0, "audio": 0}
+
+    cut = VideoFileClip(av_file).sub_clip(1, 2)
+    assert cut._frame_window == (10, 20)
+    cut.write_videofile(out)
+    assert np.array_equal(ffmpegio.video.read(out)[1], source[10:20])
+    assert start_times(out) == {"video": 0, "audio": 0}
+
+
+@pytest.mark.parametrize("t_start, t_end", [(1, 2), (1, 1.7), (1.2, 2)])
+def test_stream_copy_matches_render(av_file: str, tmp_path, t_start, t_end):
+    def written(path):
+        streams = ffmpegio.probe.full_details(
+            path, show_format=False, show_streams=("codec_type", "duration")
+        )["streams"]
+        durations = {stream["codec_type"]: stream["duration"] for stream in streams}
+        return ffmpegio.video.read(path)[1], durations
+
+    copied, rendered = str(tmp_path / "copy.mp4"), str(tmp_path / "render.mp4")
+    VideoFileClip(av_file).sub_clip(t_start, t_end).write_videofile(copied, smart_cut=True)
+    VideoFileClip(av_file).sub_clip(t_start, t_end).write_videofile(rendered, stream_copy=False)
+    copied_frames, copied_durations = written(copied)
+    rendered_frames, rendered_durations = written(rendered)
+    assert len(copied_frames) == len(rendered_frames) == round((t_end - t_start) * 10)
+    assert copied_durations == pytest.approx(rendered_durations)
+    assert rendered_durations["video"] == pytest.approx(t_end - t_start)
+    # both are encoded lossy, the frames need only look alike
+    difference = np.abs(copied_frames.astype(int) - rendered_frames.astype(int))
+    assert difference.mean() < 8
+
+
+def test_concatenate_cut_then_clip_audio(av_file: str):
+    from vidiopy import ImageClip, concatenate_videoclips
+
+    image = ImageClip(np.zeros((32, 32, 3), dtype=np.uint8), duration=1, fps=10)
+    image.set_audio(VideoFileClip(av_file).audio.sub_clip(0, 1))
+    # the cut plays for 1 second, with an end of 2
+    clips = [VideoFileClip(av_file).sub_clip(1, 2), image]
+    result = concatenate_videoclips(clips)
+    assert result.duration == 2
+    assert result.audio.duration == pytest.approx(result.duration)
+    assert len(result.audio._audio_data) == round(2 * result.audio.fps)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -4,18 +4,118 @@ from typing import Callable, Generator, NoReturn, Self
 from copy import copy as copy_
 import ffmpegio
 import numpy as np
+import numpy.typing as npt
 from ..Clip import Clip
+from .. import config
+from .ffmpeg_reader import FFmpegAudioReader, decoded_length, pcm_scratch, sample_format_of
+from .resample import input_span, resample, resampled_length
+
+# The magnitude from which the soft clipping of `composite_audioclips` bends samples towards full scale, quieter
+# samples are kept as they are.
+SOFT_CLIP_KNEE = 0.5
 
 __all__ = [
     "AudioClip",
+    "GainEnvelope",
     "AudioFileClip",
     "SilenceClip",
     "AudioArrayClip",
+    "ConcatenateAudioClip",
     "concatenate_audioclips",
     "composite_audioclips",
+    "channel_mix_matrix",
 ]
 
 
+def _map_times(func: Callable, times: np.ndarray) -> np.ndarray:
+    """
+    Applies a time transformation function to an array of times, at once if it supports arrays.
+
+    Args:
+        func (Callable): The time transformation function.
+        times (np.ndarray): The times in seconds.
+
+    Returns:
+        np.ndarray: The transformed times.
+    """
+    try:
+        mapped = np.asarray(func(times), dtype=np.float64)
+    except Exception:
+        # Functions written for a single time, like `max(0, t)`
+        mapped = None
+    if mapped is None or mapped.shape != times.shape:
+        mapped = np.array([func(t) for t in times], dtype=np.float64)
+    return mapped
+
+
+class GainEnvelope:
+    """
+    GainEnvelope is a piecewise-linear gain over time, the product of the gain effects stacked on an audio clip.
+
+    Each factor is a pair of breakpoint times and gains, interpolated linearly between the breakpoints and held before
+    the first and after the last. A new factor is merged into an existing one on the union of their breakpoints whenever
+    at most one of them changes on every segment, which keeps the product exact; so a volume change with a fade in and a
+    fade out is a single factor, evaluated with one `np.interp` per block.
+
+    Attributes:
+        factors (tuple[tuple[np.ndarray, np.ndarray], ...]): The breakpoint times and gains of each factor.
+    """
+
+    def __init__(self, factors: tuple[tuple[np.ndarray, np.ndarray], ...] = ()):
+        """
+        Initializes a GainEnvelope instance.
+
+        Args:
+            factors (tuple[tuple[np.ndarray, np.ndarray], ...], optional): The breakpoint times and gains of each factor.
+                Defaults to no factor, a gain of 1.
+        """
+        self.factors = tuple(factors)
+
+    def multiplied(self, times: npt.ArrayLike, gains: npt.ArrayLike) -> "GainEnvelope":
+        """
+        Returns the product of the envelope and a piecewise-linear gain, leaving the envelope unchanged.
+
+        Args:
+            times (npt.ArrayLike): The increasing times of the breakpoints, in seconds.
+            gains (npt.ArrayLike): The gain at each breakpoint.
+
+        Returns:
+            GainEnvelope: The product of both.
+
+        Raises:
+            ValueError: If times and gains do not have the same length or no breakpoint is given.
+        """
+        times = np.asarray(times, dtype=np.float64).reshape(-1)
+        gains = np.asarray(gains, dtype=np.float64).reshape(-1)
+        if len(times) != len(gains) or len(times) == 0:
+            raise ValueError("times and gains must be non-empty and of the same length")
+        factors = list(self.factors)
+        for i, (factor_times, factor_gains) in enumerate(factors):
+            union = np.union1d(factor_times, times)
+            own = np.interp(union, factor_times, factor_gains)
+            other = np.interp(union, times, gains)
+            # Where both change, their product is not linear
+            if not np.any((np.diff(own) != 0) & (np.diff(other) != 0)):
+                factors[i] = (union, own * other)
+                return GainEnvelope(tuple(factors))
+        return GainEnvelope((*factors, (times, gains)))
+
+    def __call__(self, times: np.ndarray) -> np.ndarray:
+        """
+        Returns the gain at each time.
+
+        Args:
+            times (np.ndarray): The times in seconds.
+
+        Returns:
+            np.ndarray: The gains, shaped like `times`.
+        """
+        gain = np.ones(np.shape(times))
+        for factor_times, factor_gains in self.factors:
+            gain *= np.interp(times, factor_times, factor_gains)
+        return gain
+
+
 class AudioClip(Clip):
     """
     The AudioClip class represents an audio clip. It is a subclass of the Clip class.
@@ -257,21 +357,203 @@ class AudioClip(Clip):
         """
         if self.fps is None:
             raise ValueError("Frames per second (fps) is not set")
-        if self._audio_data is None:
+        if not self._has_samples():
             raise ValueError("Audio data is not set")
         if self.duration is None and self.end is None:
             raise ValueError("Original duration is not set")
 
         # Calculate the Frame index using the duration, total_frames & time t
-        frame_index = int((t / (self.end or self.duration)) * len(self._audio_data)) - 1
-        return self._audio_data[frame_index]
+        frame_index = int((t / (self.end or self.duration)) * self._sample_count()) - 1
+        return self._samples_at(np.array([frame_index]))[0]
+
+    def get_frames_at_t(self, times: np.ndarray | list[float]) -> np.ndarray:
+        """
+        This method gets the audio frames at many times at once, the block counterpart of `get_frame_at_t`.
+
+        Effects applied with `fl_time_transform`, the audio fx or `set_frame_functions` transform whole blocks, so a chain of
+        effects runs as a few NumPy operations per block. If `get_frame_at_t` was replaced on its own, it is called for each time.
+
+        Args:
+            times (np.ndarray | list[float]): The times in seconds.
+
+        Returns:
+            np.ndarray: The audio data at the times, shaped (len(times), channels).
+
+        Raises:
+            ValueError: If frames per second (fps) is not set, audio data is not set, or original duration is not set.
+
+        Example:
+            >>> clip.get_frames_at_t(np.arange(0, 1, 1 / clip.fps)).shape
+            (44100, 2)
+        """
+        return self._frames_function()(np.asarray(times, dtype=np.float64))
+
+    def set_frame_functions(
+        self,
+        get_frame_at_t: Callable[[int | float], np.ndarray],
+        get_frames_at_t: Callable[[np.ndarray], np.ndarray],
+    ) -> Self:
+        """
+        This method replaces how frames are computed, with a function for one time and its block counterpart for many times.
+        Both must compute the same frames; effects use it to stay vectorized, see `get_frames_at_t`.
+
+        Args:
+            get_frame_at_t (Callable[[int | float], np.ndarray]): Returns the frame at a time.
+            get_frames_at_t (Callable[[np.ndarray], np.ndarray]): Returns the frames at an array of times, shaped (len(times), channels).
+
+        Returns:
+            AudioClip: The instance of the class.
+        """
+        self.get_frame_at_t = get_frame_at_t
+        self._frames_at_times = get_frames_at_t
+        # Remembers which get_frame_at_t the block function matches
+        self._block_frame_at_t = get_frame_at_t
+        return self
+
+    def _frames_function(self) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        This method returns the function currently computing blocks of frames, to call it or to wrap it in an effect.
+
+        Returns:
+            Callable[[np.ndarray], np.ndarray]: The block function, or a loop over `get_frame_at_t` if it was replaced on its own.
+        """
+        get_frame_at_t = self.__dict__.get("get_frame_at_t")
+        if get_frame_at_t is getattr(self, "_block_frame_at_t", None) and (
+            get_frame_at_t is not None
+            or type(self).get_frame_at_t is AudioClip.get_frame_at_t
+            or type(self)._frames_at_times is not AudioClip._frames_at_times
+        ):
+            return self._frames_at_times
+        get_frame_at_t = self.get_frame_at_t
+        return lambda times: np.array([get_frame_at_t(t) for t in times])
+
+    def _frames_at_times(self, times: np.ndarray) -> np.ndarray:
+        """
+        This method gets the audio frames at many times at once, with the frame indices `get_frame_at_t` would use,
+        computed in one NumPy operation.
+
+        Args:
+            times (np.ndarray): The times in seconds.
+
+        Returns:
+            np.ndarray: The audio data at the times, shaped (len(times), channels).
+
+        Raises:
+            ValueError: If frames per second (fps) is not set, audio data is not set, or original duration is not set.
+        """
+        if self.fps is None:
+            raise ValueError("Frames per second (fps) is not set")
+        if not self._has_samples():
+            raise ValueError("Audio data is not set")
+        if self.duration is None and self.end is None:
+            raise ValueError("Original duration is not set")
+        # Truncating like int() does, so every index matches the one of get_frame_at_t
+        frame_indices = (
+            np.asarray(times, dtype=np.float64) / (self.end or self.duration) * self._sample_count()
+        ).astype(np.int64) - 1
+        return self._samples_at(frame_indices)
+
+    def _has_samples(self) -> bool:
+        """
+        This method tells whether the clip has samples, without reading them.
+
+        Returns:
+            bool: True if the audio data is set.
+        """
+        return self._audio_data is not None
+
+    def _sample_count(self) -> int:
+        """
+        This method returns the number of samples of the audio data.
+
+        Returns:
+            int: The number of samples.
+        """
+        return len(self._audio_data)  # type: ignore
+
+    def _samples_at(self, indices: np.ndarray) -> np.ndarray:
+        """
+        This method returns the samples at some indices of the audio data, negative indices counting from the end.
+
+        Args:
+            indices (np.ndarray): The indices of the samples.
+
+        Returns:
+            np.ndarray: The samples.
+
+        Raises:
+            IndexError: If an index is out of range.
+        """
+        return self._audio_data[indices]  # type: ignore
+
+    def _read_samples(self, first: int, last: int) -> np.ndarray:
+        """
+        This method returns the samples [first, last) of the audio data, shaped (samples, channels).
+
+        Args:
+            first (int): The index of the first sample.
+            last (int): The index after the last sample.
+
+        Returns:
+            np.ndarray: The samples.
+        """
+        return _as_frames(self.audio_data)[first:last]
+
+    def get_frames_at_rate(self, fps: int | float, start: int, stop: int) -> np.ndarray:
+        """
+        This method gets the audio frames [start, stop) at the sample rate `fps`, frame `i` being the frame at time `i / fps`.
+
+        The frames are computed at the clip's own rate, with the audio data of a clip without effects or with
+        `get_frames_at_t` otherwise, and converted to `fps` with the polyphase resampler of `vidiopy.audio.resample`.
+        The frames keep the sample type of the clip.
+        Only the frames the filter needs around [start, stop) are computed, so a long clip can be converted block by block.
+
+        Args:
+            fps (int | float): The sample rate of the frames.
+            start (int): The index of the first frame.
+            stop (int): The index after the last frame.
+
+        Returns:
+            np.ndarray: The frames, shaped (stop - start, channels).
+
+        Raises:
+            ValueError: If frames per second (fps) is not set, audio data is not set, or original duration is not set.
+        """
+        if self.duration is None and self.end is None:
+            raise ValueError("Original duration is not set")
+        function = self._frames_function()
+        if getattr(function, "__func__", None) is AudioClip._frames_at_times:
+            if not self._has_samples():
+                raise ValueError("Audio data is not set")
+            length = self._sample_count()
+            rate = length / (self.duration or self.end)
+            read = self._read_samples
+        else:
+            if self.fps is None:
+                raise ValueError("Frames per second (fps) is not set")
+            rate = self.fps
+            length = int(round((self.end or self.duration) * rate))  # type: ignore
+            read = lambda first, last: _as_frames(function(np.arange(first, last) / rate))
+
+        first, last = input_span(rate, fps, start, stop)
+        first, last = max(first, 0), min(last, length)
+        if first >= last:
+            return np.zeros((max(0, stop - start), self.channels or 1), dtype=_sample_dtype())
+        source = read(first, last)
+        frames = resample(source, rate, fps, np.arange(start, stop), offset=first)
+        if np.issubdtype(source.dtype, np.integer):
+            # Keeps the sample type, so integer samples keep their full scale
+            info = np.iinfo(source.dtype)
+            frames = np.clip(np.rint(frames), info.min, info.max)
+        return frames.astype(source.dtype)
 
     def iterate_frames_at_fps(
         self, fps: int | float | None = None
     ) -> Generator[np.ndarray, None, None]:
         """
         This method generates audio frames at a specific frames per second (fps) rate. If no fps is provided, it uses the fps set in the AudioClip instance.
-        It calculates the original fps using the duration and total frames, then generates frames at the specified fps rate.
+        It calculates the original fps using the duration and total frames, then generates frames at the specified fps rate
+        with the polyphase resampler of `vidiopy.audio.resample`, see `get_frames_at_rate`.
 
         Args:
             fps (int | float | None, optional): The frames per second rate at which to generate frames. If not provided, the fps set in the AudioClip instance is used.
@@ -286,19 +568,18 @@ class AudioClip(Clip):
             if self.fps is None:
                 raise ValueError("Frames per second (fps) is not set")
             fps = self.fps
-        if self._audio_data is None:
+        if not self._has_samples():
             raise ValueError("Audio data is not set")
         if self.duration is None:
             raise ValueError("Original duration is not set")
 
         # Calculate the original fps
-        original_fps = len(self._audio_data) / self.duration
+        original_fps = self._sample_count() / self.duration
 
-        # Calculate the frame index based on the original fps
-        frame_index = 0
-        while frame_index < len(self._audio_data):
-            yield self._audio_data[frame_index]
-            frame_index += int(original_fps / fps)
+        # Resample in blocks, so up- and downsampling both keep the frames in band
+        total = resampled_length(original_fps, fps, self._sample_count())
+        for i in range(0, total, 44100):
+            yield from self.get_frames_at_rate(fps, i, min(i + 44100, total))
 
     def iterate_all_frames(self) -> Generator[np.ndarray, None, None]:
         """
@@ -363,6 +644,7 @@ class AudioClip(Clip):
         """
         This method applies a time transformation function to the `get_frame_at_t` method of the AudioClip instance.
         The transformation function should take a time (an integer or a float) as its argument and return a transformed time.
+        Blocks of frames apply it to the whole array of times at once if it supports arrays, and to each time otherwise.
 
         The `get_frame_at_t` method is replaced with a new method that applies the transformation function to its argument before calling the original method.
 
@@ -379,36 +661,81 @@ class AudioClip(Clip):
             raise ValueError("`get_frame_at_t` method is not set")
 
         original_get_frame_at_t = copy_(self.get_frame_at_t)
+        original_get_frames_at_t = self._frames_function()
 
         @wraps(original_get_frame_at_t)
         def new_get_frame_at_t(t: int | float) -> np.ndarray:
             return original_get_frame_at_t(func(t))
 
-        self.get_frame_at_t = new_get_frame_at_t
-        return self
+        def new_get_frames_at_t(times: np.ndarray) -> np.ndarray:
+            return original_get_frames_at_t(_map_times(func, times))
 
-    def sub_clip(
-        self, start: float | int | None = None, end: float | int | None = None
-    ) -> Self:
+        return self.set_frame_functions(new_get_frame_at_t, new_get_frames_at_t)
+
+    def fl_gain_envelope(self, times: npt.ArrayLike, gains: npt.ArrayLike) -> Self:
         """
-        This method creates a subclip from the audio clip starting from `start` to `end`. If `start` or `end` is not provided,
-        it uses the start or end time set in the AudioClip instance. If neither is set, it uses 0 for start and the duration for end.
+        This method multiplies the audio frames by a piecewise-linear gain, given by its breakpoints: the gain is
+        interpolated linearly between the breakpoints and held before the first and after the last.
 
-        It calculates the original frames per second (fps) using the duration and total frames, then calculates the start and end frame indices using the original fps.
-        It then updates the audio data, original duration, end time, and start time of the AudioClip instance.
+        Gains stacked without another effect in between are merged into a single `GainEnvelope`, so a chain of gain effects
+        like `volumex`, `fadein` and `fadeout` costs one evaluation of the envelope and one multiply per block.
 
         Args:
-            start (float | int | None, optional): The start time of the subclip in seconds. If not provided, the start time set in the AudioClip instance is used. Defaults to None.
-            end (float | int | None, optional): The end time of the subclip in seconds. If not provided, the end time set in the AudioClip instance is used. Defaults to None.
+            times (npt.ArrayLike): The increasing times of the breakpoints, in seconds.
+            gains (npt.ArrayLike): The gain at each breakpoint.
 
         Returns:
-            AudioClip: The instance of the class with the updated audio data, original duration, end time, and start time.
+            AudioClip: The instance of the class with the gain applied.
 
         Raises:
-            ValueError: If audio data is not set, original duration is not set, or end time is greater than the original duration.
+            ValueError: If times and gains do not have the same length or no breakpoint is given.
+
+        Example:
+            >>> clip.fl_gain_envelope([0, 2], [0, 1])  # A 2 seconds fade in
+        """
+        stacked = self.__dict__.get("_gain_envelope")
+        if stacked is not None and stacked[0] is self.__dict__.get("get_frame_at_t"):
+            # The top effect is a gain already, merge into it
+            _, envelope, original_get_frame_at_t, original_get_frames_at_t = stacked
+        else:
+            envelope = GainEnvelope()
+            original_get_frame_at_t = copy_(self.get_frame_at_t)
+            original_get_frames_at_t = self._frames_function()
+        envelope = envelope.multiplied(times, gains)
+
+        @wraps(original_get_frame_at_t)
+        def new_get_frame_at_t(t: int | float) -> np.ndarray:
+            return _apply_gain(original_get_frame_at_t(t), envelope(np.float64(t)))
+
+        def new_get_frames_at_t(times: np.ndarray) -> np.ndarray:
+            frames = np.asarray(original_get_frames_at_t(times))
+            return _apply_gain(frames, envelope(times).reshape(-1, *(1,) * (frames.ndim - 1)))
+
+        self._gain_envelope = (
+            new_get_frame_at_t,
+            envelope,
+            original_get_frame_at_t,
+            original_get_frames_at_t,
+        )
+        return self.set_frame_functions(new_get_frame_at_t, new_get_frames_at_t)
+
+    def _sub_clip_bounds(
+        self, start: float | int | None, end: float | int | None
+    ) -> tuple[float | int, float | int]:
+        """
+        This method resolves the start and end times of a subclip. If `start` or `end` is not provided,
+        it uses the start or end time set in the AudioClip instance. If neither is set, it uses 0 for start and the duration for end.
+
+        Args:
+            start (float | int | None): The start time of the subclip in seconds.
+            end (float | int | None): The end time of the subclip in seconds.
+
+        Returns:
+            tuple[float | int, float | int]: The start and end times of the subclip.
+
+        Raises:
+            ValueError: If original duration is not set, or end time is greater than the original duration.
         """
-        if self._audio_data is None:
-            raise ValueError("Audio data is not set")
         if self.duration is None:
             raise ValueError("Original duration is not set")
         if start is None:
@@ -423,6 +750,31 @@ class AudioClip(Clip):
         # Add check for end value
         if end > self.duration:
             raise ValueError("End value cannot be greater than the original duration")
+        return start, end
+
+    def sub_clip(
+        self, start: float | int | None = None, end: float | int | None = None
+    ) -> Self:
+        """
+        This method creates a subclip from the audio clip starting from `start` to `end`. If `start` or `end` is not provided,
+        it uses the start or end time set in the AudioClip instance. If neither is set, it uses 0 for start and the duration for end.
+
+        It calculates the original frames per second (fps) using the duration and total frames, then calculates the start and end frame indices using the original fps.
+        It then updates the audio data, original duration, end time, and start time of the AudioClip instance.
+
+        Args:
+            start (float | int | None, optional): The start time of the subclip in seconds. If not provided, the start time set in the AudioClip instance is used. Defaults to None.
+            end (float | int | None, optional): The end time of the subclip in seconds. If not provided, the end time set in the AudioClip instance is used. Defaults to None.
+
+        Returns:
+            AudioClip: The instance of the class with the updated audio data, original duration, end time, and start time.
+
+        Raises:
+            ValueError: If audio data is not set, original duration is not set, or end time is greater than the original duration.
+        """
+        if self._audio_data is None:
+            raise ValueError("Audio data is not set")
+        start, end = self._sub_clip_bounds(start, end)
 
         # Calculate the original fps
         original_fps = len(self._audio_data) / self.duration
@@ -459,20 +811,7 @@ class AudioClip(Clip):
         """
         if self._audio_data is None:
             raise ValueError("Audio data is not set")
-        if self.duration is None:
-            raise ValueError("Original duration is not set")
-        if start is None:
-            start = self.start if self.start is not None else 0
-        if end is None:
-            if self.end is not None:
-                end = self.end
-            elif self.duration is not None:
-                end = self.duration
-            else:
-                raise ValueError("end or duration must be set.")
-        # Add check for end value
-        if end > self.duration:
-            raise ValueError("End value cannot be greater than the original duration")
+        start, end = self._sub_clip_bounds(start, end)
 
         # Calculate the original fps
         original_fps = len(self._audio_data) / self.duration
@@ -512,6 +851,35 @@ class AudioClip(Clip):
         else:
             raise TypeError("Invalid argument type.")
 
+    def _iter_output_blocks(
+        self, fps: int | float, block_size: int = 44100
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        This method generates the samples written to an audio file, in blocks of at most `block_size` samples.
+        It gets the frame at each time step from 0 to the end or duration with a step of 1/fps.
+        The frames of a block come from `get_frames_at_t`, or from `get_frames_at_rate` if `fps` is not the clip's sample rate,
+        and are converted to the sample format of `config.AUDIO_SAMPLE_FORMAT`.
+
+        Args:
+            fps (int | float): The sample rate of the output.
+            block_size (int, optional): The maximum number of samples per block. Defaults to 44100.
+
+        Yields:
+            np.ndarray: The next block of samples, shaped (samples, channels).
+
+        Raises:
+            ValueError: If neither end nor duration is set.
+        """
+        if self.duration is None and self.end is None:
+            raise ValueError("Original duration is not set")
+        times = np.arange(0, self.end or self.duration, 1 / fps)
+        for i in range(0, len(times), block_size):
+            if self.fps and self.fps != fps:
+                block = self.get_frames_at_rate(fps, i, min(i + block_size, len(times)))
+            else:
+                block = self.get_frames_at_t(times[i : i + block_size])
+            yield _to_sample_format(block)
+
     def write_audiofile(
         self,
         path: str,
@@ -526,15 +894,15 @@ class AudioClip(Clip):
         It raises a ValueError if fps is not set in either way.
         It also raises a ValueError if audio data, original duration, or channels are not set.
 
-        It creates a temporary audio data array by getting the frame at each time step from 0 to the end or duration with a step of 1/fps.
-        It then writes the temporary audio data to the audio file using the `ffmpegio.audio.write` function.
+        It gets the frame at each time step from 0 to the end or duration with a step of 1/fps, one block of samples at a time,
+        and streams the blocks to ffmpeg, so the whole output is never held in memory.
 
         Args:
             path (str): The path to write the audio file to.
             fps (int | None, optional): The frames per second to use. If not provided, the fps set in the AudioClip instance is used. Defaults to None.
             overwrite (bool, optional): Whether to overwrite the audio file if it already exists. Defaults to True.
-            show_log (bool, optional): Whether to show the log of the `ffmpegio.audio.write` function. Defaults to False.
-            **kwargs: Additional keyword arguments to pass to the `ffmpegio.audio.write` function.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+            **kwargs: Additional ffmpeg options, passed to the `ffmpegio.open` audio writer.
 
         Raises:
             ValueError: If fps is not set, audio data is not set, original duration is not set, or channels are not set.
@@ -543,23 +911,18 @@ class AudioClip(Clip):
             if self.fps is None:
                 raise ValueError("Frames per second (fps) is not set")
             fps = self.fps
-        if self._audio_data is None:
+        if not self._has_samples():
             raise ValueError("Audio data is not set")
         if self.duration is None and self.end is None:
             raise ValueError("Original duration is not set")
         if self.channels is None:
             raise ValueError("Channels is not set")
 
-        # Convert the audio Data to the temp_Audio_Data using the duration & fps & _audio_data
-        temp_audio_data = np.array(
-            [
-                self.get_frame_at_t(t)
-                for t in np.arange(0, self.end or self.duration, 1 / fps)
-            ]
-        )
-        ffmpegio.audio.write(
-            path, fps, temp_audio_data, overwrite=overwrite, show_log=show_log, **kwargs
-        )
+        with ffmpegio.open(
+            path, "wa", rate_in=fps, overwrite=overwrite, show_log=show_log, **kwargs
+        ) as writer:
+            for block in self._iter_output_blocks(fps):
+                writer.write(block)
 
 
 class SilenceClip(AudioClip):
@@ -570,7 +933,7 @@ class SilenceClip(AudioClip):
         fps (int): The frames per second of the audio clip. Default is 44100.
         _original_dur (int | float): The original duration of the audio clip.
         channels (int): The number of audio channels. Default is 1.
-        _audio_data (numpy.ndarray): The audio data represented as a numpy array of zeros.
+        _audio_data (numpy.ndarray): The audio data, a read-only broadcast view of a single frame of zeros, so it costs no memory.
     """
 
     def __init__(self, duration: int | float, fps: int = 44100, channels: int = 1):
@@ -586,13 +949,24 @@ class SilenceClip(AudioClip):
         self._original_dur: int | float = duration
         super().__init__(self._original_dur, self.fps)
         self.channels = channels
-        self._audio_data = np.zeros((int(duration * self.fps), self.channels))
+        self._audio_data = np.broadcast_to(
+            np.zeros((1, self.channels), dtype=_sample_dtype()),
+            (int(duration * self.fps), self.channels),
+        )
 
 
 class AudioFileClip(SilenceClip):
     """
     AudioFileClip is a class that represents an audio file. It extends the SilenceClip class.
 
+    The samples are decoded the first time they are needed. Cutting the clip with `sub_clip` before that
+    only moves the window of the file to decode, so only the samples of the cut are ever decoded.
+    Until the whole window is needed, blocks of frames are decoded on their own with an `FFmpegAudioReader`,
+    so getting the frames around a time costs O(block), not O(file). With `memmap`, the file is instead
+    decoded once to a scratch file shared by every clip of the same file, see `pcm_scratch`. Either way the number
+    of samples is the number decoding gives, counted once from the end of the stream, see `decoded_length`.
+    The samples are decoded to the sample format of `config.AUDIO_SAMPLE_FORMAT`.
+
     Attributes:
         fps (int): The sample rate of the audio file, default is 44100.
         channels (int): The number of channels in the audio file, default is 1.
@@ -600,18 +974,26 @@ class AudioFileClip(SilenceClip):
         path (str): The path to the audio file.
         start (float): The start time of the audio file.
         end (float): The end time of the audio file.
-        _audio_data (numpy.ndarray): The audio data read from the file.
+        _audio_data (numpy.ndarray): The audio data read from the file, decoded on first access.
+        memmap (bool): Whether the samples are memory-mapped from a shared scratch file.
         More from the SilenceClip Class
 
     """
 
-    def __init__(self, path: str | pathlib.Path, duration: int | float | None = None):
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        duration: int | float | None = None,
+        memmap: bool = False,
+    ):
         """
         Initializes an AudioFileClip instance.
 
         Args:
             path (str | pathlib.Path): The path to the audio file.
             duration (int | float | None, optional): The duration of the audio file. If not provided, it will be calculated from the audio file.
+            memmap (bool, optional): Whether to decode the file once to a scratch file in `config.SCRATCH_DIR`, memory-mapped
+                and shared by every clip of the same file, instead of decoding into RAM. Defaults to False.
 
         Raises:
             ValueError: If the audio file is empty and duration is not provided.
@@ -620,6 +1002,7 @@ class AudioFileClip(SilenceClip):
             info = ffmpegio.probe.audio_streams_basic(str(path))
         except Exception:
             info = None
+        self.memmap = memmap
         if not info:
             self.fps = 44100
             self.channels = 1
@@ -630,18 +1013,206 @@ class AudioFileClip(SilenceClip):
             info = info[0]
             self.fps = info["sample_rate"]
             self._original_dur = info["duration"]
+            # Skip SilenceClip.__init__, the samples come from the file
+            AudioClip.__init__(self, info["duration"], info["sample_rate"])
             self.channels = info["channels"]
-            super().__init__(info["duration"], info["sample_rate"], info["channels"])
             self.path = str(path)
+            self._file_duration = info["duration"]
+            self._sample_fmt = sample_format_of(_sample_dtype())
+            # The window of the file to decode: offset and length in seconds, None for up to the end
+            self._window: tuple[float | int, float | int | None] = (0.0, None)
+            self._reader: FFmpegAudioReader | None = None
             self.start = info["start_time"]
             self.end = info["duration"] - info["start_time"]
-            self._audio_data = ffmpegio.audio.read(str(path))[1]
+
+    @property
+    def _audio_data(self) -> np.ndarray | None:
+        """
+        The audio data, decoded from the window of the file on first access.
+
+        Returns:
+            np.ndarray | None: The audio data.
+        """
+        if self._deferred and self.memmap:
+            # A view of the scratch file, nothing is copied
+            first = int(round(self._window[0] * self.fps))  # type: ignore
+            self._samples = pcm_scratch(self.path, self.fps, self.channels, self._sample_fmt)[  # type: ignore
+                first : first + self._sample_count()
+            ]
+        elif self._deferred:
+            offset, length = self._window
+            options = {}
+            if offset:
+                options["ss_in"] = offset
+            if length is not None:
+                options["t_in"] = length
+            self._samples = ffmpegio.audio.read(self.path, sample_fmt=self._sample_fmt, **options)[1]
+        return self._samples
+
+    @_audio_data.setter
+    def _audio_data(self, audio_data: np.ndarray | None) -> None:
+        self._samples = audio_data
+
+    @property
+    def _deferred(self) -> bool:
+        """
+        Whether the samples still have to be decoded from the file.
+
+        Returns:
+            bool: True if the clip reads a file and nothing was decoded yet.
+        """
+        return getattr(self, "_samples", None) is None and hasattr(self, "path")
+
+    def _has_samples(self) -> bool:
+        """
+        This method tells whether the clip has samples, without decoding them.
+
+        Returns:
+            bool: True if the clip reads a file or its audio data is set.
+        """
+        return self._deferred or self._samples is not None
+
+    def _sample_count(self) -> int:
+        """
+        This method returns the number of samples, the number decoding the window gives if they were not decoded yet.
+
+        The window is cut short by the end of the decoded stream, which the probed duration only estimates, see
+        `decoded_length`.
+
+        Returns:
+            int: The number of samples.
+        """
+        if not self._deferred:
+            return super()._sample_count()
+        offset, length = self._window
+        available = decoded_length(
+            self.path, self.fps, self.channels, self._sample_fmt, offset, self._file_duration  # type: ignore
+        )
+        if length is None:
+            return available
+        return min(int(round(length * self.fps)), available)  # type: ignore
+
+    def _block_reader(self) -> FFmpegAudioReader:
+        """
+        Returns the reader of blocks of the window of the file, made again when the window moved.
+
+        Returns:
+            FFmpegAudioReader: The reader.
+        """
+        offset, count = float(self._window[0]), self._sample_count()
+        reader = self._reader
+        if reader is None or reader.offset != offset or reader.length != count:
+            reader = FFmpegAudioReader(
+                self.path, self.fps, self.channels, self._sample_fmt, offset, count  # type: ignore
+            )
+            self._reader = reader
+        return reader
+
+    def _samples_at(self, indices: np.ndarray) -> np.ndarray:
+        """
+        This method returns the samples at some indices, see `AudioClip._samples_at`.
+
+        If the samples were not decoded yet, only the runs of samples around the indices are decoded.
+
+        Args:
+            indices (np.ndarray): The indices of the samples.
+
+        Returns:
+            np.ndarray: The samples, shaped (len(indices), channels).
+
+        Raises:
+            IndexError: If an index is out of range.
+        """
+        if not self._deferred or self.memmap:
+            return super()._samples_at(indices)
+        count = self._sample_count()
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + count, indices)
+        if indices.size and (indices.min() < 0 or indices.max() >= count):
+            raise IndexError("sample index out of range")
+        samples = np.zeros((len(indices), self.channels), dtype=self._block_reader().dtype)  # type: ignore
+        wanted = np.unique(indices)
+        # Indices further apart than a second are read as separate blocks
+        runs = np.split(wanted, np.flatnonzero(np.diff(wanted) > self.fps) + 1)
+        for run in runs:
+            if len(run):
+                block = self._read_samples(int(run[0]), int(run[-1]) + 1)
+                mask = (indices >= run[0]) & (indices <= run[-1])
+                samples[mask] = block[indices[mask] - run[0]]
+        return samples
+
+    def _read_samples(self, first: int, last: int) -> np.ndarray:
+        """
+        This method returns the samples [first, last), decoding only them if the window was not decoded yet.
+
+        Args:
+            first (int): The index of the first sample.
+            last (int): The index after the last sample.
+
+        Returns:
+            np.ndarray: The samples, shaped (last - first, channels).
+        """
+        if not self._deferred or self.memmap:
+            return super()._read_samples(first, last)
+        return self._block_reader().read(first, last)
+
+    def sub_clip(
+        self, start: float | int | None = None, end: float | int | None = None
+    ) -> Self:
+        """
+        This method creates a subclip from the audio clip starting from `start` to `end`, see `AudioClip.sub_clip`.
+
+        If the samples were not decoded yet, only the window of the file to decode is narrowed.
+
+        Args:
+            start (float | int | None, optional): The start time of the subclip in seconds. Defaults to None.
+            end (float | int | None, optional): The end time of the subclip in seconds. Defaults to None.
+
+        Returns:
+            AudioFileClip: The instance of the class with the updated window, original duration, end time, and start time.
+
+        Raises:
+            ValueError: If original duration is not set, or end time is greater than the original duration.
+        """
+        if not self._deferred:
+            return super().sub_clip(start, end)
+        start, end = self._sub_clip_bounds(start, end)
+        self._window = (self._window[0] + start, end - start)
+        self._original_dur = end - start
+        self.end = end
+        self.start = start
+        return self
+
+    def sub_clip_copy(
+        self, start: float | int | None = None, end: float | int | None = None
+    ) -> Self:
+        """
+        This method creates a copy of the AudioFileClip instance and a subclip of it, see `AudioClip.sub_clip_copy`.
+
+        If the samples were not decoded yet, the copy only narrows its window of the file to decode.
+
+        Args:
+            start (float | int | None, optional): The start time of the subclip in seconds. Defaults to None.
+            end (float | int | None, optional): The end time of the subclip in seconds. Defaults to None.
+
+        Returns:
+            AudioFileClip: A copy of the instance of the class with the updated window, original duration, end time, and start time.
+
+        Raises:
+            ValueError: If original duration is not set, or end time is greater than the original duration.
+        """
+        if not self._deferred:
+            return super().sub_clip_copy(start, end)
+        return self.copy().sub_clip(start, end)
 
 
 class AudioArrayClip(AudioClip):
     """
     AudioArrayClip is a class that represents an audio clip from an array. It extends the AudioClip class.
 
+    Float samples are stored in the sample format of `config.AUDIO_SAMPLE_FORMAT`, so float64 arrays take half the memory;
+    integer samples are PCM already and are kept as they are.
+
     Attributes:
         fps (int): The sample rate of the audio clip.
         _original_dur (float): The original duration of the audio clip.
@@ -663,22 +1234,171 @@ class AudioArrayClip(AudioClip):
         self._original_dur = duration
         super().__init__(self._original_dur, self.fps)
         self.channels = audio_data.shape[1]
+        if np.issubdtype(audio_data.dtype, np.floating):
+            audio_data = _to_sample_format(audio_data)
         self._audio_data = audio_data
 
 
+class ConcatenateAudioClip(AudioClip):
+    """
+    ConcatenateAudioClip is a lazy concatenation of audio clips. It extends the AudioClip class.
+
+    It only maps the sample offsets of its clips: samples are taken from the clips, resampled to `fps` and
+    channel-matched, when a block of frames is asked for, and nothing is copied until then. Accessing
+    `_audio_data` renders the whole concatenation once.
+
+    Attributes:
+        clips (list[AudioClip]): The concatenated clips, in order.
+        offsets (numpy.ndarray): The index of the first sample of each clip, followed by the total number of samples.
+        fps (int): The sample rate of the concatenation.
+        channels (int): The number of channels, the maximum of the clips.
+        More from the AudioClip Class
+    """
+
+    def __init__(self, clips: list[AudioClip], fps: int, durations: list[int | float]):
+        """
+        Initializes a ConcatenateAudioClip instance.
+
+        Args:
+            clips (list[AudioClip]): The clips to concatenate.
+            fps (int): The sample rate of the concatenation.
+            durations (list[int | float]): The duration of each clip.
+
+        Raises:
+            ValueError: If a clip's channels are not set.
+        """
+        super().__init__(sum(durations), fps)
+        for clip in clips:
+            if not clip.channels:
+                raise ValueError("clip channels is not set")
+        self.clips = list(clips)
+        self.channels = max(clip.channels for clip in clips)  # type: ignore
+        lengths = [int(round(duration * fps)) for duration in durations]
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self._rendered: np.ndarray | None = None
+
+    @property
+    def _audio_data(self) -> np.ndarray | None:
+        """
+        The audio data, rendered from the clips on first access.
+
+        Returns:
+            np.ndarray | None: The audio data.
+        """
+        if self._rendered is None and hasattr(self, "offsets"):
+            self._rendered = self.render(0, int(self.offsets[-1]))
+        return self._rendered
+
+    @_audio_data.setter
+    def _audio_data(self, audio_data: np.ndarray | None) -> None:
+        self._rendered = audio_data
+
+    def render(self, start: int, end: int) -> np.ndarray:
+        """
+        Renders the samples [start, end) of the concatenation into a single preallocated array.
+
+        Args:
+            start (int): The index of the first sample.
+            end (int): The index after the last sample.
+
+        Returns:
+            np.ndarray: The samples, shaped (end - start, channels).
+        """
+        start, end = max(0, start), min(end, int(self.offsets[-1]))
+        frames = np.zeros((max(0, end - start), self.channels), dtype=_sample_dtype())  # type: ignore
+        for i, clip in enumerate(self.clips):
+            first = max(start, int(self.offsets[i]))
+            last = min(end, int(self.offsets[i + 1]))
+            if first < last:
+                frames[first - start : last - start] = self._clip_samples(
+                    i, np.arange(first, last) - self.offsets[i]
+                )
+        return frames
+
+    def _frames_at_times(self, times: np.ndarray) -> np.ndarray:
+        """
+        This method gets the frames at many times at once, from the clips covering them.
+
+        Args:
+            times (np.ndarray): The times in seconds.
+
+        Returns:
+            np.ndarray: The frames, shaped (len(times), channels).
+        """
+        if self._rendered is not None:
+            return super()._frames_at_times(times)
+        total = int(self.offsets[-1])
+        # Times on the sample grid may fall a hair below their sample
+        indices = np.clip(np.floor(np.asarray(times) * self.fps + 1e-6).astype(np.int64), 0, max(0, total - 1))
+        owners = np.searchsorted(self.offsets, indices, "right") - 1
+        frames = np.zeros((len(indices), self.channels), dtype=_sample_dtype())  # type: ignore
+        for i in np.unique(owners):
+            mask = owners == i
+            frames[mask] = self._clip_samples(int(i), indices[mask] - self.offsets[i])
+        return frames
+
+    def get_frame_at_t(self, t: int | float) -> np.ndarray:
+        """
+        This method gets the audio frame at a specific time `t`, from the clip covering it.
+
+        Args:
+            t (int | float): The time in seconds at which to get the audio frame.
+
+        Returns:
+            np.ndarray: The audio data at the specified time.
+        """
+        if self._rendered is not None:
+            return super().get_frame_at_t(t)
+        return self._frames_at_times(np.array([t]))[0]
+
+    def _clip_samples(self, i: int, indices: np.ndarray) -> np.ndarray:
+        """
+        Returns samples of one clip at the sample rate of the concatenation, matched to its channels, in the sample format
+        of `config.AUDIO_SAMPLE_FORMAT`.
+
+        The samples come from `AudioClip.get_frames_at_rate`, which resamples the clip with the polyphase resampler
+        if its sample rate is not the one of the concatenation.
+
+        Args:
+            i (int): The index of the clip.
+            indices (np.ndarray): The indices of the samples, relative to the start of the clip.
+
+        Returns:
+            np.ndarray: The samples, shaped (len(indices), channels).
+        """
+        clip = self.clips[i]
+        if len(indices) == 0:
+            return np.zeros((0, self.channels), dtype=_sample_dtype())  # type: ignore
+        first = int(indices.min())
+        samples = clip.get_frames_at_rate(self.fps, first, int(indices.max()) + 1)[indices - first]  # type: ignore
+        samples = _to_sample_format(_as_frames(samples), np.float32)
+        matrix = channel_mix_matrix(samples.shape[1], self.channels).T.astype(np.float32)  # type: ignore
+        return _to_sample_format(samples @ matrix)
+
+
 def concatenate_audioclips(
-    clips: list[AudioClip], fps: int | None = 44100
-) -> AudioClip | AudioArrayClip:
+    clips: list[AudioClip],
+    fps: int | None = 44100,
+    lazy: bool = False,
+    durations: list[int | float] | None = None,
+) -> AudioClip | AudioArrayClip | ConcatenateAudioClip:
     """
     Concatenates multiple audio clips into a single audio clip.
 
+    The total number of samples is computed up front and the output is allocated once; each clip is resampled
+    to `fps`, channel-matched with `channel_mix_matrix` and copied in with a slice assignment.
+    With `lazy`, a ConcatenateAudioClip which only maps the offsets of the clips is returned instead.
+
     Parameters:
     clips (list[AudioClip]): A list of AudioClip objects to be concatenated.
     fps (int, optional): The frames per second (fps) for the output AudioClip.
         If not provided, it defaults to 44100, or the maximum fps value found in the input clips.
+    lazy (bool, optional): Whether to return a ConcatenateAudioClip which renders its samples on demand. Defaults to False.
+    durations (list[int | float] | None, optional): The time each clip plays for, to follow the time line of a video.
+        Defaults to None, computing them from the clips.
 
     Returns:
-    AudioClip | AudioArrayClip: The concatenated AudioClip. If the input clips have different
+    AudioClip | AudioArrayClip | ConcatenateAudioClip: The concatenated AudioClip. If the input clips have different
         channels, the output AudioClip will have the maximum number of channels found in the input clips,
         and the missing channels in the other clips will be filled with the mean value of their existing channels.
 
@@ -687,47 +1407,155 @@ def concatenate_audioclips(
 
     Note:
     The duration of the output AudioClip is the sum of the durations of the input clips.
-    If a clip's end time is set, it is used to calculate its duration; otherwise, its duration attribute is used.
+    Unless `durations` is given, if a clip's end time is set, it is used to calculate its duration; otherwise, its duration attribute is used.
     If neither is set, a ValueError is raised.
     """
     if len(clips) == 0:
         raise ValueError("No clips to concatenate")
-    if len(clips) == 1:
+    if len(clips) == 1 and durations is None:
         return clips[0].copy()
-    clip: list[np.ndarray] = []
     fps = fps if fps else max([c.fps if c.fps else 0 for c in clips])
     if not fps:
         raise ValueError("No fps value found place set fps value or fps value in clips")
-    duration = 0
-    for c in clips:
-        if c.end is not None:
-            duration += (c.end - c.start)
-        elif c.duration is not None:
-            duration += c.duration
-        else:
-            raise ValueError("Clip duration is not set")
-    channels_list = []
-    for c in clips:
-        if not c.channels:
-            raise ValueError("clip channels is not set")
-        channels_list.append(c.channels)
-    channels: int = max(channels_list)
-    for c in clips:
-        if not c.channels:
-            raise ValueError("clip channels is not set")
-        c_channels: int = c.channels
-        dif_channels = channels - c_channels
-        for f in c.iterate_frames_at_fps(fps):
-            clip.append(np.concatenate((f, [f.mean()] * dif_channels)))
-    return AudioArrayClip(np.asarray(clip), fps, duration)
+    if durations is None:
+        durations = []
+        for c in clips:
+            if c.end is not None:
+                durations.append(c.end - c.start)
+            elif c.duration is not None:
+                durations.append(c.duration)
+            else:
+                raise ValueError("Clip duration is not set")
+    concatenation = ConcatenateAudioClip(clips, fps, durations)
+    if lazy:
+        return concatenation
+    return AudioArrayClip(
+        concatenation.render(0, int(concatenation.offsets[-1])), fps, sum(durations)
+    )
+
+
+def channel_mix_matrix(in_channels: int, out_channels: int) -> np.ndarray:
+    """
+    Returns the matrix which up- or down-mixes frames of `in_channels` channels to `out_channels` channels.
+
+    Mono is copied to every output channel and every input channel is averaged into mono. Otherwise the shared channels
+    are kept, extra output channels get the mean of the input channels, and extra input channels are averaged into the
+    output channel with the same index modulo `out_channels`, so 5.1 folds into stereo as left and right averages.
+
+    Parameters:
+    in_channels (int): The number of channels of the input frames.
+    out_channels (int): The number of channels of the output frames.
+
+    Returns:
+    np.ndarray: The (out_channels, in_channels) matrix; mixed frames are `frames @ matrix.T`.
+
+    Example:
+    >>> channel_mix_matrix(1, 2)
+    array([[1.],
+           [1.]])
+    """
+    if in_channels < 1 or out_channels < 1:
+        raise ValueError("channels must be at least 1")
+    matrix = np.zeros((out_channels, in_channels))
+    if in_channels <= out_channels:
+        matrix[:in_channels, :in_channels] = np.eye(in_channels)
+        matrix[in_channels:, :] = 1 / in_channels
+    else:
+        matrix[np.arange(in_channels) % out_channels, np.arange(in_channels)] = 1
+        matrix /= matrix.sum(axis=1, keepdims=True)
+    return matrix
+
+
+def _as_frames(block: np.ndarray) -> np.ndarray:
+    """
+    Returns a block of samples shaped (samples, channels).
+    """
+    block = np.asarray(block)
+    return block[:, None] if block.ndim == 1 else block
+
+
+def _sample_dtype() -> np.dtype:
+    """
+    Returns the sample type of `config.AUDIO_SAMPLE_FORMAT`.
+
+    Raises:
+        ValueError: If the format is neither "float32" nor "int16".
+    """
+    if config.AUDIO_SAMPLE_FORMAT not in ("float32", "int16"):
+        raise ValueError("config.AUDIO_SAMPLE_FORMAT must be 'float32' or 'int16'")
+    return np.dtype(config.AUDIO_SAMPLE_FORMAT)
+
+
+def _apply_gain(samples: np.ndarray, gain: np.ndarray) -> np.ndarray:
+    """
+    Multiplies samples by a gain and keeps their sample type, so integer samples stay on their integer scale: they
+    are scaled around the middle of their range, rounded and clipped.
+    """
+    samples = np.asarray(samples)
+    if not np.issubdtype(samples.dtype, np.integer):
+        return (samples * gain).astype(samples.dtype, copy=False)
+    info = np.iinfo(samples.dtype)
+    middle = 0.0 if info.min else (info.max + 1) / 2
+    scaled = (samples - middle) * gain + middle
+    return np.clip(np.rint(scaled), info.min, info.max).astype(samples.dtype)
+
+
+def _to_sample_format(block: np.ndarray, dtype: npt.DTypeLike | None = None) -> np.ndarray:
+    """
+    Converts samples to a sample type, `config.AUDIO_SAMPLE_FORMAT` by default, rescaling between the full scales
+    of integer and float samples like ffmpeg does; integer samples beyond full scale are clipped.
+    """
+    block = np.asarray(block)
+    dtype = np.dtype(dtype) if dtype is not None else _sample_dtype()
+    if block.dtype == dtype:
+        return block
+    if np.issubdtype(block.dtype, np.integer):
+        # Integer samples as floats in [-1, 1), unsigned ones being centered on half their range
+        info = np.iinfo(block.dtype)
+        middle = 0.0 if info.min else (info.max + 1) / 2
+        block = (block.astype(np.float32) - middle) / (middle or -float(info.min))
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return np.clip(np.rint(block * -float(info.min)), info.min, info.max).astype(dtype)
+    return block.astype(dtype)
+
+
+def _soft_clip(block: np.ndarray) -> None:
+    """
+    Bends the samples of a float block beyond `SOFT_CLIP_KNEE` in magnitude smoothly below full scale, in place.
+
+    Above the knee the curve is a tanh scaled to the headroom left, so it meets the samples below it with the same
+    slope, and only the loud samples are computed.
+    """
+    loud = np.flatnonzero(np.abs(block) > SOFT_CLIP_KNEE)
+    if not len(loud):
+        return
+    samples = block.reshape(-1)
+    values = samples[loud]
+    headroom = np.float32(1.0 - SOFT_CLIP_KNEE)
+    magnitudes = np.abs(values) - np.float32(SOFT_CLIP_KNEE)
+    samples[loud] = np.copysign(
+        np.float32(SOFT_CLIP_KNEE) + headroom * np.tanh(magnitudes / headroom), values
+    )
 
 
 def composite_audioclips(
-    clips: list[AudioClip], fps: int | None = 44100, use_bg_audio: bool = False
+    clips: list[AudioClip],
+    fps: int | None = 44100,
+    use_bg_audio: bool = False,
+    gain: float | list[float] = 1.0,
+    clipping: str | None = "hard",
+    block_size: int = 44100,
 ):
     """
     Composites multiple audio clips into a single audio clip.
 
+    The output is allocated once, as float32. Each clip is rendered over the samples of the timeline it covers, one block
+    of at most `block_size` samples at a time with `AudioClip.get_frames_at_t` at the times of the block, or with `AudioClip.get_frames_at_rate`
+    if its sample rate is not `fps`, brought to float full scale, up- or down-mixed with `channel_mix_matrix`, scaled by
+    its gain and added to the output at its sample offset. The mix is returned in the sample format of
+    `config.AUDIO_SAMPLE_FORMAT`.
+
     Parameters:
     clips (list[AudioClip]): A list of AudioClip objects to be composited.
     fps (int, optional): The frames per second (fps) for the output AudioClip.
@@ -735,15 +1563,19 @@ def composite_audioclips(
     use_bg_audio (bool, optional): If True, the first clip in the list is used as the background audio.
         The remaining clips are overlaid on top of this background audio. If False, a SilenceClip of the
         maximum duration found in the clips is used as the background audio.
+    gain (float | list[float], optional): The gain of every clip, or one gain per clip. Defaults to 1.0.
+    clipping (str | None, optional): How samples beyond full scale are handled: "hard" clips them, "soft" bends the samples
+        louder than `SOFT_CLIP_KNEE` smoothly below full scale with a tanh knee, None keeps them, unless the sample
+        format is int16 which always clips. Defaults to "hard".
+    block_size (int, optional): The maximum number of samples rendered at once per clip. Defaults to 44100.
 
     Returns:
     AudioArrayClip: The composited AudioClip. The output AudioClip will have the maximum number of channels
-        found in the input clips, and the missing channels in the other clips will be filled with the mean
-        value of their existing channels.
+        found in the input clips.
 
     Raises:
     ValueError: If no clips are provided, or if no fps value is found or set, or if a clip's channels are not set,
-        or if no duration is found or set in the clips when use_bg_audio is False.
+        or if no duration is found or set in the clips when use_bg_audio is False, or if the gains or clipping are invalid.
 
     Note:
     The duration of the output AudioClip is the duration of the background audio.
@@ -757,10 +1589,23 @@ def composite_audioclips(
     channels = max(*(clip.channels if clip.channels else 0 for clip in clips), 0)
     if not channels:
         raise ValueError("No Channels")
+    if clipping not in ("hard", "soft", None):
+        raise ValueError("clipping must be 'hard', 'soft' or None")
+    gains = list(gain) if isinstance(gain, (list, tuple)) else [gain] * len(clips)
+    if len(gains) != len(clips):
+        raise ValueError("gain must be a float or one float per clip")
 
     if use_bg_audio:
         bg_audio = clips[0]
-        clips = clips[1:]
+        if not bg_audio.duration:
+            raise ValueError("Background audio duration is not set")
+        duration = bg_audio.duration
+        # The background covers the whole timeline
+        layers = [(bg_audio, 0.0, float("inf"), gains[0])]
+        layers += [
+            (clip, clip.start, clip.end or float("inf"), g)
+            for clip, g in zip(clips[1:], gains[1:])
+        ]
     else:
         duration = 0.0
         for clip in clips:
@@ -772,29 +1617,35 @@ def composite_audioclips(
                 ...
         if duration == 0.0:
             raise ValueError("duration is not set of any clip")
-        bg_audio = SilenceClip(duration, fps, channels)
-
-    frames = []
-    t = 0.0
-    td = 1 / fps
-    if not bg_audio.duration:
-        raise ValueError("Background audio duration is not set")
-    while t < bg_audio.duration:
-        f: list = bg_audio.get_frame_at_t(t).tolist()
-        if len(f) < channels:
-            f.append((sum(f) / len(f)) * (channels - len(f)))
-
-        for clip in clips:
-            if clip.start <= t <= (clip.end or float("inf")):
-                f_c = list(clip.get_frame_at_t(t))
-                if len(f_c) < channels:
-                    f_c.append((sum(f_c) / len(f_c)) * (channels - len(f_c)))
-                for i in range(channels):
-                    f[i] += (f[i] + f_c[i]) / 2
-        frames.append(np.array(f))
-        t += td
-    return AudioArrayClip(
-        np.array(frames),
-        fps,
-        bg_audio.duration,
-    )
+        # The background is silence, which the zeroed output already is
+        layers = [
+            (clip, clip.start, clip.end or float("inf"), g)
+            for clip, g in zip(clips, gains)
+        ]
+
+    # Sample i is at time i / fps, the samples are those of the times in [0, duration); the products are rounded
+    # first so float noise in them does not add or drop a sample
+    length = int(np.ceil(round(duration * fps, 6)))
+    frames = np.zeros((length, channels), dtype=np.float32)
+    for clip, start, end, clip_gain in layers:
+        if not clip.channels:
+            raise ValueError("clip channels is not set")
+        matrix = (channel_mix_matrix(clip.channels, channels).T * clip_gain).astype(np.float32)
+        # The samples at times in [start, end]
+        first = min(max(int(np.ceil(round(start * fps, 6))), 0), length)
+        last = length if end == float("inf") else min(int(np.floor(round(end * fps, 6))) + 1, length)
+        for i in range(first, last, block_size):
+            j = min(i + block_size, last)
+            if clip.fps and clip.fps != fps:
+                block = clip.get_frames_at_rate(fps, i, j)
+            else:
+                block = clip.get_frames_at_t(np.arange(i, j) / fps)
+            frames[i:j] += _to_sample_format(_as_frames(block), np.float32) @ matrix
+
+    for i in range(0, len(frames), block_size):
+        block = frames[i : i + block_size]
+        if clipping == "hard":
+            np.clip(block, -1.0, 1.0, out=block)
+        elif clipping == "soft":
+            _soft_clip(block)
+    return AudioArrayClip(frames, fps, duration)
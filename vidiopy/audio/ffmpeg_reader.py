@@ -0,0 +1,408 @@
+"""
+This module contains the block reader used by the lazy AudioFileClip.
+
+Instead of decoding a whole audio stream into memory, the reader keeps one ffmpeg process open and pulls raw
+samples from its stdout pipe as they are requested. Reading on from where the last block ended continues the
+same process, anything else restarts ffmpeg with an input seek, so a block at any time costs O(block).
+
+Alternatively `pcm_scratch` decodes a stream once to a raw PCM file in `config.SCRATCH_DIR` and maps it with
+`np.memmap`. The file is keyed by the path, size and modification time of the source, so every clip of the same
+soundtrack, in this process or another, maps the same file and shares its pages.
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import ffmpegio
+import numpy as np
+import numpy.typing as npt
+from ..video.frame_cache import file_source
+from .. import config
+
+__all__ = ["FFmpegAudioReader", "pcm_scratch", "decoded_length", "sample_format_of"]
+
+# The raw ffmpeg format and NumPy dtype of each packed sample format.
+SAMPLE_FORMATS = {
+    "u8": ("u8", np.uint8),
+    "s16": ("s16le", np.int16),
+    "s32": ("s32le", np.int32),
+    "s64": ("s64le", np.int64),
+    "flt": ("f32le", np.float32),
+    "dbl": ("f64le", np.float64),
+}
+
+# Samples decoded and dropped before a seek point: decoders of compressed formats like AAC need the packets
+# before it to rebuild the first samples after a seek exactly.
+SEEK_PREROLL = 4096
+
+# Maps of the scratch files opened by this process, by source.
+_pcm_maps: dict = {}
+
+# Seconds at the end of a stream decoded to count its samples. Probed durations are estimates: they include the
+# padding of the last packet, or are guessed from the bitrate, while only the decoded samples can be read.
+COUNT_TAIL = 10.0
+
+# Decoded lengths of the ends of streams, by source and start.
+_decoded_lengths: dict = {}
+
+
+def sample_format_of(dtype: npt.DTypeLike) -> str:
+    """
+    Returns the packed ffmpeg sample format of a NumPy sample type.
+
+    Args:
+        dtype (npt.DTypeLike): The sample type, like np.float32 or np.int16.
+
+    Returns:
+        str: One of the keys of `SAMPLE_FORMATS`.
+
+    Raises:
+        ValueError: If ffmpeg has no packed sample format of that type.
+    """
+    for sample_fmt, (_, sample_dtype) in SAMPLE_FORMATS.items():
+        if np.dtype(sample_dtype) == np.dtype(dtype):
+            return sample_fmt
+    raise ValueError(f"No sample format for {np.dtype(dtype)}")
+
+
+def _decode_args(
+    filename: str, rate: int, channels: int, sample_fmt: str, start: float = 0.0
+) -> list[str]:
+    """
+    Returns the ffmpeg command writing the raw samples of a file from `start` seconds on to stdout.
+    """
+    args = [config.FFMPEG_BINARY or ffmpegio.get_path(), "-v", "error", "-nostdin"]
+    if start > 0:
+        args += ["-ss", repr(float(start))]
+    fmt = SAMPLE_FORMATS[sample_fmt][0]
+    args += ["-i", filename, "-vn", "-sn", "-map", "0:a:0"]
+    args += ["-f", fmt, "-c:a", f"pcm_{fmt}", "-ar", str(rate), "-ac", str(channels), "-"]
+    return args
+
+
+class FFmpegAudioReader:
+    """
+    A class used to decode blocks of samples of an audio file on demand.
+
+    The reader keeps a single ffmpeg process running which writes raw samples to a pipe. A request starting where
+    the previous one stopped, or a little after, reads on from the pipe; the samples of the previous request are
+    kept, so requests overlapping it, like the ones of the resampler, need no new decode. Any other request restarts
+    ffmpeg with an input seek.
+
+    A reader inherited by a forked process leaves the ffmpeg process of its parent alone and starts its own on the
+    first request.
+
+    Attributes:
+        filename (str): The path of the audio file.
+        rate (int): The sample rate of the audio stream.
+        channels (int): The number of channels of the audio stream.
+        sample_fmt (str): The packed sample format of the decoded samples, see `SAMPLE_FORMATS`.
+        offset (float): The time of sample 0 in the file, in seconds.
+        length (int | None): The number of samples from `offset` on, None for up to the end of the stream.
+
+    Methods:
+        read(start, stop): Returns the samples [start, stop).
+        close(): Stops the ffmpeg process and drops the kept samples.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        rate: int,
+        channels: int,
+        sample_fmt: str = "flt",
+        offset: float = 0.0,
+        length: int | None = None,
+    ) -> None:
+        """
+        Initializes a new instance of the FFmpegAudioReader class.
+
+        No ffmpeg process is started until the first block is requested.
+
+        Args:
+            filename (str): The path of the audio file.
+            rate (int): The sample rate of the audio stream.
+            channels (int): The number of channels of the audio stream.
+            sample_fmt (str, optional): The packed sample format to decode to. Defaults to "flt".
+            offset (float, optional): The time of sample 0 in the file, in seconds. Defaults to 0.0.
+            length (int | None, optional): The number of samples from `offset` on. Defaults to None, up to the end.
+
+        Raises:
+            ValueError: If the sample format is not supported.
+        """
+        if sample_fmt not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format '{sample_fmt}'")
+        self.filename = str(filename)
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.sample_fmt = sample_fmt
+        self.offset = float(offset)
+        self.length = length
+        self.dtype = np.dtype(SAMPLE_FORMATS[sample_fmt][1])
+        self._proc: subprocess.Popen | None = None
+        self._pid = os.getpid()
+        self._pos = 0
+        self._kept_start = 0
+        self._kept = np.zeros((0, self.channels), dtype=self.dtype)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(filename={self.filename}, rate={self.rate}, channels={self.channels}, sample_fmt={self.sample_fmt}, offset={self.offset}, length={self.length})"
+
+    def __copy__(self) -> "FFmpegAudioReader":
+        # A copy must never share the ffmpeg pipe, it gets its own process on first use.
+        return self.__class__(
+            self.filename,
+            self.rate,
+            self.channels,
+            self.sample_fmt,
+            self.offset,
+            self.length,
+        )
+
+    def __del__(self) -> None:
+        self.close()
+
+    def read(self, start: int, stop: int) -> npt.NDArray:
+        """
+        Returns the samples [start, stop), counted from `offset`.
+
+        Samples before 0, after `length` or after the end of the stream are silent.
+
+        Args:
+            start (int): The index of the first sample.
+            stop (int): The index after the last sample.
+
+        Returns:
+            npt.NDArray: The samples, shaped (stop - start, channels).
+        """
+        start, stop = int(start), int(stop)
+        samples = np.zeros((max(0, stop - start), self.channels), dtype=self.dtype)
+        first = max(start, 0)
+        last = stop if self.length is None else min(stop, self.length)
+        if first >= last:
+            return samples
+
+        kept_stop = self._kept_start + len(self._kept)
+        if self._kept_start <= first < kept_stop:
+            # Overlaps the previous request
+            n = min(last, kept_stop) - first
+            samples[first - start : first - start + n] = self._kept[
+                first - self._kept_start : first - self._kept_start + n
+            ]
+            first += n
+        if first < last:
+            if self._proc is not None and self._pid != os.getpid():
+                # The pipe belongs to the process this one was forked from
+                self._proc = None
+            if self._proc is None or not (self._pos <= first <= self._pos + self.rate):
+                self._open(first)
+            # Skips the samples between the current position and the request
+            self._read_samples(first - self._pos)
+            block = self._read_samples(last - first)
+            samples[first - start : first - start + len(block)] = block
+        self._kept_start, self._kept = start, samples
+        return samples
+
+    def close(self) -> None:
+        """
+        Stops the ffmpeg process and drops the kept samples.
+        """
+        self._stop()
+        self._kept = np.zeros((0, self.channels), dtype=self.dtype)
+
+    def _open(self, start: int) -> None:
+        """
+        (Re)starts ffmpeg a little before sample `start`, which the next read skips to.
+
+        Args:
+            start (int): The index of the sample to decode first.
+        """
+        self._stop()
+        # May start before the offset, down to the start of the file
+        start = max(-int(self.offset * self.rate), start - SEEK_PREROLL)
+        self._proc = subprocess.Popen(
+            _decode_args(
+                self.filename,
+                self.rate,
+                self.channels,
+                self.sample_fmt,
+                self.offset + start / self.rate,
+            ),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._pid = os.getpid()
+        self._pos = start
+
+    def _stop(self) -> None:
+        """
+        Terminates the running ffmpeg process, if any.
+        """
+        proc = getattr(self, "_proc", None)
+        if proc is None:
+            return
+        self._proc = None
+        if getattr(self, "_pid", None) != os.getpid():
+            # Never stop the ffmpeg process of the parent of a forked process
+            return
+        try:
+            if proc.stdout:
+                proc.stdout.close()
+            proc.terminate()
+            proc.wait()
+        except Exception:
+            pass
+
+    def _read_samples(self, count: int) -> npt.NDArray:
+        """
+        Reads the next `count` samples from the ffmpeg pipe, fewer at the end of the stream.
+
+        Args:
+            count (int): The number of samples to read.
+
+        Returns:
+            npt.NDArray: The samples, shaped (samples, channels).
+        """
+        frame_bytes = self.channels * self.dtype.itemsize
+        data = bytearray(max(0, count) * frame_bytes)
+        view = memoryview(data)
+        read = 0
+        while read < len(data) and self._proc is not None and self._proc.stdout is not None:
+            n = self._proc.stdout.readinto(view[read:])
+            if not n:
+                self._stop()
+                break
+            read += n
+        count = read // frame_bytes
+        self._pos += count
+        return np.frombuffer(data, dtype=self.dtype, count=count * self.channels).reshape(
+            count, self.channels
+        )
+
+
+def pcm_scratch(
+    filename: str, rate: int, channels: int, sample_fmt: str = "flt"
+) -> np.memmap:
+    """
+    Returns the samples of the first audio stream of a file, decoded once to a scratch file and memory-mapped.
+
+    The scratch file lives in `config.SCRATCH_DIR` under a name derived from the path, size and modification time of
+    the source, so it is reused by every clip of the same file until the file changes.
+
+    Args:
+        filename (str): The path of the audio file.
+        rate (int): The sample rate to decode to.
+        channels (int): The number of channels to decode to.
+        sample_fmt (str, optional): The packed sample format to decode to, see `SAMPLE_FORMATS`. Defaults to "flt", float32.
+
+    Returns:
+        np.memmap: The read-only samples, shaped (samples, channels).
+
+    Raises:
+        IOError: If ffmpeg fails to decode the file.
+
+    Example:
+        >>> pcm_scratch("song.mp3", 44100, 2).shape
+        (9261000, 2)
+    """
+    fmt, dtype = SAMPLE_FORMATS[sample_fmt]
+    source = file_source(str(filename), rate, channels, sample_fmt)
+    samples = _pcm_maps.get(source)
+    if samples is not None:
+        return samples
+    key = hashlib.sha1(repr(source).encode()).hexdigest()
+    path = os.path.join(config.SCRATCH_DIR, f"pcm-{key}.{fmt}")
+    if not os.path.exists(path):
+        os.makedirs(config.SCRATCH_DIR, exist_ok=True)
+        fd, partial = tempfile.mkstemp(suffix=".part", prefix="pcm-", dir=config.SCRATCH_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                result = subprocess.run(
+                    _decode_args(str(filename), rate, channels, sample_fmt),
+                    stdin=subprocess.DEVNULL,
+                    stdout=f,
+                    stderr=subprocess.PIPE,
+                )
+            if result.returncode != 0:
+                raise IOError(
+                    f"ffmpeg failed to decode '{filename}': {result.stderr.decode(errors='replace').strip()}"
+                )
+            # Whole files only, another process may be decoding the same source
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+    count = os.path.getsize(path) // (np.dtype(dtype).itemsize * channels)
+    if count == 0:
+        samples = np.zeros((0, channels), dtype=dtype)
+    else:
+        samples = np.memmap(path, dtype=dtype, mode="r", shape=(count, channels))
+    _pcm_maps[source] = samples
+    return samples
+
+
+def _count_samples(
+    filename: str, rate: int, channels: int, sample_fmt: str, start: float
+) -> int:
+    """
+    Decodes the samples of a file from `start` seconds to the end of its audio stream and counts them.
+    """
+    itemsize = np.dtype(SAMPLE_FORMATS[sample_fmt][1]).itemsize * channels
+    process = subprocess.Popen(
+        _decode_args(filename, rate, channels, sample_fmt, start),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    size = 0
+    assert process.stdout is not None
+    while chunk := process.stdout.read(1 << 20):
+        size += len(chunk)
+    stderr = process.stderr.read() if process.stderr else b""
+    if process.wait() != 0:
+        raise IOError(f"ffmpeg failed to decode '{filename}': {stderr.decode(errors='replace').strip()}")
+    return size // itemsize
+
+
+def decoded_length(
+    filename: str,
+    rate: int,
+    channels: int,
+    sample_fmt: str = "flt",
+    start: float = 0.0,
+    duration: float | None = None,
+) -> int:
+    """
+    Returns the number of samples decoded from `start` seconds to the end of the first audio stream of a file.
+
+    Only the last `COUNT_TAIL` seconds by the probed `duration` are decoded: ffmpeg seeks audio to the sample, so the
+    samples before them are counted from the time. The whole stream from `start` is decoded when the probed duration
+    is unknown or runs past the end of the stream.
+
+    Args:
+        filename (str): The path of the audio file.
+        rate (int): The sample rate to decode to.
+        channels (int): The number of channels to decode to.
+        sample_fmt (str, optional): The packed sample format to decode to, see `SAMPLE_FORMATS`. Defaults to "flt".
+        start (float, optional): The time of the first sample, in seconds. Defaults to 0.0.
+        duration (float | None, optional): The probed duration of the stream, in seconds. Defaults to None.
+
+    Returns:
+        int: The number of samples.
+
+    Raises:
+        IOError: If ffmpeg fails to decode the file.
+    """
+    tail = max(float(start), float(duration) - COUNT_TAIL) if duration else float(start)
+    source = file_source(str(filename), rate, channels, sample_fmt, tail)
+    count = _decoded_lengths.get(source)
+    if count is None:
+        count = _count_samples(str(filename), rate, channels, sample_fmt, tail)
+        _decoded_lengths[source] = count
+    if tail > start and count == 0:
+        # The stream ends before the probed duration says
+        return decoded_length(filename, rate, channels, sample_fmt, start)
+    return int(round((tail - float(start)) * rate)) + count
@@ -0,0 +1,169 @@
+"""
+This module contains the rational polyphase resampler used wherever audio changes sample rate.
+
+A change from `in_rate` to `out_rate` is reduced to the ratio `up / down`. Conceptually the input is upsampled by `up`,
+low-pass filtered below the lower of both Nyquist frequencies and downsampled by `down`; only the taps landing on
+input samples are ever multiplied, so each output sample costs one row of the filter bank. The bank of a pair of rates
+is designed once and cached, and output samples are computed in blocks from any range of input samples, so long
+clips are resampled piecewise without holding more than a block in memory.
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["filter_bank", "input_span", "resampled_length", "resample"]
+
+# Taps of the filter on each side of an output sample, in samples of the lower rate.
+HALF_TAPS = 16
+
+# Shape parameter of the Kaiser window of the filter, about 80 dB of stopband attenuation.
+KAISER_BETA = 8.6
+
+# Largest denominator of the rate ratio, which bounds the size of the filter bank.
+MAX_DENOMINATOR = 1000
+
+# Number of output samples computed with one gather of input samples.
+BLOCK_SIZE = 4096
+
+
+@lru_cache(maxsize=32)
+def filter_bank(
+    in_rate: int | float, out_rate: int | float
+) -> tuple[int, int, npt.NDArray[np.float64]]:
+    """
+    Returns the polyphase filter bank resampling from `in_rate` to `out_rate`, designed once per pair of rates.
+
+    Args:
+        in_rate (int | float): The sample rate of the input.
+        out_rate (int | float): The sample rate of the output.
+
+    Returns:
+        tuple[int, int, npt.NDArray[np.float64]]: The upsampling factor `up`, the downsampling factor `down` and the
+            bank, shaped (up, taps); row `p` holds the taps of phase `p`, most recent input sample first.
+
+    Raises:
+        ValueError: If a rate is not positive.
+
+    Example:
+        >>> up, down, bank = filter_bank(48000, 44100)
+        >>> up, down
+        (147, 160)
+    """
+    if in_rate <= 0 or out_rate <= 0:
+        raise ValueError("sample rates must be positive")
+    ratio = (Fraction(out_rate) / Fraction(in_rate)).limit_denominator(MAX_DENOMINATOR)
+    up, down = ratio.numerator, ratio.denominator
+    if up == down:
+        return 1, 1, np.ones((1, 1))
+    factor = max(up, down)
+    length = 2 * HALF_TAPS * factor + 1
+    # Windowed sinc at the upsampled rate, cut off at the lower Nyquist frequency
+    n = np.arange(length) - (length - 1) / 2
+    taps = np.sinc(n / factor) * np.kaiser(length, KAISER_BETA)
+    # Every phase sums to about one, so the gain of the zero stuffing is compensated
+    taps *= up / taps.sum()
+    phases = -(-length // up)
+    bank = np.zeros(phases * up)
+    bank[:length] = taps
+    return up, down, bank.reshape(phases, up).T.copy()
+
+
+def _phase_positions(
+    up: int, down: int, indices: npt.NDArray[np.int64]
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Returns the phase and the most recent input sample of each output sample.
+    """
+    # Centers the filter on the output sample, so the output is not delayed
+    position = indices * down + (HALF_TAPS * max(up, down) if up != down else 0)
+    return position % up, position // up
+
+
+def input_span(
+    in_rate: int | float, out_rate: int | float, start: int, stop: int
+) -> tuple[int, int]:
+    """
+    Returns the range of input samples which the output samples [start, stop) are computed from.
+
+    Args:
+        in_rate (int | float): The sample rate of the input.
+        out_rate (int | float): The sample rate of the output.
+        start (int): The index of the first output sample.
+        stop (int): The index after the last output sample.
+
+    Returns:
+        tuple[int, int]: The index of the first input sample and the index after the last one, which may lie outside the input.
+    """
+    up, down, bank = filter_bank(in_rate, out_rate)
+    if stop <= start:
+        return start, start
+    _, last = _phase_positions(up, down, np.array([start, stop - 1]))
+    return int(last[0]) - bank.shape[1] + 1, int(last[1]) + 1
+
+
+def resampled_length(in_rate: int | float, out_rate: int | float, samples: int) -> int:
+    """
+    Returns the number of output samples of `samples` input samples.
+
+    Args:
+        in_rate (int | float): The sample rate of the input.
+        out_rate (int | float): The sample rate of the output.
+        samples (int): The number of input samples.
+
+    Returns:
+        int: The number of output samples.
+    """
+    up, down, _ = filter_bank(in_rate, out_rate)
+    return -(-samples * up // down)
+
+
+def resample(
+    samples: np.ndarray,
+    in_rate: int | float,
+    out_rate: int | float,
+    indices: npt.ArrayLike | None = None,
+    offset: int = 0,
+) -> np.ndarray:
+    """
+    Resamples audio samples from `in_rate` to `out_rate` with the polyphase filter bank of the pair of rates.
+
+    `samples` may be a part of a longer input: its first sample is input sample `offset`, and the input is taken as
+    silent outside of it. With `input_span`, long inputs are resampled block by block with the same result as at once.
+
+    Args:
+        samples (np.ndarray): The input samples, shaped (samples,) or (samples, channels).
+        in_rate (int | float): The sample rate of the input.
+        out_rate (int | float): The sample rate of the output.
+        indices (npt.ArrayLike | None, optional): The indices of the output samples to compute. Defaults to every output
+            sample of `samples`, when `offset` is 0.
+        offset (int, optional): The index of the input sample `samples[0]`. Defaults to 0.
+
+    Returns:
+        np.ndarray: The output samples, shaped (len(indices),) or (len(indices), channels).
+
+    Example:
+        >>> resample(np.ones((22050, 2)), 22050, 44100).shape
+        (44100, 2)
+    """
+    up, down, bank = filter_bank(in_rate, out_rate)
+    samples = np.asarray(samples)
+    if indices is None:
+        indices = np.arange(resampled_length(in_rate, out_rate, offset + len(samples)))
+    indices = np.asarray(indices, dtype=np.int64)
+    frames = samples[:, None] if samples.ndim == 1 else samples
+    taps = bank.shape[1]
+    # Zeros around the input stand for the silence outside of it
+    padded = np.zeros((len(frames) + 2 * taps, frames.shape[1]))
+    padded[taps : taps + len(frames)] = frames
+    output = np.empty((len(indices), frames.shape[1]))
+    for i in range(0, len(indices), BLOCK_SIZE):
+        block = indices[i : i + BLOCK_SIZE]
+        phases, last = _phase_positions(up, down, block)
+        positions = last[:, None] - np.arange(taps) - offset + taps
+        np.clip(positions, 0, len(padded) - 1, out=positions)
+        output[i : i + len(block)] = np.einsum(
+            "mk,mkc->mc", bank[phases], padded[positions]
+        )
+    return output[:, 0] if samples.ndim == 1 else output
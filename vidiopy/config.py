@@ -1,14 +1,47 @@
 """This module manages the configuration of ffmpeg and ffprobe binaries."""
 
 import os
+import tempfile
 from typing_extensions import Union
 import ffmpegio
 
-__all__ = ["FFMPEG_BINARY", "FFPROBE_BINARY", "set_path"]
+__all__ = [
+    "FFMPEG_BINARY",
+    "FFPROBE_BINARY",
+    "VIDEO_READER_BUFFER_SIZE",
+    "FRAME_CACHE_MAX_BYTES",
+    "WRITE_QUEUE_SIZE",
+    "CACHE_DIR",
+    "SCRATCH_DIR",
+    "AUDIO_SAMPLE_FORMAT",
+    "set_path",
+]
 
 FFMPEG_BINARY = None
 FFPROBE_BINARY = None
 
+# Number of decoded frames a lazy video reader keeps around for re-use.
+VIDEO_READER_BUFFER_SIZE = 8
+
+# Byte budget of the decoded frame cache shared by all clips of the process. 0 disables it.
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Number of rendered frames which may wait for the encoder while writing a video file.
+WRITE_QUEUE_SIZE = 8
+
+# Directory for persistent caches, like the keyframe indexes of video files.
+CACHE_DIR = os.environ.get(
+    "VIDIOPY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "vidiopy")
+)
+
+# Directory for temporary files, like the raw frame files backing memory-mapped clips.
+SCRATCH_DIR = os.environ.get(
+    "VIDIOPY_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "vidiopy")
+)
+
+# Sample type of the audio buffers vidiopy decodes, mixes and writes: "float32" or "int16".
+AUDIO_SAMPLE_FORMAT = "float32"
+
 try:
     try:
         FFMPEG_BINARY = ffmpegio.get_path()
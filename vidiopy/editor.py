@@ -15,7 +15,12 @@ from vidiopy.Clip import Clip
 from vidiopy.video.VideoClip import VideoClip
 from vidiopy.video.VideoFileClip import VideoFileClip
 from vidiopy.video.ImageSequenceClip import ImageSequenceClip
-from vidiopy.video.mixing_clip import composite_videoclips, concatenate_videoclips
+from vidiopy.video.mixing_clip import (
+    CompositeVideoClip,
+    ConcatenateVideoClip,
+    composite_videoclips,
+    concatenate_videoclips,
+)
 from vidiopy.video.ImageClips import ImageClip, ColorClip, TextClip, Data2ImageClip, RectangleClip, CircleClip
 import vidiopy.video.fx as video_fx
 
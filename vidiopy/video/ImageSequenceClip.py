@@ -7,6 +7,8 @@ import numpy as np
 import numpy.typing as npt
 from ..decorators import *
 from .VideoClip import VideoClip
+from .frame_cache import frame_cache, file_source
+from .frame_store import write_frame_store
 
 
 class ImageSequenceClip(VideoClip):
@@ -15,8 +17,12 @@ class ImageSequenceClip(VideoClip):
 
     This class extends the VideoClip class and provides additional functionality for handling sequences of images. It allows for the creation of a video clip from a sequence of images, with the ability to specify the frames per second (fps) and duration of the clip. The sequence of images can be provided as a tuple of PIL Images, paths to images, numpy arrays, or a path to a directory. The class also provides methods for importing the image sequence, generating a numpy array or PIL Image representation of a specific frame in the clip, and applying a function to each frame of the clip.
 
+    Image files are decoded lazily by default: only the requested frames are decoded, and they are shared with other clips through the process-wide frame cache.
+
     Attributes:
-        clip (tuple[Image.Image, ...]): The sequence of images as a tuple of PIL Images.
+        clip (npt.NDArray[np.uint8]): The sequence of images as a numpy array, decoded on first access for lazy clips.
+        lazy (bool): Whether the frames are decoded from the image files on demand.
+        memmap (bool): Whether stacked frames are kept in a memory-mapped file instead of RAM.
         fps (int | float | None): The frames per second of the clip.
         _dur (int | float | None): The duration of the clip in seconds.
         audio (optional): The audio of the clip.
@@ -39,10 +45,13 @@ class ImageSequenceClip(VideoClip):
             | Sequence[Image.Image]
             | Sequence[np.ndarray]
             | Sequence[str | Path]
+            | np.ndarray
         ),
         fps: int | float | None = None,
         duration: int | float | None = None,
         audio=None,
+        lazy: bool = True,
+        memmap: bool = False,
     ):
         """
         Initializes an instance of the ImageSequenceClip class.
@@ -50,10 +59,12 @@ class ImageSequenceClip(VideoClip):
         This method imports an image sequence from the specified sequence, sets the fps and duration of the image sequence clip, and sets the audio of the image sequence clip if specified.
 
         Args:
-            sequence (str | Path | tuple[Image.Image, ...] | tuple[np.ndarray, ...] | tuple[str | Path, ...]): The sequence to import. It can be a tuple of PIL Images, paths to images, numpy arrays, or a path to a directory.
+            sequence (str | Path | tuple[Image.Image, ...] | tuple[np.ndarray, ...] | tuple[str | Path, ...] | np.ndarray): The sequence to import. It can be a tuple of PIL Images, paths to images, numpy arrays, a path to a directory, or an array of stacked frames, which is used without copying.
             fps (int | float | None, optional): The frames per second of the image sequence clip. If not specified, it is calculated from the duration and the number of images in the sequence.
             duration (int | float | None, optional): The duration of the image sequence clip in seconds. If not specified, it is calculated from the fps and the number of images in the sequence.
             audio (optional): The audio of the image sequence clip. If not specified, the image sequence clip will have no audio.
+            lazy (bool, optional): If True and the sequence is made of image files, the images are decoded on demand through the frame cache instead of all at once. Defaults to True.
+            memmap (bool, optional): Whether to stack the frames into a memory-mapped file in `config.SCRATCH_DIR` instead of RAM. Defaults to False.
 
         Raises:
             ValueError: If neither fps nor duration is specified.
@@ -68,25 +79,104 @@ class ImageSequenceClip(VideoClip):
         # method body goes here
         super().__init__()
 
-        self.clip: npt.NDArray[np.uint8] = self._import_image_sequence(sequence)
+        self._clip: npt.NDArray[np.uint8] | None = None
+        self.memmap = memmap
+        self._paths: list[str] | None = self._image_paths(sequence) if lazy else None
+        self.lazy = self._paths is not None
+        if self._paths is None:
+            self.clip = self._import_image_sequence(sequence, memmap)
+        elif not self._paths:
+            raise ValueError("The image sequence is empty.")
         # Check if the images have the same size
         if fps is not None and duration is not None:
             self.fps = fps
             self._dur = duration
         elif fps is None and duration is not None:
-            self.fps = len(self.clip) / duration
+            self.fps = self._frame_count / duration
             self._dur = duration
         elif duration is None and fps is not None:
             self.fps = fps
-            self._dur = len(self.clip) / fps
+            self._dur = self._frame_count / fps
         else:
             raise ValueError("You must specify either fps or duration.")
-        self.size = self.clip[0].shape[:2][::-1]
+        if self._paths is not None:
+            with Image.open(self._paths[0]) as image:
+                self.size = image.size
+        else:
+            self.size = self.clip[0].shape[:2][::-1]
         if audio is not None:
             self.set_audio(audio)
 
+    @property
+    def clip(self) -> npt.NDArray[np.uint8]:
+        """
+        The frames of the image sequence clip.
+
+        For a lazy clip all images are decoded and stacked on first access, into a memory-mapped file with `memmap`.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frames, stacked along the first axis.
+        """
+        if self._clip is None and self._paths is not None:
+            frames = (self._load_frame(i) for i in range(len(self._paths)))
+            self._clip = (
+                write_frame_store(frames) if self.memmap else np.stack(tuple(frames))
+            )
+        return self._clip  # type: ignore
+
+    @clip.setter
+    def clip(self, clip: npt.NDArray[np.uint8]) -> None:
+        self._clip = clip
+        # The frames no longer come from the image files.
+        self._paths = None
+        self.lazy = False
+
+    @property
+    def _frame_count(self) -> int:
+        """
+        The number of frames of the image sequence clip, without decoding the images.
+
+        Returns:
+            int: The number of images.
+        """
+        if self._clip is None and self._paths is not None:
+            return len(self._paths)
+        return len(self.clip)
+
+    def _load_frame(self, index: int) -> npt.NDArray[np.uint8]:
+        """
+        Decodes an image of a lazy clip, going through the frame cache.
+
+        Args:
+            index (int): The index of the image.
+
+        Returns:
+            npt.NDArray[np.uint8]: The read-only frame.
+        """
+        path = self._paths[index]  # type: ignore
+        key = (file_source(path), 0, "native", None)
+        frame = frame_cache.get(key)
+        if frame is None:
+            with Image.open(path) as image:
+                frame = frame_cache.put(key, np.array(image))
+        return frame
+
+    def _get_frame(self, index: int) -> npt.NDArray[np.uint8]:
+        """
+        Returns a frame of the image sequence clip, decoding only that image for lazy clips.
+
+        Args:
+            index (int): The index of the frame.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frame.
+        """
+        if self._clip is None and self._paths is not None:
+            return self._load_frame(index)
+        return self.clip[index]
+
     def __eq__(self, other) -> bool:
-        if not hasattr(self, "clip"):
+        if not hasattr(self, "_clip"):
             return False
         return (
             isinstance(other, VideoClip)
@@ -99,6 +189,41 @@ class ImageSequenceClip(VideoClip):
             and np.array_equal(self.clip, other.clip)
         )
 
+    @staticmethod
+    def _image_paths(
+        sequence: (
+            str
+            | Path
+            | Sequence[str | Path]
+            | Sequence[Image.Image]
+            | Sequence[np.ndarray]
+        ),
+    ) -> list[str] | None:
+        """
+        Lists the image files of a sequence.
+
+        Args:
+            sequence (str | Path | tuple[str | Path] | tuple[Image.Image] | tuple[np.ndarray]): The sequence to import.
+
+        Returns:
+            list[str] | None: The sorted image files of a directory, the given paths, or None if the sequence is not made of files.
+        """
+        if isinstance(sequence, np.ndarray):
+            return None
+        if isinstance(sequence, (str, Path)):
+            files = [
+                os.path.join(sequence, file)
+                for file in os.listdir(sequence)
+                if os.path.isfile(os.path.join(sequence, file))
+                and os.path.splitext(file)[1].lower()
+                in set(Image.registered_extensions().keys())
+            ]
+            files.sort()
+            return files
+        if len(sequence) and all(isinstance(item, (str, Path)) for item in sequence):
+            return [str(item) for item in sequence]
+        return None
+
     def _import_image_sequence(
         self,
         sequence: (
@@ -107,7 +232,9 @@ class ImageSequenceClip(VideoClip):
             | Sequence[str | Path]
             | Sequence[Image.Image]
             | Sequence[np.ndarray]
+            | np.ndarray
         ),
+        memmap: bool = False,
     ) -> npt.NDArray[np.uint8]:
         """
         Imports an image sequence from a tuple of PIL Images, paths to images, numpy arrays, or a path to a directory.
@@ -115,7 +242,8 @@ class ImageSequenceClip(VideoClip):
         This method checks the type of the sequence argument and imports the image sequence accordingly. If the sequence is a tuple of PIL Images, it returns the sequence as is. If the sequence is a tuple of numpy arrays, it converts each numpy array to a PIL Image. If the sequence is a tuple of paths to images, it opens each image and returns a tuple of PIL Images. If the sequence is a path to a directory, it opens all images in the directory and returns a tuple of PIL Images.
 
         Args:
-            sequence (str | Path | tuple[str | Path] | tuple[Image.Image] | tuple[np.ndarray]): The sequence to import. It can be a tuple of PIL Images, paths to images, numpy arrays, or a path to a directory.
+            sequence (str | Path | tuple[str | Path] | tuple[Image.Image] | tuple[np.ndarray] | np.ndarray): The sequence to import. It can be a tuple of PIL Images, paths to images, numpy arrays, a path to a directory, or an array of stacked frames.
+            memmap (bool, optional): Whether to stack the frames into a memory-mapped FrameStore instead of RAM. Defaults to False.
 
         Returns:
             tuple[Image.Image, ...]: The imported image sequence as a tuple of PIL Images.
@@ -130,28 +258,28 @@ class ImageSequenceClip(VideoClip):
         Note:
             This method uses the PIL Image class to open images and convert numpy arrays to images.
         """
+        if isinstance(sequence, np.ndarray) and (
+            not memmap or isinstance(sequence, np.memmap)
+        ):
+            # Already stacked frames, used without copying
+            return sequence
         if isinstance(sequence, (str, Path)):
-            # use set comprehension to remove duplicates
-            files = [
-                os.path.join(sequence, file)
-                for file in os.listdir(sequence)
-                if os.path.isfile(os.path.join(sequence, file))
-                and os.path.splitext(file)[1].lower()
-                in set(Image.registered_extensions().keys())
-            ]
-            files.sort()
-            return np.stack(tuple(map(np.array, map(Image.open, files))))
+            frames = map(np.array, map(Image.open, self._image_paths(sequence)))
         elif isinstance(sequence[0], Image.Image):
-            return np.stack(tuple(map(np.array, sequence)))
+            frames = map(np.array, sequence)
         elif isinstance(sequence[0], np.ndarray):
-            return np.stack(sequence, axis=0)
+            frames = iter(sequence)
         elif isinstance(sequence[0], (str, Path)) or (
             hasattr(sequence[0], "read") and callable(getattr(sequence[0], "read"))
         ):
-            return np.stack(tuple(map(np.array, map(Image.open, sequence))))
-        raise TypeError(
-            "The argument must be either a tuple of PIL images or paths to images or a path to a directory."
-        )
+            frames = map(np.array, map(Image.open, sequence))
+        else:
+            raise TypeError(
+                "The argument must be either a tuple of PIL images or paths to images or a path to a directory."
+            )
+        if memmap:
+            return write_frame_store(frames)
+        return np.stack(tuple(frames), axis=0)
 
     @requires_duration_or_end
     def make_frame_array(self, t: int | float) -> np.ndarray:
@@ -176,10 +304,11 @@ class ImageSequenceClip(VideoClip):
         Note:
             This method uses the duration or end of the image sequence clip to calculate the time per frame.
         """
-        time_per_frame = (self.duration if self.duration else self.end) / len(self.clip)
+        frame_count = self._frame_count
+        time_per_frame = (self.duration if self.duration else self.end) / frame_count
         frame_index = math.floor(t / time_per_frame)
-        frame_index = min(len(self.clip) - 1, max(0, frame_index))
-        return self.clip[frame_index]
+        frame_index = min(frame_count - 1, max(0, frame_index))
+        return self._get_frame(frame_index)
 
     @requires_duration_or_end
     def make_frame_pil(self, t: int | float) -> Image.Image:
@@ -206,10 +335,11 @@ class ImageSequenceClip(VideoClip):
         """
         if self.duration is None and self.end is None:
             raise ValueError("either duration or end must be set")
-        time_per_frame = (self.duration if self.duration else self.end) / len(self.clip)
+        frame_count = self._frame_count
+        time_per_frame = (self.duration if self.duration else self.end) / frame_count
         frame_index = math.floor(t / time_per_frame)
-        frame_index = min(len(self.clip) - 1, max(0, frame_index))
-        return Image.fromarray(self.clip[frame_index])
+        frame_index = min(frame_count - 1, max(0, frame_index))
+        return Image.fromarray(self._get_frame(frame_index))
 
     def fl_frame_transform(
         self, func: Callable[..., npt.NDArray[np.uint8]], *args, **kwargs
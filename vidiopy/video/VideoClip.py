@@ -1,9 +1,11 @@
 from rich import print as rich_print
-from functools import wraps
 import rich.progress as progress
 from fractions import Fraction
 import os
 from copy import copy as copy_
+import multiprocessing
+from multiprocessing.connection import wait
+import shutil
 import subprocess
 import tempfile
 from typing import Callable, Generator, Any, Self
@@ -14,6 +16,31 @@ from ..Clip import Clip
 from ..audio.AudioClip import AudioClip
 from ..decorators import requires_size, requires_fps
 from .. import config
+from .ffmpeg_writer import FFmpegVideoWriter, concat_video_files, supports_audio_pipe
+from .effect_graph import (
+    Node,
+    SourceNode,
+    FrameOpNode,
+    TimeRemapNode,
+    apply_node,
+    graph_of,
+)
+
+
+def _audio_options(ffmpeg_options: dict) -> dict:
+    """
+    Picks the audio options from the options of `VideoClip.write_videofile`, for the ffmpeg process which adds the audio.
+
+    Args:
+        ffmpeg_options (dict): The ffmpegio style options of the output.
+
+    Returns:
+        dict: The audio codec, aac by default, sample rate and bitrate options.
+    """
+    return {
+        "c:a": ffmpeg_options.get("c:a", "aac"),
+        **{k: ffmpeg_options[k] for k in ("ar", "b:a") if k in ffmpeg_options},
+    }
 
 
 class VideoClip(Clip):
@@ -375,6 +402,12 @@ class VideoClip(Clip):
             # Set the attribute in the new instance
             setattr(new_clip, attr, copy_(value))
 
+        # The effects of the copy render the frames of the copy, not of this clip
+        if "_graph" in self.__dict__:
+            graph = graph_of(self)
+            if graph is self._graph:
+                apply_node(new_clip, graph.rebase(self, new_clip))
+
         # Return the shallow copy
         return new_clip
 
@@ -385,6 +418,29 @@ class VideoClip(Clip):
     # EFFECT METHODS  F I L T E R I N G#
     ####################################
 
+    @property
+    def graph(self) -> Node:
+        """
+        The node at the top of the effect graph of the clip, which renders its frames.
+
+        Effects applied with `fx` and the `fl_*` methods add nodes on top of the graph, see `vidiopy.video.effect_graph`.
+
+        Returns:
+            Node: The top node, the source node of the clip if no effect was applied.
+
+        Example:
+        >>> clip = VideoFileClip("video.mp4").fx(vidiopy.speedx, 2)
+        >>> [node.__class__.__name__ for node in clip.graph.walk()]
+        ['TimeRemapNode', 'SourceNode']
+        """
+        return graph_of(self)
+
+    def _source_node(self) -> Node:
+        """
+        Returns the node rendering the frames of the clip before any effect.
+        """
+        return SourceNode(self)
+
     def make_frame_array(self, t) -> np.ndarray:
         """
         Generate a frame at time `t` as a NumPy array.
@@ -521,18 +577,32 @@ class VideoClip(Clip):
         >>> for frame in clip.iterate_frames_array_t(24):
         ...     # Do something with frame
         """
+        for t in self._frame_times(fps):
+            yield self.make_frame_array(t)
+
+    def _frame_times(self, fps: int | float) -> list[float]:
+        """
+        Returns the times of the frames rendered by `iterate_frames_array_t`.
+
+        Parameters:
+            fps (int | float): The frames per second at which to generate frames.
+
+        Raises:
+            ValueError: If neither end nor duration is set.
+
+        Returns:
+            list[float]: The times, from 0 to the end or duration, whichever is set.
+        """
+        end = self.end if self.end is not None else self.duration
+        if end is None:
+            raise ValueError("end or duration must be set.")
         time_dif = 1 / fps
+        times = []
         t = 0
-        if self.end is not None:
-            while t < self.end:
-                yield self.make_frame_array(t)
-                t += time_dif
-        elif self.duration is not None:
-            while t < self.duration:
-                yield self.make_frame_array(t)
-                t += time_dif
-        else:
-            raise ValueError("end or duration must be set.")
+        while t < end:
+            times.append(t)
+            t += time_dif
+        return times
 
     def sub_clip_copy(
         self, t_start: int | float | None = None, t_end: int | float | None = None
@@ -582,8 +652,9 @@ class VideoClip(Clip):
         """
         Apply a frame transformation function to each frame of the video clip.
 
-        This method calls the provided function `func` on each frame of the clip and applies the transformation.
-        The transformed frames are then stored in a list and assigned back to the clip.
+        This method adds a `FrameOpNode` to the effect graph of the clip, which calls the provided function `func`
+        on each frame when it is generated. Subclasses storing their frames may override it to transform the
+        stored frames instead.
 
         Parameters:
             - func: The frame transformation function to be applied.
@@ -602,36 +673,28 @@ class VideoClip(Clip):
             >>> clip.fl_frame_transform(grayscale)
 
         Note:
-            - This method is meant to be overridden in the subclass. If not overridden, it raises a NotImplementedError.
             - The transformation function `func` should accept a single frame as the first argument and return the transformed frame.
 
         """
-        raise NotImplementedError(
-            "fl_frame_transform method must be overridden in the subclass."
-        )
-        return self
+        return apply_node(self, FrameOpNode(self.graph, func, args, kwargs))
 
     def fl_clip_transform(self, func, *args, **kwargs) -> Self:
         """\
-        Apply a function to the entire video clip, generating a new clip.
-        calls the function func on the clip. like below
-        >>> frames = []
-        >>> for frame in clip._Depends_upon_sub_class_:
-        >>>     frame = func(frame, frame_time, *args, **kwargs)
-        >>>     frames.append(frame)
-        >>> clip._Depends_upon_sub_class_ = tuple(frames)
+        Apply a function to each frame of the clip along with its time.
+
+        This method adds a timed `FrameOpNode` to the effect graph of the clip, which
+        calls the function func on each frame when it is generated, like below
+        >>> frame = func(frame, frame_time, *args, **kwargs)
+        Subclasses storing their frames may override it to transform the stored frames instead.
         """
-        raise NotImplementedError(
-            "fl_clip_transform method must be overridden in the subclass."
-        )
-        return self
+        return apply_node(self, FrameOpNode(self.graph, func, args, kwargs, timed=True))
 
     def fl_time_transform(self, func_t: Callable[[int | float], int | float]) -> Self:
         """
         Apply a time transformation function to the clip.
 
-        This method modifies the `make_frame_array` and `make_frame_pil` methods
-        to apply a time transformation function `func_t` to the time `t` before
+        This method adds a `TimeRemapNode` to the effect graph of the clip, which
+        applies a time transformation function `func_t` to the time `t` before
         generating the frame. This can be used to speed up, slow down, or reverse
         the clip, among other things.
 
@@ -647,21 +710,7 @@ class VideoClip(Clip):
         >>> clip = VideoClip()
         >>> clip.fl_time_transform(lambda t: 2*t)  # Speed up the clip by a factor of 2
         """
-        original_make_frame_pil_t = self.make_frame_pil
-        original_make_frame_array_t = self.make_frame_array
-
-        @wraps(original_make_frame_array_t)
-        def modified_make_frame_array_t(t):
-            transformed_t = func_t(t)
-            return original_make_frame_array_t(transformed_t)
-
-        @wraps(original_make_frame_pil_t)
-        def modified_make_frame_pil_t(t):
-            transformed_t = func_t(t)
-            return original_make_frame_pil_t(transformed_t)
-
-        self.make_frame_array = modified_make_frame_array_t
-        self.make_frame_pil = modified_make_frame_pil_t
+        apply_node(self, TimeRemapNode(self.graph, func_t))
 
         if self.audio:
             self.audio = self.audio.fl_time_transform(func_t)
@@ -775,12 +824,24 @@ class VideoClip(Clip):
         logger="bar",
         over_write_output=True,
         show_log=False,
+        single_pass=True,
+        workers: int | None = None,
+        stream_copy: bool = True,
+        smart_cut: bool = False,
     ) -> Self:
         """
         Writes the video clip to a file.
 
         This method generates video frames, processes them, and writes them to a file.
-        If audio is present in the clip, it is also written to the file.
+        The frames are piped to ffmpeg while they are rendered, through a queue of at most `config.WRITE_QUEUE_SIZE` frames,
+        so the memory used does not grow with the length of the video.
+        If audio is present in the clip, it is also written to the file. With `single_pass` the samples are piped to the
+        same ffmpeg process as the frames and the file is muxed directly; otherwise, and on systems which cannot pass the
+        extra pipe to ffmpeg, the video and the audio are written to temporary files and muxed afterwards.
+        With `workers`, the timeline is split into GOP-aligned segments which are rendered and encoded in parallel
+        processes, then joined without re-encoding. This needs the fork start method of multiprocessing.
+        With `stream_copy`, a clip whose frames are those of a file, unchanged, is copied from the file without
+        decoding and re-encoding it when no video encoding option is given, see `VideoFileClip`.
 
         Args:
             filename (str): The name of the file to write.
@@ -797,6 +858,11 @@ class VideoClip(Clip):
             ffmpeg_params (dict[str, str] | None, optional): Additional parameters to pass to ffmpeg.
             logger (str, optional): The logger to use. Defaults to "bar".
             over_write_output (bool, optional): Whether to overwrite the output file if it already exists. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+            single_pass (bool, optional): Whether to encode and mux video and audio in one ffmpeg process without temporary files. Defaults to True.
+            workers (int | None, optional): The number of processes rendering and encoding segments of the video. Defaults to None, a single process.
+            stream_copy (bool, optional): Whether to copy the video stream of an unmodified file clip instead of re-encoding it. Defaults to True.
+            smart_cut (bool, optional): Whether a stream copy may re-encode the frames of a cut before its first keyframe and after its last one, instead of re-encoding the whole clip. Defaults to False.
 
         Returns:
             Self: Returns the instance of the class.
@@ -834,30 +900,6 @@ class VideoClip(Clip):
             else 0
         )
 
-        video_np = np.asarray(
-            tuple(
-                progress.track(
-                    self.iterate_frames_array_t(
-                        fps
-                        if fps
-                        else (
-                            self.fps
-                            if self.fps
-                            else (_ for _ in ()).throw(
-                                Exception("fps is not provided and set.")
-                            )
-                        )
-                    ),
-                    description="Processing Frames ...",
-                    total=total_frames,
-                    transient=True,
-                    style="bar.back",
-                )
-            )
-        )
-        rich_print(
-            "[bold magenta]Vidiopy[/bold magenta] - Video Frames Has Been Processed :thumbs_up:."
-        )
         # Extract audio name without extension
         audio_name = os.path.split(filename)[1].split(".")[0]
 
@@ -874,12 +916,75 @@ class VideoClip(Clip):
             **({"threads": threads} if threads else {}),
         }
 
+        # Determine the fps to use
+        fps_to_use = fps if fps else self.fps if self.fps else None
+        with_audio = bool(self.audio and audio)
+        # The audio is resampled to the output rate before ffmpeg sees it
+        audio_rate = (audio_fps or self.audio.fps) if with_audio else None  # type: ignore
+
+        if (
+            stream_copy
+            and not (codec or bitrate or pixel_format or ffmpeg_params)
+            and fps_to_use == self.fps
+            and self._write_stream_copy(
+                filename,
+                _audio_options(ffmpeg_options) if with_audio else None,
+                smart_cut=smart_cut,
+                overwrite=over_write_output,
+                show_log=show_log,
+            )
+        ):
+            rich_print(
+                f"[bold magenta]Vidiopy[/bold magenta] - ✔ Final video : - {filename} :thumbs_up:",
+                flush=True,
+            )
+            return self
+
+        if (
+            workers is not None
+            and workers > 1
+            and "fork" in multiprocessing.get_all_start_methods()
+        ):
+            if with_audio:
+                self._sync_audio_video_s_e_d()
+            self._write_segments(
+                filename,
+                fps_to_use,
+                ffmpeg_options,
+                workers,
+                overwrite=over_write_output,
+                show_log=show_log,
+                audio=self.audio._iter_output_blocks(audio_rate) if with_audio else None,  # type: ignore
+                audio_fps=audio_rate,
+            )
+            rich_print(
+                f"[bold magenta]Vidiopy[/bold magenta] - ✔ Final video : - {filename} :thumbs_up:",
+                flush=True,
+            )
+            return self
+
+        if self.audio and audio and single_pass and supports_audio_pipe():
+            self._sync_audio_video_s_e_d()
+            self._write_frames(
+                filename,
+                fps_to_use,
+                {"c:a": "aac", **ffmpeg_options},
+                total_frames,
+                overwrite=over_write_output,
+                show_log=show_log,
+                audio=self.audio._iter_output_blocks(audio_rate),  # type: ignore
+                audio_fps=audio_rate,
+            )
+            rich_print(
+                f"[bold magenta]Vidiopy[/bold magenta] - ✔ Final video : - {filename} :thumbs_up:",
+                flush=True,
+            )
+            return self
+
         audio_file_name = None
         temp_video_file_name = None
 
         try:
-            # Determine the fps to use
-            fps_to_use = fps if fps else self.fps if self.fps else None
 
             # Create a temporary video file
             dir__, file__ = os.path.split(filename)
@@ -891,29 +996,13 @@ class VideoClip(Clip):
             temp_video_file_name = temp_video_file.name
             temp_video_file.close()
 
-            # Write video frames to the temporary file using ffmpegio
-            with progress.Progress(transient=True) as progress_bar:
-                current_frame = 0
-                pbar = progress_bar.add_task(
-                    description="Writing Video File",
-                    total=total_frames,
-                )
-
-                def function_callback(status: dict, done: bool):
-                    nonlocal current_frame
-                    current_frame = status["frame"] - current_frame
-                    progress_bar.update(pbar, completed=current_frame, refresh=True)
-
-                ffmpegio.video.write(
-                    temp_video_file_name,
-                    fps_to_use,
-                    video_np,
-                    overwrite=over_write_output,
-                    progress=function_callback,
-                    show_log=show_log,
-                    **ffmpeg_options,
-                )
-                progress_bar.update(pbar, completed=True, visible=False)
+            self._write_frames(
+                temp_video_file_name,
+                fps_to_use,
+                ffmpeg_options,
+                total_frames,
+                show_log=show_log,
+            )
             rich_print(
                 "[bold magenta]Vidiopy[/bold magenta] - Video is Created :thumbs_up:"
             )
@@ -926,7 +1015,7 @@ class VideoClip(Clip):
                 temp_audio_file.close()
 
                 # Write audio to the temporary file
-                self.audio.write_audiofile(audio_file_name)
+                self.audio.write_audiofile(audio_file_name, fps=audio_rate)
 
                 # Combine video and audio using ffmpeg
                 with progress.Progress(transient=True) as progress_bar:
@@ -968,6 +1057,170 @@ class VideoClip(Clip):
             if temp_video_file_name:
                 os.remove(temp_video_file_name)
 
+    def _write_frames(
+        self,
+        filename: str,
+        fps: int | float,
+        ffmpeg_options: dict,
+        total_frames: int | None = None,
+        **writer_options,
+    ) -> None:
+        """
+        Renders the frames of the clip and pipes them to ffmpeg as they come, showing a progress bar.
+
+        Args:
+            filename (str): The name of the file to write.
+            fps (int | float): The frames per second of the output video.
+            ffmpeg_options (dict): The ffmpegio style options of the output.
+            total_frames (int | None, optional): The number of frames, for the progress bar.
+            **writer_options: Additional keyword arguments for the FFmpegVideoWriter, like the audio blocks.
+
+        Raises:
+            IOError: If ffmpeg failed.
+        """
+        with progress.Progress(transient=True) as progress_bar:
+            pbar = progress_bar.add_task(
+                description="Writing Video File",
+                total=total_frames,
+            )
+            with FFmpegVideoWriter(
+                filename, fps, ffmpeg_options, **writer_options
+            ) as writer:
+                for frame in self.iterate_frames_array_t(fps):
+                    writer.write_frame(frame)
+                    progress_bar.update(pbar, advance=1)
+            progress_bar.update(pbar, completed=True, visible=False)
+
+    def _write_segments(
+        self,
+        filename: str,
+        fps: int | float,
+        ffmpeg_options: dict,
+        workers: int,
+        overwrite: bool = True,
+        show_log: bool = False,
+        audio=None,
+        audio_fps: int | None = None,
+    ) -> None:
+        """
+        Renders and encodes segments of the clip in parallel processes, then joins them without re-encoding.
+
+        The segments are multiples of the GOP size (the `g` ffmpeg option, two seconds by default), so the
+        joined video keeps the keyframe spacing of a single encode. The processes are forked, so they share
+        the clip, and its frames, with this process.
+
+        Args:
+            filename (str): The name of the file to write.
+            fps (int | float): The frames per second of the output video.
+            ffmpeg_options (dict): The ffmpegio style options of the output.
+            workers (int): The maximum number of processes.
+            overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+            audio (Iterable[np.ndarray] | None, optional): Blocks of samples to mux as the audio track. Defaults to None.
+            audio_fps (int | None, optional): The sample rate of the audio blocks.
+
+        Raises:
+            IOError: If rendering a segment or joining them failed.
+        """
+        times = self._frame_times(fps)
+        gop = max(1, int(ffmpeg_options.get("g", round(2 * fps))))
+        segment = -(-len(times) // workers)
+        segment = max(gop, -(-segment // gop) * gop)
+        bounds = [
+            (start, min(start + segment, len(times)))
+            for start in range(0, len(times), segment)
+        ]
+        segment_options = {
+            **{k: v for k, v in ffmpeg_options.items() if k not in ("c:a", "ar", "b:a")},
+            "g": gop,
+        }
+        concat_options = _audio_options(ffmpeg_options) if audio is not None else {}
+
+        os.makedirs(config.SCRATCH_DIR, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix="segments-", dir=config.SCRATCH_DIR)
+        extension = os.path.splitext(filename)[1] or ".mp4"
+        segments = [
+            os.path.join(directory, f"segment-{i:05d}{extension}")
+            for i in range(len(bounds))
+        ]
+        context = multiprocessing.get_context("fork")
+        rendered = context.Value("q", 0)
+
+        def render_segment(segment_file: str, start: int, stop: int) -> None:
+            with FFmpegVideoWriter(
+                segment_file, fps, segment_options, show_log=show_log
+            ) as writer:
+                for t in times[start:stop]:
+                    writer.write_frame(self.make_frame_array(t))
+                    with rendered.get_lock():
+                        rendered.value += 1
+
+        processes = [
+            context.Process(target=render_segment, args=(segment_file, *bound))
+            for segment_file, bound in zip(segments, bounds)
+        ]
+        try:
+            # Fork before the progress bar starts its refresh thread
+            for process in processes:
+                process.start()
+            with progress.Progress(transient=True) as progress_bar:
+                pbar = progress_bar.add_task(
+                    description="Writing Video File", total=len(times)
+                )
+                running = [process.sentinel for process in processes]
+                while running:
+                    done = wait(running, timeout=0.1)
+                    running = [sentinel for sentinel in running if sentinel not in done]
+                    progress_bar.update(pbar, completed=rendered.value)
+                progress_bar.update(pbar, completed=True, visible=False)
+            for process in processes:
+                process.join()
+            failed = sum(1 for process in processes if process.exitcode)
+            if failed:
+                raise IOError(
+                    f"{failed} of {len(processes)} segments of '{filename}' failed to render"
+                )
+            concat_video_files(
+                segments,
+                filename,
+                concat_options,
+                overwrite=overwrite,
+                show_log=show_log,
+                audio=audio,
+                audio_fps=audio_fps,
+            )
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _write_stream_copy(
+        self,
+        filename: str,
+        audio_options: dict | None,
+        smart_cut: bool = False,
+        overwrite: bool = True,
+        show_log: bool = False,
+    ) -> bool:
+        """
+        Writes the clip by copying the video stream of its source file, if it has one and shows it unchanged.
+
+        Overridden by clips backed by a file; the base class has no file to copy.
+
+        Args:
+            filename (str): The name of the file to write.
+            audio_options (dict | None): The ffmpegio style audio output options, None to write no audio.
+            smart_cut (bool, optional): Whether to re-encode the frames of a cut which cannot be copied. Defaults to False.
+            overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+
+        Returns:
+            bool: True if the file was written, False if the clip must be rendered and encoded.
+        """
+        return False
+
     def write_videofile_subclip(
         self,
         filename,
@@ -1,11 +1,35 @@
+from copy import copy as copy_
+import math
+import os
+import shutil
+import tempfile
 from typing import Callable, Self, Union
 from PIL import Image
 import ffmpegio
 import numpy as np
 import numpy.typing as npt
 from .VideoClip import VideoClip
+from .ffmpeg_reader import FFmpegVideoReader, output_pix_fmt
+from .ffmpeg_writer import FFmpegVideoWriter, concat_video_files, copy_video_stream
+from .frame_store import write_frame_store
+from .keyframe_index import KeyframeIndex
 from ..audio.AudioClip import AudioFileClip
 from ..decorators import *
+from .. import config
+
+# Encoder used to re-encode the head of a smart cut, for each source codec.
+SMART_CUT_ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "mpeg4": "mpeg4",
+    "mpeg2video": "mpeg2video",
+    "mjpeg": "mjpeg",
+    "vp9": "libvpx-vp9",
+}
+
+# The fraction of a frame by which a time may fall short of the frame it means, since times are computed in
+# floating point: 1.2 seconds at 10 fps is frame 1.2 / 0.1 = 11.999999999999998.
+FRAME_TIME_TOLERANCE = 1e-6
 
 
 class VideoFileClip(VideoClip):
@@ -14,6 +38,10 @@ class VideoFileClip(VideoClip):
 
     This class extends the VideoClip class and provides additional functionality for working with video files. It uses ffmpeg to read video files, extract frames, and set the properties of the video clip. It also provides methods for transforming frames, creating sub-clips, and generating frame representations.
 
+    By default the clip is lazy: only the metadata is probed when the clip is created, and frames are decoded on demand by a persistent ffmpeg reader which keeps a bounded buffer of decoded frames. The whole video is only decoded into memory when the `clip` attribute is accessed.
+
+    As long as no effect changed its frames, `write_videofile` copies the video stream of the file instead of decoding and re-encoding it. A cut which does not start on a keyframe, or which ends between keyframes of a stream whose frames are reordered, is re-encoded, or with `smart_cut` only its frames before its first keyframe and after its last one are. Either way the file holds the frames rendering the clip would write.
+
     Attributes:
         filename (str): The name of the video file.
         fps (float): The frames per second of the video.
@@ -22,7 +50,10 @@ class VideoFileClip(VideoClip):
         end (float): The end time of the video clip.
         duration (float): The duration of the video clip.
         audio (AudioFileClip): The audio of the video clip.
-        clip (np.NDarray): The frames of the video clip.
+        clip (np.NDarray): The frames of the video clip. In lazy mode it is decoded on first access.
+        lazy (bool): Whether frames are decoded on demand.
+        memmap (bool): Whether materialized frames are kept in a memory-mapped file instead of RAM.
+        keyframe_index (KeyframeIndex): The frame timestamps and keyframes of the video file, used for seeking.
 
     Methods:
         fl_frame_transform(func, *args, **kwargs): Applies a function to each frame of the video clip.
@@ -31,27 +62,41 @@ class VideoFileClip(VideoClip):
         sub_clip_copy(t_start=None, t_end=None): Returns a copy of a sub-clip of the video clip.
         make_frame_array(t): Returns a numpy array representation of a specific frame in the video clip.
         make_frame_pil(t): Returns a PIL Image representation of a specific frame in the video clip.
-        _import_video_clip(file_name, ffmpeg_options=None): Imports a video clip from a file using ffmpeg.
+        _import_video_clip(file_name, ffmpeg_options=None, memmap=False): Imports a video clip from a file using ffmpeg.
     """
 
     def __init__(
-        self, filename: str, audio: bool = True, ffmpeg_options: dict | None = None
+        self,
+        filename: str,
+        audio: bool = True,
+        ffmpeg_options: dict | None = None,
+        lazy: bool = True,
+        buffer_size: int | None = None,
+        memmap: bool = False,
     ) -> None:
         """
         Initializes a new instance of the VideoFileClip class.
 
-        This method creates a new VideoFileClip from a video file. It uses ffmpeg to read the video file, extract the frames, and set the properties of the video clip.
+        This method creates a new VideoFileClip from a video file. It uses ffmpeg to probe the video file and set the properties of the video clip.
+        In lazy mode the frames are decoded on demand, otherwise the whole video is decoded into memory right away.
 
         Args:
             filename (str): The name of the video file to import.
             audio (bool, optional): Whether to include audio in the video clip. Defaults to True.
             ffmpeg_options (dict | None, optional): Additional options to pass to ffmpeg. Defaults to None.
+            lazy (bool, optional): Whether to decode frames on demand instead of decoding the whole video up front. Defaults to True.
+                Clips with `ffmpeg_options` are always decoded up front, since the options may change the frame rate and size.
+            buffer_size (int | None, optional): The number of decoded frames the lazy reader keeps in memory. Defaults to `config.VIDEO_READER_BUFFER_SIZE`.
+            memmap (bool, optional): Whether to decode the frames into a memory-mapped file in `config.SCRATCH_DIR` instead of RAM when the whole clip is materialized,
+                and the audio into a shared scratch file, see `AudioFileClip`. Defaults to False.
 
         Raises:
             None
 
         Example:
             >>> video_clip = VideoFileClip("video.mp4")
+            >>> eager_clip = VideoFileClip("video.mp4", lazy=False)
+            >>> mapped_clip = VideoFileClip("long_video.mp4", lazy=False, memmap=True)
 
         Note:
             This method uses ffmpeg to read the video file.
@@ -63,25 +108,59 @@ class VideoFileClip(VideoClip):
         self.start: float | int
         self._dur: float | int
         self.filename = filename
+        self._ffmpeg_options = ffmpeg_options
+        self.memmap = memmap
+        self._clip: npt.NDArray[np.uint8] | None = None
+        self._reader: FFmpegVideoReader | None = None
 
         # Probe video streams and extract relevant information
         video_data = ffmpegio.probe.video_streams_basic(str(filename))[0]
+        n_frames = video_data.get("nb_frames") or (
+            round(video_data["duration"] * video_data["frame_rate"])
+            if video_data.get("duration") and video_data.get("frame_rate")
+            else None
+        )
+        # The options may change the frame rate, count and size the probe reports, so only decoding them tells
+        self.lazy = bool(
+            lazy and n_frames and video_data.get("frame_rate") and not ffmpeg_options
+        )
 
-        # Import video clip using ffmpeg
-        self.clip, self.fps = self._import_video_clip(str(filename), ffmpeg_options)
-        # Set video properties
-        self.size = (video_data["width"], video_data["height"])
+        if self.lazy:
+            # Only metadata is needed, frames are decoded when they are requested
+            self.fps = video_data["frame_rate"]
+            self._reader = FFmpegVideoReader(
+                str(filename),
+                self.fps,
+                (video_data["width"], video_data["height"]),
+                output_pix_fmt(video_data.get("pix_fmt")),
+                ffmpeg_options,
+                buffer_size,
+            )
+            self.size = (video_data["width"], video_data["height"])
+        else:
+            # Import video clip using ffmpeg
+            self._clip, self.fps = self._import_video_clip(
+                str(filename), ffmpeg_options, memmap
+            )
+            n_frames = len(self._clip)
+            self.size = (self._clip.shape[2], self._clip.shape[1])
+        self._frame_window: tuple[int, int] = (0, int(n_frames))
+        self._source_frames = int(n_frames)
+        # What the file shows, to tell whether the clip still shows it unchanged
+        self._source_fps = self.fps
+        self._source_size = self.size
+        self._frames_edited = False
         self.start = 0.0
         # not all videos have a duration attribute in their metadata
         if video_data["duration"]:
             self.end = video_data["duration"]
             self._dur = video_data["duration"]
         else:
-            self.end = len(self.clip) / self.fps
+            self.end = self._frame_count / self.fps
             self._dur = self.end
         # If audio is enabled, attach audio clip
         if audio:
-            _audio = AudioFileClip(filename, self._dur)
+            _audio = AudioFileClip(filename, self._dur, memmap=memmap)
             _audio.set_start(self.start).set_end(self.end)
             self.set_audio(_audio)
 
@@ -94,7 +173,7 @@ class VideoFileClip(VideoClip):
         audio={self.audio})"""
 
     def __eq__(self, other) -> bool:
-        if not hasattr(self, "clip"):
+        if not hasattr(self, "_frame_window"):
             return False
 
         return (
@@ -105,9 +184,378 @@ class VideoFileClip(VideoClip):
             and self.end == other.end
             and self.duration == other.duration
             and self.audio == other.audio
-            and np.array_equal(self.clip, other.clip)
+            and (self._same_frames(other) or np.array_equal(self.clip, other.clip))
+        )
+
+    def close(self) -> None:
+        """
+        Stops the lazy frame reader, if any, and releases the frames it buffered.
+        """
+        if self._reader is not None:
+            self._reader.close()
+
+    ##############
+    # FRAME STORE#
+    ##############
+
+    @property
+    def clip(self) -> npt.NDArray[np.uint8]:
+        """
+        The frames of the video clip as a single array.
+
+        In lazy mode the frames are decoded the first time this property is accessed. If the clip was cut with
+        `sub_clip`, ffmpeg seeks to the first frame of the cut and decodes only its frames.
+        With `memmap` the frames live in a memory-mapped file and index like the ndarray.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frames of the video clip.
+        """
+        if self._clip is None:
+            start_idx, end_idx = self._frame_window
+            frames, _ = self._import_video_clip(
+                str(self.filename),
+                self._ffmpeg_options,
+                self.memmap,
+                None if self._frame_window == (0, self._source_frames) else self._frame_window,
+            )
+            self._clip = frames[: end_idx - start_idx]
+        return self._clip
+
+    @clip.setter
+    def clip(self, clip: npt.NDArray[np.uint8]) -> None:
+        self._clip = clip
+        self._frames_edited = True
+
+    @property
+    def keyframe_index(self) -> KeyframeIndex:
+        """
+        The keyframe index of the video file.
+
+        The index is built with ffprobe on first use and cached next to the other vidiopy caches, see `KeyframeIndex.load`.
+
+        Returns:
+            KeyframeIndex: The frame timestamps and keyframes of the video stream.
+        """
+        if self._reader is not None and self._reader.index is not None:
+            return self._reader.index
+        return KeyframeIndex.load(str(self.filename))
+
+    @property
+    def _frame_count(self) -> int:
+        """
+        The number of frames of the video clip, computed without decoding them.
+
+        Returns:
+            int: The number of frames.
+        """
+        if self._clip is not None:
+            return len(self._clip)
+        return self._frame_window[1] - self._frame_window[0]
+
+    def _same_frames(self, other: "VideoFileClip") -> bool:
+        """
+        Checks, without decoding, whether two lazy clips show the same frames of the same file.
+
+        Args:
+            other (VideoFileClip): The clip to compare with.
+
+        Returns:
+            bool: True if both clips are lazy and read the same frames of the same file.
+        """
+        return (
+            self._clip is None
+            and other._clip is None
+            and str(self.filename) == str(other.filename)
+            and self._ffmpeg_options == other._ffmpeg_options
+            and self._frame_window == other._frame_window
         )
 
+    def _slice_frames(self, start_idx: int, end_idx: int) -> None:
+        """
+        Restricts the clip to the frames in [start_idx, end_idx).
+
+        Decoded frames are sliced, a lazy clip only moves its frame window. The frame window always tracks the frames of the file the clip shows.
+
+        Args:
+            start_idx (int): The index of the first frame to keep.
+            end_idx (int): The index after the last frame to keep.
+        """
+        if self._clip is not None:
+            self._clip = self._clip[start_idx:end_idx]
+        offset = self._frame_window[0]
+        self._frame_window = (offset + start_idx, offset + max(start_idx, end_idx))
+
+    def _frame_at(self, t: int | float) -> npt.NDArray[np.uint8]:
+        """
+        Returns the frame shown at time `t`, decoding it if necessary.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frame.
+        """
+        if self.duration is None:
+            raise ValueError("Duration is Not Set.")
+        n_frames = self._frame_count
+        time_per_frame = self.duration / n_frames
+        frame_index = t / time_per_frame + FRAME_TIME_TOLERANCE
+        frame_index = int(min(n_frames - 1, max(0, frame_index)))
+        if self._clip is not None or self._reader is None:
+            return self.clip[frame_index]
+        return self._reader.get_frame(self._frame_window[0] + frame_index)
+
+    ##############
+    # STREAM COPY#
+    ##############
+
+    def _unchanged_frames(self) -> tuple[int, int] | None:
+        """
+        Returns the frames of the file the clip shows, if no effect changed them.
+
+        Effects replace `make_frame_array` or `make_frame_pil`, or set new frames, or change the fps or size.
+
+        Returns:
+            tuple[int, int] | None: The [start, end) frame indices in the file, or None if the frames were changed.
+        """
+        if (
+            self._ffmpeg_options
+            or getattr(self, "_frames_edited", True)
+            or "make_frame_array" in self.__dict__
+            or "make_frame_pil" in self.__dict__
+            or self.fps != getattr(self, "_source_fps", None)
+            or tuple(self.size) != tuple(getattr(self, "_source_size", ()))
+        ):
+            return None
+        start_idx, end_idx = self._frame_window
+        return (start_idx, end_idx) if end_idx > start_idx else None
+
+    def _source_audio(self, start: float, duration: float) -> tuple[str, float, float] | None:
+        """
+        Returns the range of the file the audio of the clip comes from, if no effect changed it.
+
+        Args:
+            start (float): The start time of the video cut in the file.
+            duration (float): The duration of the video cut.
+
+        Returns:
+            tuple[str, float, float] | None: The file, start time and duration of the audio, or None if it must be rendered.
+        """
+        audio = self.audio
+        if (
+            not isinstance(audio, AudioFileClip)
+            or not audio._deferred
+            or "get_frame_at_t" in audio.__dict__
+            or os.path.abspath(audio.path) != os.path.abspath(str(self.filename))
+            or abs(audio._window[0] - start) > 1 / self.fps
+        ):
+            return None
+        return (audio.path, audio._window[0], duration)
+
+    def _play_end(self) -> int | float | None:
+        """
+        Returns the time the clip plays until when it is written.
+
+        `sub_clip` leaves `end` at the end of the cut in the file, a cut plays for its duration unless `end` was set
+        again since.
+
+        Returns:
+            int | float | None: The end time, None if neither end nor duration is set.
+        """
+        if self.end is not None and self.end == getattr(self, "_cut_end", None) and self.duration is not None:
+            return self.start + self.duration
+        return self.end if self.end is not None else self.duration
+
+    def _frame_times(self, fps: int | float) -> list[float]:
+        """
+        Returns the times of the frames rendered by `iterate_frames_array_t`, see `VideoClip._frame_times`.
+
+        The times are those of the frames from 0 to `_play_end()`, so a cut writes its own frames once each, the frames
+        a stream copy writes.
+
+        Parameters:
+            fps (int | float): The frames per second at which to generate frames.
+
+        Raises:
+            ValueError: If neither end nor duration is set.
+
+        Returns:
+            list[float]: The times.
+        """
+        end = self._play_end()
+        if end is None:
+            raise ValueError("end or duration must be set.")
+        # Rounded first, so float noise in the product does not add a frame
+        return [i / fps for i in range(math.ceil(round(end * fps, 6)))]
+
+    def _sync_audio_video_s_e_d(self) -> Self:
+        """
+        Synchronizes the audio start, end, and duration with those the clip plays for, see `_play_end`.
+
+        Returns:
+            Self: Returns the instance of the class with updated audio attributes.
+        """
+        if self.audio:
+            self.audio.start = self.start
+            self.audio.end = self._play_end()
+            self.audio._original_dur = self.duration
+        return self
+
+    def _write_stream_copy(
+        self,
+        filename: str,
+        audio_options: dict | None,
+        smart_cut: bool = False,
+        overwrite: bool = True,
+        show_log: bool = False,
+    ) -> bool:
+        """
+        Writes the clip by copying the video stream of the file, if no effect changed its frames.
+
+        The copy writes the frames rendering the clip would write, one per frame of the cut. A cut starting on a keyframe
+        is copied as is, and so is its end if it is the end of the file, a keyframe, or the frames of the stream are not
+        reordered. With `smart_cut`, the frames of a cut before its first keyframe and after its last one are
+        re-encoded with the encoder of the source codec and joined to the copied rest; the joined stream is only valid if
+        that encoder can produce a stream compatible with the source. The audio is taken from the file too if no effect
+        changed it, otherwise it is rendered and piped to ffmpeg.
+
+        Args:
+            filename (str): The name of the file to write.
+            audio_options (dict | None): The ffmpegio style audio output options, None to write no audio.
+            smart_cut (bool, optional): Whether to re-encode the frames of a cut which cannot be copied. Defaults to False.
+            overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+
+        Returns:
+            bool: True if the file was written, False if the clip must be rendered and encoded, for example when the output format cannot hold the stream.
+        """
+        frames = self._unchanged_frames()
+        if frames is None:
+            return False
+        start_idx, end_idx = frames
+        if len(self._frame_times(self.fps)) != end_idx - start_idx:
+            # Rendering would show some frames twice or play past them, the copy must write the same
+            return False
+        try:
+            video_data = ffmpegio.probe.full_details(
+                str(self.filename), show_format=False, select_streams="v:0"
+            )["streams"][0]
+        except Exception:
+            return False
+        index: KeyframeIndex | None = None
+        keyframe, copy_end = start_idx, end_idx
+        # Packets are stored in decoding order, so a stream with reordered frames can only be cut exactly before
+        # a keyframe
+        cut_end = end_idx != self._source_frames and video_data.get("has_b_frames")
+        if start_idx > 0 or cut_end:
+            try:
+                index = self.keyframe_index
+            except Exception:
+                return False
+        if start_idx > 0:
+            # The first keyframe of the cut, where the copy can start
+            next_keyframe = index.keyframe_after(start_idx - 1)  # type: ignore
+            if next_keyframe is None or next_keyframe >= end_idx:
+                return False
+            keyframe = next_keyframe
+        if cut_end:
+            copy_end = index.keyframe_before(end_idx)  # type: ignore
+            if copy_end <= keyframe:
+                return False
+        head, tail = keyframe != start_idx, copy_end != end_idx
+        if (head or tail) and not smart_cut:
+            return False
+        encoder = SMART_CUT_ENCODERS.get(video_data.get("codec_name"))
+        if (head or tail) and encoder is None:
+            return False
+
+        start = index.time_of(start_idx) if index is not None and start_idx > 0 else 0.0
+        duration = (end_idx - start_idx) / float(self.fps)
+        audio_kwargs: dict = {}
+        if audio_options is not None and self.audio:
+            audio_source = self._source_audio(start, duration)
+            if audio_source is not None:
+                audio_kwargs = {"audio_source": audio_source}
+            else:
+                self._sync_audio_video_s_e_d()
+                audio_rate = audio_options.get("ar") or self.audio.fps
+                audio_kwargs = {
+                    "audio": self.audio._iter_output_blocks(audio_rate),
+                    "audio_fps": audio_rate,
+                }
+        try:
+            if not head and not tail:
+                copy_video_stream(
+                    str(self.filename),
+                    filename,
+                    start,
+                    end_idx - start_idx,
+                    audio_options if audio_kwargs else None,
+                    overwrite,
+                    show_log,
+                    **audio_kwargs,
+                )
+                return True
+            os.makedirs(config.SCRATCH_DIR, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix="smart-cut-", dir=config.SCRATCH_DIR)
+            try:
+                extension = os.path.splitext(filename)[1] or ".mp4"
+                parts = []
+                for name, first, last in (
+                    ("head", start_idx, keyframe),
+                    ("copy", keyframe, copy_end),
+                    ("tail", copy_end, end_idx),
+                ):
+                    if first == last:
+                        continue
+                    part_file = os.path.join(directory, name + extension)
+                    parts.append(part_file)
+                    if name == "copy":
+                        copy_video_stream(
+                            str(self.filename),
+                            part_file,
+                            index.time_of(keyframe) if keyframe > 0 else 0.0,  # type: ignore
+                            copy_end - keyframe,
+                            show_log=show_log,
+                        )
+                        continue
+                    # The frames around the copied keyframes are re-encoded
+                    with FFmpegVideoWriter(
+                        part_file,
+                        self.fps,
+                        {"c:v": encoder, "pix_fmt": video_data["pix_fmt"]},  # type: ignore
+                        show_log=show_log,
+                    ) as writer:
+                        for i in range(first, last):
+                            writer.write_frame(self._file_frame(i))
+                concat_video_files(
+                    parts,
+                    filename,
+                    audio_options if audio_kwargs else None,
+                    overwrite,
+                    show_log,
+                    **audio_kwargs,
+                )
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        except (IOError, ValueError):
+            return False
+        return True
+
+    def _file_frame(self, index: int) -> npt.NDArray[np.uint8]:
+        """
+        Returns a frame of the file by its index in the file.
+
+        Args:
+            index (int): The index of the frame in the file.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frame.
+        """
+        if self._clip is not None or self._reader is None:
+            return self.clip[index - self._frame_window[0]]
+        return self._reader.get_frame(index)
+
     #################
     # EFFECT METHODS#
     #################
@@ -139,6 +587,7 @@ class VideoFileClip(VideoClip):
 
         Note:
             This method requires the start and end of the video clip to be set.
+            A lazy clip is decoded into memory before the function is applied.
         """
         x = func(self.clip[0], *args, **kwargs)
         final_shape = (len(self.clip),) + x.shape
@@ -180,6 +629,7 @@ class VideoFileClip(VideoClip):
 
         Note:
             This method requires the fps of the video clip to be set.
+            A lazy clip is decoded into memory before the function is applied.
         """
         td = 1 / self.fps
         frame_time = 0.0
@@ -207,17 +657,18 @@ class VideoFileClip(VideoClip):
         if t_start is None:
             t_start = self.start if self.start else 0.0
 
-        time_per_frame = self._dur / len(self.clip)
-        start_idx = t_start / time_per_frame
-        start_idx = int(min(len(self.clip) - 1, max(0, start_idx)))
+        n_frames = self._frame_count
+        time_per_frame = self._dur / n_frames
+        start_idx = t_start / time_per_frame + FRAME_TIME_TOLERANCE
+        start_idx = int(min(n_frames - 1, max(0, start_idx)))
 
-        end_idx = t_end / time_per_frame
-        end_idx = int(min(len(self.clip) - 1, max(0, end_idx)))
+        end_idx = t_end / time_per_frame + FRAME_TIME_TOLERANCE
+        end_idx = int(min(n_frames - 1, max(0, end_idx)))
 
-        self.clip = self.clip[start_idx:end_idx]
+        self._slice_frames(start_idx, end_idx)
 
         self.start = 0.0
-        self.end = t_end
+        self.end = self._cut_end = t_end
         self._dur = t_end - t_start
 
         if self.audio:
@@ -232,7 +683,13 @@ class VideoFileClip(VideoClip):
         t_start: Union[int, float, None] = None,
         t_end: Union[int, float, None] = None,
     ):
-        clip = self.copy()
+        # Copy without the frames, only the frames of the cut are copied below
+        frames, self._clip = self._clip, None
+        try:
+            clip = self.copy()
+        finally:
+            self._clip = frames
+        clip._clip = frames
         if t_end is None and t_start is None:
             return clip.copy()
         if t_end is None:
@@ -241,15 +698,18 @@ class VideoFileClip(VideoClip):
             t_start = clip.start if clip.start else 0.0
 
         time_per_frame = 1 / clip.fps
-        instance = clip.copy()
-        start_idx = t_start / time_per_frame
-        start_idx = int(min(len(instance.clip) - 1, max(0, start_idx)))
-        end_idx = t_end / time_per_frame
-        end_idx = int(min(len(instance.clip) - 1, max(0, end_idx)))
-        instance.clip = instance.clip[start_idx:end_idx]
+        instance = clip
+        n_frames = instance._frame_count
+        start_idx = t_start / time_per_frame + FRAME_TIME_TOLERANCE
+        start_idx = int(min(n_frames - 1, max(0, start_idx)))
+        end_idx = t_end / time_per_frame + FRAME_TIME_TOLERANCE
+        end_idx = int(min(n_frames - 1, max(0, end_idx)))
+        instance._slice_frames(start_idx, end_idx)
+        if instance._clip is not None:
+            instance._clip = copy_(instance._clip)
 
         instance.start = 0.0
-        instance.end = t_end
+        instance.end = instance._cut_end = t_end
         instance._dur = t_end - t_start
 
         if instance.audio:
@@ -263,7 +723,7 @@ class VideoFileClip(VideoClip):
         """
         Generates a numpy array representation of a specific frame in the video clip.
 
-        This method calculates the index of the frame for a specific time, retrieves the frame from the video clip, and converts it to a numpy array.
+        This method calculates the index of the frame for a specific time and retrieves the frame from the video clip. A lazy clip decodes only that frame.
 
         Args:
             t (int | float): The time of the frame to convert.
@@ -281,19 +741,14 @@ class VideoFileClip(VideoClip):
         Note:
             This method requires the duration of the video clip to be set.
         """
-        if self.duration is None:
-            raise ValueError("Duration is Not Set.")
-        time_per_frame = self.duration / len(self.clip)
-        frame_index = t / time_per_frame
-        frame_index = int(min(len(self.clip) - 1, max(0, frame_index)))
-        return self.clip[frame_index]
+        return self._frame_at(t)
 
     @requires_duration
     def make_frame_pil(self, t: int | float) -> Image.Image:
         """
         Generates a PIL Image representation of a specific frame in the video clip.
 
-        This method calculates the index of the frame for a specific time, retrieves the frame from the video clip, and returns it as a PIL Image.
+        This method calculates the index of the frame for a specific time, retrieves the frame from the video clip, and returns it as a PIL Image. A lazy clip decodes only that frame.
 
         Args:
             t (int | float): The time of the frame to convert.
@@ -311,15 +766,14 @@ class VideoFileClip(VideoClip):
         Note:
             This method requires the duration of the video clip to be set.
         """
-        if self.duration is None:
-            raise ValueError("Duration is Not Set.")
-        time_per_frame = self.duration / len(self.clip)
-        frame_index = t / time_per_frame
-        frame_index = int(min(len(self.clip) - 1, max(0, frame_index)))
-        return Image.fromarray(self.clip[frame_index])
+        return Image.fromarray(self._frame_at(t))
 
     def _import_video_clip(
-        self, file_name: str, ffmpeg_options: dict | None = None
+        self,
+        file_name: str,
+        ffmpeg_options: dict | None = None,
+        memmap: bool = False,
+        frame_range: tuple[int, int] | None = None,
     ) -> tuple[npt.NDArray[np.uint8], float | int]:
         """
         Imports a video clip from a file using ffmpeg.
@@ -329,6 +783,8 @@ class VideoFileClip(VideoClip):
         Args:
             file_name (str): The name of the video file to import.
             ffmpeg_options (dict | None, optional): Additional options to pass to ffmpeg. Defaults to None.
+            memmap (bool, optional): Whether to stream the frames into a memory-mapped FrameStore instead of RAM. Defaults to False.
+            frame_range (tuple[int, int] | None, optional): The [start, end) frame indices to decode, using an input seek to the first one. Requires `fps` to be set. Defaults to None, which decodes all frames.
 
         Returns:
             tuple: A tuple of the frames as PIL Images and the fps of the video.
@@ -345,5 +801,20 @@ class VideoFileClip(VideoClip):
         """
         frames: np.ndarray
         options = {**(ffmpeg_options if ffmpeg_options else {})}
+        if frame_range is not None:
+            start_idx, end_idx = frame_range
+            if start_idx > 0:
+                # Seek half a frame early so rounding never skips the first frame
+                options["ss_in"] = (start_idx - 0.5) / float(self.fps)
+            options["vframes"] = max(1, end_idx - start_idx)
+            # passthrough keeps ffmpeg from duplicating frames to fill the gap left by the seek
+            options["vsync"] = "passthrough"
+        if memmap:
+            with ffmpegio.open(file_name, "rv", **options) as reader:
+                fps = reader.rate
+                frames = write_frame_store(
+                    frame for block in reader for frame in block
+                )
+            return frames, fps
         fps, frames = ffmpegio.video.read(file_name, **options)
         return frames, fps
@@ -0,0 +1,360 @@
+"""
+This module contains the point operations on the colours of frames, and the kernel running a chain of them in one pass.
+
+A point operation changes every pixel on its own, like `brightness`, `contrast`, `saturation`, `invert_colors`,
+`blackwhite`, `fadein` and `fadeout`. Consecutive point operations on a clip are kept in one `ColorOpsNode` of its
+effect graph instead of a node each, and every frame goes through them at once:
+
+    - Operations changing each channel on its own become a table of 256 entries per channel, and the tables of
+      consecutive ones are composed into one, so any number of them costs one lookup per sample.
+    - Operations mixing the channels, like saturation, become an affine colour matrix, and consecutive matrices are
+      multiplied into one.
+    - Contrast needs the mean grey of the frame it is applied to, the operations before it are applied first, then it
+      becomes a table.
+
+The frame is copied once into a buffer, which the tables and matrices then change in place. Tables keep the uint8
+rounding of each operation exactly; matrices round once for the whole run of operations they fuse, so their results
+may differ by one from running the operations one after another.
+"""
+
+from typing import Any
+import numpy as np
+import numpy.typing as npt
+from .effect_graph import Node, apply_node, graph_of
+
+__all__ = [
+    "ColorOp",
+    "BrightnessOp",
+    "ContrastOp",
+    "SaturationOp",
+    "InvertOp",
+    "GrayscaleOp",
+    "FadeInOp",
+    "FadeOutOp",
+    "ColorOpsNode",
+    "run_color_ops",
+    "apply_color_op",
+]
+
+# Weights of the red, green and blue samples in the grey of a pixel, those of PIL's "L" mode (ITU-R 601-2 luma).
+GREY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# The samples of a uint8 channel, which tables are computed on.
+_SAMPLES = np.arange(256, dtype=np.float32)
+
+# The table leaving the samples of a channel unchanged.
+_IDENTITY = np.arange(256, dtype=np.uint8)
+
+
+def _blend_table(base: npt.ArrayLike, factor: float) -> npt.NDArray[np.uint8]:
+    """
+    Returns the table of base + factor * (sample - base), truncated and clipped like PIL's `Image.blend`.
+    """
+    base = np.float32(base)
+    values = base + np.float32(factor) * (_SAMPLES - base)
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+class ColorOp:
+    """
+    A base class of the point operations on the colours of frames.
+
+    Attributes:
+        drops_alpha (bool): Whether the operation returns RGB frames from RGBA ones.
+
+    Methods:
+        stage(t): Returns how the operation changes the frame at time t.
+    """
+
+    drops_alpha = False
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
+
+    def stage(self, t: int | float) -> tuple[str, Any] | None:
+        """
+        Returns how the operation changes the frame at time `t`.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            tuple[str, Any] | None: One of
+                - ("lut", table): a uint8 table of shape (256,) for the red, green and blue channels, or (4, 256) with
+                  a row for each channel, alpha included.
+                - ("affine", (matrix, offset)): a 3x3 matrix and an offset of 3 applied to the red, green and blue
+                  samples.
+                - ("contrast", factor): the contrast enhancement of PIL, which depends on the frame.
+                - None if the operation does not change the frame at that time.
+        """
+        raise NotImplementedError("stage method must be overridden in the subclass.")
+
+
+class BrightnessOp(ColorOp):
+    """
+    Scales the colours towards black, like `PIL.ImageEnhance.Brightness`.
+    """
+
+    def __init__(self, factor: float) -> None:
+        self.factor = factor
+
+    def stage(self, t: int | float) -> tuple[str, Any]:
+        return "lut", _blend_table(0, self.factor)
+
+
+class ContrastOp(ColorOp):
+    """
+    Scales the colours towards the mean grey of the frame, like `PIL.ImageEnhance.Contrast`.
+    """
+
+    def __init__(self, factor: float) -> None:
+        self.factor = factor
+
+    def stage(self, t: int | float) -> tuple[str, Any]:
+        return "contrast", self.factor
+
+
+class SaturationOp(ColorOp):
+    """
+    Scales the colours towards the grey of each pixel, like `PIL.ImageEnhance.Color`.
+    """
+
+    def __init__(self, factor: float) -> None:
+        self.factor = factor
+
+    def stage(self, t: int | float) -> tuple[str, Any]:
+        matrix = (1 - self.factor) * np.tile(GREY_WEIGHTS, (3, 1)) + self.factor * np.eye(3)
+        return "affine", (matrix.astype(np.float32), np.zeros(3, dtype=np.float32))
+
+
+class InvertOp(ColorOp):
+    """
+    Inverts the colours and drops the alpha, like `PIL.ImageOps.invert` of the RGB image.
+    """
+
+    drops_alpha = True
+
+    def __init__(self) -> None:
+        pass
+
+    def stage(self, t: int | float) -> tuple[str, Any]:
+        return "lut", 255 - _IDENTITY
+
+
+class GrayscaleOp(ColorOp):
+    """
+    Replaces the colours by their grey and drops the alpha, like `PIL.ImageOps.grayscale` converted back to RGB.
+    """
+
+    drops_alpha = True
+
+    def __init__(self) -> None:
+        pass
+
+    def stage(self, t: int | float) -> tuple[str, Any]:
+        return "affine", (np.tile(GREY_WEIGHTS, (3, 1)), np.zeros(3, dtype=np.float32))
+
+
+class _FadeOp(ColorOp):
+    """
+    A base class of the fades, which blend every channel, alpha included, with a colour.
+    """
+
+    def __init__(self, duration: float, color: tuple[int, ...]) -> None:
+        self.duration = duration
+        self.color = tuple(color)
+
+    def _factor(self, t: int | float) -> float | None:
+        """
+        Returns the weight of the frame in the blend at time `t`, or None out of the fade.
+        """
+        raise NotImplementedError("_factor method must be overridden in the subclass.")
+
+    def stage(self, t: int | float) -> tuple[str, Any] | None:
+        factor = self._factor(t)
+        if factor is None:
+            return None
+        # The alpha fades to 0 unless the colour has one
+        color = (self.color + (0, 0, 0, 0))[:4]
+        base = np.float32(1 - factor) * np.array(color, dtype=np.float32)[:, None]
+        values = _SAMPLES * np.float32(factor) + base
+        return "lut", np.clip(values, 0, 255).astype(np.uint8)
+
+
+class FadeInOp(_FadeOp):
+    """
+    Fades the frames in from a colour during the first `duration` seconds.
+    """
+
+    def _factor(self, t: int | float) -> float | None:
+        return t / self.duration if t < self.duration else None
+
+
+class FadeOutOp(_FadeOp):
+    """
+    Fades the frames out to a colour during the last `duration` seconds of a clip of `clip_duration` seconds.
+    """
+
+    def __init__(
+        self, clip_duration: float, duration: float, color: tuple[int, ...]
+    ) -> None:
+        super().__init__(duration, color)
+        self.clip_duration = clip_duration
+
+    def _factor(self, t: int | float) -> float | None:
+        time_left = self.clip_duration - t
+        if time_left < self.duration and time_left >= 0:
+            return time_left / self.duration
+        return None
+
+
+def _channel_tables(table: npt.NDArray[np.uint8], channels: int) -> npt.NDArray[np.uint8]:
+    """
+    Returns a table of a stage with a row for each of the `channels` channels of the buffer.
+    """
+    if table.ndim == 1:
+        return np.stack([table] * 3 + [_IDENTITY] * (channels - 3))
+    return table[:channels]
+
+
+def _apply_tables(buffer: npt.NDArray[np.uint8], tables: npt.NDArray[np.uint8]) -> None:
+    """
+    Looks the samples of each channel of the buffer up in its table, in place.
+    """
+    if (tables == tables[0]).all():
+        np.take(tables[0], buffer, out=buffer)
+        return
+    for channel in range(buffer.shape[2]):
+        samples = buffer[:, :, channel]
+        np.take(tables[channel], samples, out=samples)
+
+
+def _apply_affine(
+    buffer: npt.NDArray[np.uint8], affine: tuple[npt.NDArray, npt.NDArray]
+) -> None:
+    """
+    Applies an affine colour matrix to the red, green and blue samples of the buffer, in place.
+    """
+    matrix, offset = affine
+    rgb = buffer[:, :, :3] @ matrix.T.astype(np.float32)
+    rgb += offset + np.float32(0.5)
+    np.clip(rgb, 0, 255, out=rgb)
+    buffer[:, :, :3] = rgb
+
+
+def _mean_grey(buffer: npt.NDArray[np.uint8]) -> int:
+    """
+    Returns the mean grey of the buffer, rounded like `PIL.ImageEnhance.Contrast` does.
+    """
+    grey = (
+        buffer[:, :, 0].astype(np.uint32) * 19595
+        + buffer[:, :, 1].astype(np.uint32) * 38470
+        + buffer[:, :, 2].astype(np.uint32) * 7471
+        + 0x8000
+    ) >> 16
+    return int(grey.mean() + 0.5)
+
+
+def run_color_ops(
+    frame: np.ndarray, ops: tuple[ColorOp, ...], t: int | float = 0
+) -> np.ndarray:
+    """
+    Applies a chain of point operations to a frame in one pass.
+
+    Args:
+        frame (np.ndarray): A uint8 frame, shaped (h, w), (h, w, 3) or (h, w, 4).
+        ops (tuple[ColorOp, ...]): The operations, in the order they are applied.
+        t (int | float, optional): The time of the frame, for operations which change in time. Defaults to 0.
+
+    Returns:
+        np.ndarray: The new frame, or `frame` itself if no operation changes it at time `t`.
+    """
+    stages = [stage for stage in (op.stage(t) for op in ops) if stage is not None]
+    drops_alpha = any(op.drops_alpha for op in ops)
+    frame = np.asarray(frame)
+    if not stages and not (drops_alpha and frame.ndim == 3 and frame.shape[2] == 4):
+        return frame
+    if frame.ndim == 2:
+        frame = frame[:, :, None]
+    if frame.shape[2] == 1:
+        frame = np.broadcast_to(frame, frame.shape[:2] + (3,))
+    channels = 3 if drops_alpha else frame.shape[2]
+    # The only copy of the frame, all the stages change it in place
+    buffer = np.array(frame[:, :, :channels], dtype=np.uint8)
+
+    tables = affine = None
+    for kind, value in stages:
+        if kind == "lut":
+            if affine is not None:
+                _apply_affine(buffer, affine)
+                affine = None
+            table = _channel_tables(value, channels)
+            tables = table if tables is None else np.take_along_axis(table, tables, axis=1)
+        elif kind == "affine":
+            if tables is not None:
+                _apply_tables(buffer, tables)
+                tables = None
+            if affine is None:
+                affine = value
+            else:
+                matrix, offset = value
+                affine = (matrix @ affine[0], matrix @ affine[1] + offset)
+        else:
+            if affine is not None:
+                _apply_affine(buffer, affine)
+                affine = None
+            if tables is not None:
+                _apply_tables(buffer, tables)
+            tables = _channel_tables(_blend_table(_mean_grey(buffer), value), channels)
+    if affine is not None:
+        _apply_affine(buffer, affine)
+    if tables is not None:
+        _apply_tables(buffer, tables)
+    return buffer
+
+
+class ColorOpsNode(Node):
+    """
+    A node of the effect graph applying a chain of point operations to each frame of its input in one pass.
+
+    Attributes:
+        input (Node): The node the frames come from.
+        ops (tuple[ColorOp, ...]): The operations, in the order they are applied.
+    """
+
+    def __init__(self, input: Node, ops: tuple[ColorOp, ...]) -> None:
+        self.input = input
+        self.ops = tuple(ops)
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        return (self.input,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(map(repr, self.ops))})"
+
+    def render(self, t: int | float) -> np.ndarray:
+        return run_color_ops(self.input.render(t), self.ops, t)
+
+    def rebase(self, old: Any, new: Any) -> Node:
+        input = self.input.rebase(old, new)
+        if input is self.input:
+            return self
+        return self.__class__(input, self.ops)
+
+
+def apply_color_op(clip: Any, op: ColorOp) -> Any:
+    """
+    Adds a point operation to the effect graph of a clip, fused with the point operations right before it.
+
+    Args:
+        clip (VideoClip): The clip.
+        op (ColorOp): The operation.
+
+    Returns:
+        VideoClip: The clip.
+    """
+    graph = graph_of(clip)
+    if isinstance(graph, ColorOpsNode):
+        return apply_node(clip, ColorOpsNode(graph.input, graph.ops + (op,)))
+    return apply_node(clip, ColorOpsNode(graph, (op,)))
@@ -0,0 +1,188 @@
+"""
+This module contains the NumPy compositor which layers the frames of a CompositeVideoClip.
+
+The canvas is a buffer of premultiplied samples allocated once and reused for every frame. Each layer is
+blended with the Porter-Duff "over" operator into the rectangle it covers only, in integer arithmetic on the
+uint8 or uint16 samples of the frames. Layers without alpha, or whose alpha is opaque everywhere, are copied
+into the rectangle with a slice assignment and no alpha math at all.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["FrameCompositor"]
+
+
+def _split_alpha(
+    frame: np.ndarray, dtype: np.dtype
+) -> tuple[npt.NDArray, npt.NDArray | None]:
+    """
+    Returns the colour samples, shaped (h, w, 3) or (h, w, 1) for grey frames, and the alpha, shaped (h, w, 1) or
+    None, of a frame converted to `dtype`.
+    """
+    frame = np.asarray(frame)
+    if frame.dtype != dtype:
+        # uint8 and uint16 samples differ by a factor of 257
+        if dtype == np.uint16:
+            frame = frame.astype(np.uint16) * 257
+        else:
+            frame = ((frame.astype(np.uint32) + 128) // 257).astype(dtype)
+    if frame.ndim == 2:
+        return frame[:, :, None], None
+    if frame.shape[2] in (2, 4):
+        return frame[:, :, :-1], frame[:, :, -1:]
+    return frame, None
+
+
+class FrameCompositor:
+    """
+    A class used to layer frames onto a background in a reused canvas.
+
+    A frame is composited with `start`, which fills the canvas with the background, any number of `paste` calls,
+    bottom layer first, and `result`, which returns the frame with straight alpha.
+
+    Attributes:
+        size (tuple[int, int]): The (width, height) of the canvas.
+        channels (int): The number of channels of the output, 3 for RGB or 4 for RGBA.
+        dtype (np.dtype): The sample type of the output, np.uint8 or np.uint16.
+
+    Methods:
+        start(background): Fills the canvas with a colour or a frame.
+        paste(frame, pos): Blends a frame over the canvas with its top left corner at `pos`.
+        result(out): Returns the composited frame.
+    """
+
+    def __init__(
+        self, size: tuple[int, int], channels: int = 4, dtype: npt.DTypeLike = np.uint8
+    ) -> None:
+        """
+        Initializes a new instance of the FrameCompositor class.
+
+        Args:
+            size (tuple[int, int]): The (width, height) of the canvas.
+            channels (int, optional): 3 for RGB or 4 for RGBA output. Defaults to 4.
+            dtype (npt.DTypeLike, optional): np.uint8 or np.uint16. Defaults to np.uint8.
+
+        Raises:
+            ValueError: If the number of channels or the sample type is not supported.
+        """
+        if channels not in (3, 4):
+            raise ValueError(f"channels must be 3 or 4, not {channels}")
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.uint8, np.uint16):
+            raise ValueError(f"dtype must be uint8 or uint16, not {self.dtype}")
+        self.size = (int(size[0]), int(size[1]))
+        self.channels = channels
+        self._max = np.iinfo(self.dtype).max
+        self._buffer = np.zeros((self.size[1], self.size[0], channels), dtype=self.dtype)
+        # Whether the alpha of the canvas is opaque everywhere, premultiplied samples are straight samples then
+        self._opaque = channels == 3
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={self.size}, channels={self.channels}, dtype={self.dtype})"
+
+    def __copy__(self) -> "FrameCompositor":
+        # A copy must never share the canvas
+        return self.__class__(self.size, self.channels, self.dtype)
+
+    def start(self, background: tuple[int, ...] | np.ndarray) -> None:
+        """
+        Fills the canvas with the background of a new frame.
+
+        Args:
+            background (tuple[int, ...] | np.ndarray): A colour, as RGB or RGBA samples of the output type, or a frame
+                of the size of the canvas.
+
+        Raises:
+            ValueError: If the background frame does not have the size of the canvas.
+        """
+        buffer = self._buffer
+        if isinstance(background, np.ndarray):
+            if background.shape[1::-1] != self.size:
+                raise ValueError(
+                    f"background of size {background.shape[1::-1]} does not match {self.size}"
+                )
+            colour, alpha = _split_alpha(background, self.dtype)
+            buffer[:, :, :3] = colour
+            if self.channels == 4:
+                if alpha is None:
+                    buffer[:, :, 3] = self._max
+                    self._opaque = True
+                else:
+                    buffer[:, :, 3:] = alpha
+                    self._opaque = bool((alpha == self._max).all())
+                    if not self._opaque:
+                        self._premultiply(buffer)
+            return
+        colour = tuple(background)
+        alpha = colour[3] if len(colour) > 3 else self._max
+        buffer[:, :, :3] = [(c * alpha + self._max // 2) // self._max for c in colour[:3]]
+        if self.channels == 4:
+            buffer[:, :, 3] = alpha
+            self._opaque = alpha == self._max
+
+    def paste(self, frame: np.ndarray, pos: tuple[int, int]) -> None:
+        """
+        Blends a frame with straight alpha over the canvas, touching only the rectangle it covers.
+
+        Args:
+            frame (np.ndarray): The frame, shaped (h, w), (h, w, 2), (h, w, 3) or (h, w, 4).
+            pos (tuple[int, int]): The position of the top left corner of the frame on the canvas, which may lie
+                outside of it.
+        """
+        x, y = int(pos[0]), int(pos[1])
+        h, w = frame.shape[:2]
+        left, top = max(x, 0), max(y, 0)
+        right, bottom = min(x + w, self.size[0]), min(y + h, self.size[1])
+        if left >= right or top >= bottom:
+            return
+        colour, alpha = _split_alpha(
+            frame[top - y : bottom - y, left - x : right - x], self.dtype
+        )
+        region = self._buffer[top:bottom, left:right]
+        if alpha is None or (alpha == self._max).all():
+            region[:, :, :3] = colour
+            if self.channels == 4:
+                region[:, :, 3] = self._max
+            return
+        a = alpha.astype(np.uint32)
+        inverse = self._max - a
+        half = self._max // 2
+        # Premultiplies the layer and blends it in one rounding: (c * a + d * (max - a)) / max
+        region[:, :, :3] = (
+            colour * a + region[:, :, :3] * inverse + half
+        ) // self._max
+        if self.channels == 4:
+            region[:, :, 3:] = a + (region[:, :, 3:] * inverse + half) // self._max
+
+    def result(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Returns the composited frame with straight alpha.
+
+        The canvas is reused by the next frame, so the frame is written to `out` or to a new array.
+
+        Args:
+            out (np.ndarray | None, optional): An array shaped like the canvas to write the frame to. Defaults to None,
+                a new array.
+
+        Returns:
+            np.ndarray: The frame, shaped (height, width, channels).
+        """
+        if out is None:
+            out = np.empty_like(self._buffer)
+        np.copyto(out, self._buffer)
+        if not self._opaque:
+            alpha = self._buffer[:, :, 3:].astype(np.uint32)
+            translucent = (alpha > 0) & (alpha < self._max)
+            straight = (
+                self._buffer[:, :, :3].astype(np.uint32) * self._max + alpha // 2
+            ) // np.maximum(alpha, 1)
+            np.copyto(out[:, :, :3], straight, where=translucent, casting="unsafe")
+        return out
+
+    def _premultiply(self, buffer: np.ndarray) -> None:
+        """
+        Premultiplies the colour samples of an RGBA canvas by its alpha, in place.
+        """
+        alpha = buffer[:, :, 3:].astype(np.uint32)
+        buffer[:, :, :3] = (buffer[:, :, :3] * alpha + self._max // 2) // self._max
@@ -0,0 +1,319 @@
+"""
+This module contains the effect graph which records how the frames of a video clip are produced.
+
+Instead of replacing `make_frame_array` and `make_frame_pil` with nested closures, effects add a node on top of the
+graph of the clip, and the clip renders its frames through the node at the top. The graph is plain data: it can be
+walked and inspected, and a pass can rewrite it, for example to fuse or reorder operations. The effects of vidiopy
+use module level functions and partials of them for their operations, so their nodes pickle whenever the clips do.
+
+The nodes are:
+    - `SourceNode`: the frames of a clip itself, before any effect.
+    - `FunctionNode`: frame functions set on a clip by hand, which the graph can only call.
+    - `FrameOpNode`: a function applied to each frame, optionally with its time.
+    - `TimeRemapNode`: a function mapping output time to input time.
+    - `ColorOpsNode`, in `vidiopy.video.color_ops`: a chain of point operations on the colours, run in one pass.
+    - `CompositeNode` and `ConcatNode`: the frames of a CompositeVideoClip or ConcatenateVideoClip, with the graphs
+      of their clips as inputs.
+"""
+
+from typing import Any, Callable, Iterator
+import numpy as np
+from PIL import Image
+
+__all__ = [
+    "Node",
+    "SourceNode",
+    "FunctionNode",
+    "FrameOpNode",
+    "TimeRemapNode",
+    "CompositeNode",
+    "ConcatNode",
+    "graph_of",
+    "apply_node",
+    "frame_to_pil",
+]
+
+# PIL modes of uint8 frames by their number of channels, 0 for 2-D frames.
+_PIL_MODES = {0: "L", 1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+
+def frame_to_pil(frame: np.ndarray) -> Image.Image:
+    """
+    Wraps a frame array in a PIL Image.
+
+    PIL maps "L" and "RGBA" images onto the memory of the array, so those frames are not copied, and the image is read
+    only; other frames are copied once into the layout of PIL.
+
+    Args:
+        frame (np.ndarray): The frame, shaped (h, w) or (h, w, channels).
+
+    Returns:
+        Image.Image: The image.
+    """
+    frame = np.asarray(frame)
+    mode = _PIL_MODES.get(frame.shape[2] if frame.ndim == 3 else 0)
+    if frame.dtype != np.uint8 or mode is None:
+        return Image.fromarray(frame)
+    frame = np.ascontiguousarray(frame)
+    return Image.frombuffer(mode, frame.shape[1::-1], frame, "raw", mode, 0, 1)
+
+
+class Node:
+    """
+    A base class of the nodes of an effect graph.
+
+    Attributes:
+        inputs (tuple[Node, ...]): The nodes the frames of this node are computed from.
+
+    Methods:
+        render(t): Returns the frame at time t as a numpy array.
+        render_pil(t): Returns the frame at time t as a PIL Image.
+        walk(): Yields this node and all the nodes it depends on, top first.
+        rebase(old, new): Returns the graph with the clip `old` replaced by `new`.
+    """
+
+    inputs: tuple["Node", ...] = ()
+
+    def render(self, t: int | float) -> np.ndarray:
+        """
+        Returns the frame at time `t` as a numpy array.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            np.ndarray: The frame.
+        """
+        raise NotImplementedError("render method must be overridden in the subclass.")
+
+    def render_pil(self, t: int | float) -> Image.Image:
+        """
+        Returns the frame at time `t` as a PIL Image.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            Image.Image: The frame.
+        """
+        return frame_to_pil(self.render(t))
+
+    def walk(self) -> Iterator["Node"]:
+        """
+        Yields this node and all the nodes it depends on, depth first, top first.
+
+        Yields:
+            Node: The nodes of the graph.
+        """
+        yield self
+        for node in self.inputs:
+            yield from node.walk()
+
+    def rebase(self, old: Any, new: Any) -> "Node":
+        """
+        Returns this graph with the frames of clip `old` replaced by those of clip `new`, used by copies of clips.
+
+        Args:
+            old (VideoClip): The clip to replace.
+            new (VideoClip): The clip to render instead.
+
+        Returns:
+            Node: The new graph, or this node if nothing changed.
+        """
+        return self
+
+
+class SourceNode(Node):
+    """
+    A node rendering the frames of a clip itself, with the make_frame methods of its class.
+
+    Attributes:
+        clip (VideoClip): The clip.
+    """
+
+    def __init__(self, clip: Any) -> None:
+        self.clip = clip
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.clip.__class__.__name__})"
+
+    def render(self, t: int | float) -> np.ndarray:
+        return type(self.clip).make_frame_array(self.clip, t)
+
+    def render_pil(self, t: int | float) -> Image.Image:
+        return type(self.clip).make_frame_pil(self.clip, t)
+
+    def rebase(self, old: Any, new: Any) -> Node:
+        return self.__class__(new) if self.clip is old else self
+
+
+class FunctionNode(Node):
+    """
+    A node calling frame functions which were set on a clip directly, outside of the graph.
+
+    Attributes:
+        make_frame_array (Callable): The function returning a frame as an array.
+        make_frame_pil (Callable | None): The function returning a frame as a PIL Image, if any.
+    """
+
+    def __init__(
+        self, make_frame_array: Callable, make_frame_pil: Callable | None = None
+    ) -> None:
+        self.make_frame_array = make_frame_array
+        self.make_frame_pil = make_frame_pil
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({getattr(self.make_frame_array, '__name__', self.make_frame_array)})"
+
+    def render(self, t: int | float) -> np.ndarray:
+        return self.make_frame_array(t)
+
+    def render_pil(self, t: int | float) -> Image.Image:
+        if self.make_frame_pil is None:
+            return frame_to_pil(self.render(t))
+        return self.make_frame_pil(t)
+
+
+class FrameOpNode(Node):
+    """
+    A node applying a function to each frame of its input.
+
+    Attributes:
+        input (Node): The node the frames come from.
+        func (Callable[..., np.ndarray]): The function, called as func(frame, *args, **kwargs), or
+            func(frame, t, *args, **kwargs) if `timed`.
+        args (tuple): Additional positional arguments of the function.
+        kwargs (dict): Additional keyword arguments of the function.
+        timed (bool): Whether the function takes the time of the frame.
+    """
+
+    def __init__(
+        self,
+        input: Node,
+        func: Callable[..., np.ndarray],
+        args: tuple = (),
+        kwargs: dict | None = None,
+        timed: bool = False,
+    ) -> None:
+        self.input = input
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.timed = timed
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        return (self.input,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({getattr(self.func, '__name__', self.func)}, args={self.args}, kwargs={self.kwargs}, timed={self.timed})"
+
+    def render(self, t: int | float) -> np.ndarray:
+        frame = np.asarray(self.input.render(t))
+        if self.timed:
+            return self.func(frame, t, *self.args, **self.kwargs)
+        return self.func(frame, *self.args, **self.kwargs)
+
+    def rebase(self, old: Any, new: Any) -> Node:
+        input = self.input.rebase(old, new)
+        if input is self.input:
+            return self
+        return self.__class__(input, self.func, self.args, self.kwargs, self.timed)
+
+
+class TimeRemapNode(Node):
+    """
+    A node showing the frame of its input at another time.
+
+    Attributes:
+        input (Node): The node the frames come from.
+        func_t (Callable[[int | float], int | float]): The function mapping the output time to the input time.
+    """
+
+    def __init__(self, input: Node, func_t: Callable[[int | float], int | float]) -> None:
+        self.input = input
+        self.func_t = func_t
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        return (self.input,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({getattr(self.func_t, '__name__', self.func_t)})"
+
+    def render(self, t: int | float) -> np.ndarray:
+        return self.input.render(self.func_t(t))
+
+    def render_pil(self, t: int | float) -> Image.Image:
+        return self.input.render_pil(self.func_t(t))
+
+    def rebase(self, old: Any, new: Any) -> Node:
+        input = self.input.rebase(old, new)
+        if input is self.input:
+            return self
+        return self.__class__(input, self.func_t)
+
+
+class CompositeNode(SourceNode):
+    """
+    A node rendering the frames of a CompositeVideoClip, whose inputs are the graphs of its background and layers.
+
+    Attributes:
+        clip (CompositeVideoClip): The composite.
+    """
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        clips = (self.clip.bg_clip,) if self.clip.bg_clip is not None else ()
+        return tuple(graph_of(clip) for clip in clips + self.clip.clips)
+
+
+class ConcatNode(SourceNode):
+    """
+    A node rendering the frames of a ConcatenateVideoClip, whose inputs are the graphs of its clips in playing order.
+
+    Attributes:
+        clip (ConcatenateVideoClip): The concatenation.
+    """
+
+    @property
+    def inputs(self) -> tuple[Node, ...]:
+        return tuple(graph_of(clip) for clip in self.clip.clips)
+
+
+def graph_of(clip: Any) -> Node:
+    """
+    Returns the node at the top of the effect graph of a clip.
+
+    Frame functions set on the clip directly, outside of the graph, become a `FunctionNode`.
+
+    Args:
+        clip (VideoClip): The clip.
+
+    Returns:
+        Node: The top node of the graph, the source node of the clip if no effect was applied.
+    """
+    graph = clip.__dict__.get("_graph")
+    make_frame_array = clip.__dict__.get("make_frame_array")
+    if graph is not None and getattr(make_frame_array, "__self__", None) is graph:
+        return graph
+    if make_frame_array is not None:
+        return FunctionNode(make_frame_array, clip.__dict__.get("make_frame_pil"))
+    return clip._source_node()
+
+
+def apply_node(clip: Any, node: Node) -> Any:
+    """
+    Puts a node at the top of the effect graph of a clip, so the clip renders its frames through it.
+
+    Args:
+        clip (VideoClip): The clip.
+        node (Node): The new top node, usually built on `graph_of(clip)`.
+
+    Returns:
+        VideoClip: The clip.
+    """
+    clip._graph = node
+    clip.make_frame_array = node.render
+    clip.make_frame_pil = node.render_pil
+    return clip
@@ -0,0 +1,404 @@
+"""
+This module contains the streaming frame reader used by the lazy VideoFileClip.
+
+Instead of decoding a whole video file into memory, the reader keeps one ffmpeg process open
+and pulls raw frames from its stdout pipe as they are requested. Only a small, bounded buffer of
+recently decoded frames is kept in memory.
+"""
+
+import os
+import subprocess
+from collections import OrderedDict
+import ffmpegio
+import numpy as np
+import numpy.typing as npt
+from .frame_cache import FrameCache, frame_cache, file_source
+from .keyframe_index import KeyframeIndex
+from .. import config
+
+__all__ = ["FFmpegVideoReader", "output_pix_fmt"]
+
+# Number of channels of each raw pixel format the reader can produce.
+PIX_FMT_CHANNELS = {"gray": 1, "ya8": 2, "rgb24": 3, "rgba": 4}
+
+
+def output_pix_fmt(input_pix_fmt: str | None) -> str:
+    """
+    Picks the 8 bit raw pixel format used to read a stream with the given pixel format.
+
+    This mirrors the choice `ffmpegio.video.read` makes for 8 bit streams so that the lazy and the eager
+    paths of VideoFileClip produce the same frames.
+
+    Args:
+        input_pix_fmt (str | None): The pixel format of the video stream, as reported by ffprobe.
+
+    Returns:
+        str: One of "gray", "ya8", "rgb24" or "rgba".
+    """
+    if not input_pix_fmt:
+        return "rgb24"
+    try:
+        n_components = ffmpegio.caps.pix_fmts()[input_pix_fmt]["nb_components"]
+    except Exception:
+        n_components = 4 if "a" in input_pix_fmt.replace("gray", "") else 3
+    return {1: "gray", 2: "ya8", 3: "rgb24", 4: "rgba"}.get(n_components, "rgb24")
+
+
+def _split_options(options: dict) -> tuple[list[str], list[str]]:
+    """
+    Converts a dict of ffmpegio style options into ffmpeg command line arguments.
+
+    Options whose name ends with `_in` are input options (placed before `-i`), the others are output options.
+
+    Args:
+        options (dict): The ffmpegio style options.
+
+    Returns:
+        tuple[list[str], list[str]]: The input and the output arguments.
+    """
+    input_args: list[str] = []
+    output_args: list[str] = []
+    for key, value in options.items():
+        if key.endswith("_in"):
+            input_args += [f"-{key[:-3]}", str(value)]
+        else:
+            output_args += [f"-{key}", str(value)]
+    return input_args, output_args
+
+
+class FFmpegVideoReader:
+    """
+    A class used to decode the frames of a video file on demand.
+
+    The reader keeps a single ffmpeg process running which writes raw frames to a pipe. Frames are read
+    sequentially from that pipe; a request for a frame behind the current position, or far ahead of it,
+    restarts ffmpeg with an input seek. The last `buffer_size` decoded frames are kept in an LRU buffer
+    so that small jumps backwards do not need a new decode, and every decoded frame is also put in the
+    process-wide FrameCache, so other readers of the same file (copies made by effects, composites)
+    share the frames instead of decoding them again.
+
+    For random access the reader uses the KeyframeIndex of the file: it seeks to the keyframe at or
+    before the requested frame and decodes forward from there, and it only seeks when a keyframe lies
+    between the current position and the requested frame. The index is loaded on the first
+    non-sequential request, so plain sequential reading never scans the file.
+
+    A reader inherited by a forked process (see `VideoClip.write_videofile(workers=...)`) leaves the ffmpeg
+    process of its parent alone and starts its own on the first request.
+
+    Attributes:
+        filename (str): The path of the video file.
+        fps (float): The frame rate of the video stream.
+        size (tuple[int, int]): The width and height of the decoded frames.
+        pix_fmt (str): The raw pixel format of the decoded frames.
+        ffmpeg_options (dict): Additional ffmpegio style options passed to ffmpeg.
+        buffer_size (int): The maximum number of decoded frames kept in memory.
+        use_index (bool): Whether random access uses the keyframe index of the file.
+        cache (FrameCache | None): The shared frame cache, None to disable it.
+        source (Hashable): The source part of the cache keys of this reader's frames.
+
+    Methods:
+        get_frame(index): Returns the frame with the given index.
+        close(): Stops the ffmpeg process and drops the buffer.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        fps: float | int,
+        size: tuple[int, int],
+        pix_fmt: str = "rgb24",
+        ffmpeg_options: dict | None = None,
+        buffer_size: int | None = None,
+        use_index: bool = True,
+        cache: FrameCache | None = frame_cache,
+    ) -> None:
+        """
+        Initializes a new instance of the FFmpegVideoReader class.
+
+        No ffmpeg process is started until the first frame is requested.
+
+        Args:
+            filename (str): The path of the video file.
+            fps (float | int): The frame rate of the video stream.
+            size (tuple[int, int]): The width and height of the decoded frames.
+            pix_fmt (str, optional): The raw pixel format to decode to. Defaults to "rgb24".
+            ffmpeg_options (dict | None, optional): Additional ffmpegio style options. Defaults to None.
+            buffer_size (int | None, optional): The maximum number of decoded frames kept in memory.
+                Defaults to `config.VIDEO_READER_BUFFER_SIZE`.
+            use_index (bool, optional): Whether random access uses the keyframe index of the file. Defaults to True.
+            cache (FrameCache | None, optional): The frame cache to share frames through. Defaults to the process-wide cache.
+
+        Raises:
+            ValueError: If the pixel format is not supported.
+        """
+        if pix_fmt not in PIX_FMT_CHANNELS:
+            raise ValueError(f"Unsupported pixel format '{pix_fmt}'")
+        self.filename = str(filename)
+        self.fps = fps
+        self.size = size
+        self.pix_fmt = pix_fmt
+        self.ffmpeg_options = dict(ffmpeg_options) if ffmpeg_options else {}
+        self.buffer_size = max(
+            1, buffer_size if buffer_size is not None else config.VIDEO_READER_BUFFER_SIZE
+        )
+        self.channels = PIX_FMT_CHANNELS[pix_fmt]
+        self.use_index = use_index
+        self.cache = cache
+        self.source = file_source(self.filename, repr(sorted(self.ffmpeg_options.items())))
+        self._index: KeyframeIndex | None = None
+        self._proc: subprocess.Popen | None = None
+        self._pid = os.getpid()
+        self._pos = 0
+        # The number of frames in the stream, known once a read ran into its end
+        self._eof: int | None = None
+        self._buffer: OrderedDict[int, npt.NDArray[np.uint8]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(filename={self.filename}, fps={self.fps}, size={self.size}, pix_fmt={self.pix_fmt}, buffer_size={self.buffer_size})"
+
+    def __copy__(self) -> "FFmpegVideoReader":
+        # A copy must never share the ffmpeg pipe, it gets its own process on first use.
+        reader = self.__class__(
+            self.filename,
+            self.fps,
+            self.size,
+            self.pix_fmt,
+            self.ffmpeg_options,
+            self.buffer_size,
+            self.use_index,
+            self.cache,
+        )
+        reader._index = self._index
+        reader._eof = self._eof
+        return reader
+
+    def __del__(self) -> None:
+        self.close()
+
+    @property
+    def index(self) -> KeyframeIndex | None:
+        """
+        The keyframe index of the file, loaded on first use.
+
+        Returns:
+            KeyframeIndex | None: The index, or None if it is disabled or the file could not be indexed.
+        """
+        if self._index is None and self.use_index:
+            try:
+                self._index = KeyframeIndex.load(self.filename)
+            except Exception:
+                self.use_index = False
+        return self._index
+
+    @property
+    def frame_shape(self) -> tuple[int, ...]:
+        """
+        The shape of a single decoded frame.
+
+        Returns:
+            tuple[int, ...]: (height, width) for gray frames, (height, width, channels) otherwise.
+        """
+        w, h = self.size
+        return (h, w) if self.channels == 1 else (h, w, self.channels)
+
+    @property
+    def frame_nbytes(self) -> int:
+        """
+        The number of bytes of a single decoded frame.
+
+        Returns:
+            int: width * height * channels.
+        """
+        return self.size[0] * self.size[1] * self.channels
+
+    def get_frame(self, index: int) -> npt.NDArray[np.uint8]:
+        """
+        Returns the frame with the given index.
+
+        Buffered or cached frames are returned directly. Otherwise the frame is decoded, either by reading forward
+        from the running ffmpeg process or by restarting ffmpeg at the requested position.
+        If the stream ends before the frame is reached, the last frame of the stream is returned. The end is remembered,
+        so later requests past it return the last frame without starting ffmpeg again.
+
+        Args:
+            index (int): The index of the frame, starting at 0.
+
+        Returns:
+            npt.NDArray[np.uint8]: The decoded frame, read-only if it is cached.
+
+        Raises:
+            IOError: If no frame could be decoded at all.
+        """
+        index = max(0, int(index))
+        frame = self._buffer.get(index)
+        if frame is not None:
+            self._buffer.move_to_end(index)
+            return frame
+        if self.cache is not None:
+            frame = self.cache.get(self._cache_key(index))
+            if frame is not None:
+                self._remember(index, frame, cache=False)
+                return frame
+        if self._eof is not None and index >= self._eof:
+            return self.get_frame(self._eof - 1)
+
+        if self._proc is not None and self._pid != os.getpid():
+            # The pipe belongs to the process this one was forked from
+            self._proc = None
+        if self._proc is None or self._needs_seek(index):
+            self._open(index)
+
+        while self._pos <= index:
+            frame = self._read_frame()
+            if frame is None:
+                # The stream ended early, so the last frame is the one before `self._pos`.
+                if self._pos == 0:
+                    raise IOError(f"Failed to decode frame {index} of '{self.filename}'")
+                self._eof = self._pos if self._eof is None else min(self._eof, self._pos)
+                return self.get_frame(self._pos - 1)
+            self._remember(self._pos, frame)
+            self._pos += 1
+
+        return self._buffer[index]
+
+    def close(self) -> None:
+        """
+        Stops the ffmpeg process and drops all buffered frames.
+        """
+        self._stop()
+        self._buffer.clear()
+
+    def _needs_seek(self, index: int) -> bool:
+        """
+        Decides whether ffmpeg must be restarted to reach the given frame.
+
+        Going backwards always needs a restart. Going forwards, seeking pays off as soon as a keyframe
+        lies between the current position and the frame, since decoding forward would have to pass that
+        keyframe anyway. Without a keyframe index the reader keeps decoding unless the frame is more than
+        two seconds ahead.
+
+        Args:
+            index (int): The index of the requested frame.
+
+        Returns:
+            bool: True if ffmpeg should be restarted at `index`.
+        """
+        if index == self._pos:
+            return False
+        if index < self._pos:
+            return True
+        if self.index is not None:
+            return self.index.keyframe_before(index) > self._pos
+        return index - self._pos > max(1, int(2 * self.fps))
+
+    def _open(self, index: int) -> None:
+        """
+        (Re)starts ffmpeg so that the frame `index` is among the next frames written to the pipe.
+
+        With a keyframe index ffmpeg seeks straight to the keyframe at or before the frame and decodes
+        from there, and the reader skips forward to the frame. Without it, ffmpeg does an accurate seek
+        to the frame itself.
+
+        Args:
+            index (int): The index of the frame to decode.
+        """
+        self._stop()
+        input_args, output_args = _split_options(self.ffmpeg_options)
+        args = [config.FFMPEG_BINARY or ffmpegio.get_path(), "-v", "error", "-nostdin"]
+        start = index
+        if index > 0:
+            keyframes = self.index
+            if keyframes is not None:
+                start = keyframes.keyframe_before(index)
+            if start > 0 and keyframes is not None:
+                # Aim a quarter frame after the keyframe, ffmpeg then starts decoding at that keyframe.
+                ss = keyframes.time_of(start) + 0.25 / float(self.fps)
+                args += ["-noaccurate_seek", "-ss", repr(max(0.0, ss))]
+            elif start > 0:
+                # Seek half a frame before the frame so rounding never skips it.
+                args += ["-ss", repr(max(0.0, (start - 0.5) / float(self.fps)))]
+        args += input_args
+        args += ["-i", self.filename]
+        args += output_args
+        # passthrough keeps ffmpeg from duplicating frames to fill the gap left by the seek
+        args += ["-an", "-vsync", "passthrough"]
+        args += ["-f", "rawvideo", "-pix_fmt", self.pix_fmt, "-"]
+        self._proc = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=self.frame_nbytes,
+        )
+        self._pid = os.getpid()
+        self._pos = start
+
+    def _stop(self) -> None:
+        """
+        Terminates the running ffmpeg process, if any.
+        """
+        proc = getattr(self, "_proc", None)
+        if proc is None:
+            return
+        self._proc = None
+        if getattr(self, "_pid", None) != os.getpid():
+            # Never stop the ffmpeg process of the parent of a forked process
+            return
+        try:
+            if proc.stdout:
+                proc.stdout.close()
+            proc.terminate()
+            proc.wait()
+        except Exception:
+            pass
+
+    def _read_frame(self) -> npt.NDArray[np.uint8] | None:
+        """
+        Reads the next raw frame from the ffmpeg pipe.
+
+        Returns:
+            npt.NDArray[np.uint8] | None: The frame, or None at the end of the stream.
+        """
+        if self._proc is None or self._proc.stdout is None:
+            return None
+        nbytes = self.frame_nbytes
+        data = bytearray(nbytes)
+        view = memoryview(data)
+        read = 0
+        while read < nbytes:
+            n = self._proc.stdout.readinto(view[read:])
+            if not n:
+                self._stop()
+                return None
+            read += n
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.frame_shape)
+
+    def _cache_key(self, index: int) -> tuple:
+        """
+        Returns the key of a frame of this reader in the frame cache.
+
+        Args:
+            index (int): The index of the frame.
+
+        Returns:
+            tuple: (source, index, pixel format, size).
+        """
+        return (self.source, index, self.pix_fmt, tuple(self.size))
+
+    def _remember(
+        self, index: int, frame: npt.NDArray[np.uint8], cache: bool = True
+    ) -> None:
+        """
+        Stores a decoded frame in the LRU buffer, evicting the oldest one if it is full.
+
+        Args:
+            index (int): The index of the frame.
+            frame (npt.NDArray[np.uint8]): The decoded frame.
+            cache (bool, optional): Whether to also put the frame in the shared frame cache. Defaults to True.
+        """
+        if cache and self.cache is not None:
+            frame = self.cache.put(self._cache_key(index), frame)
+        self._buffer[index] = frame
+        self._buffer.move_to_end(index)
+        while len(self._buffer) > self.buffer_size:
+            self._buffer.popitem(last=False)
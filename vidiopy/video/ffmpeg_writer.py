@@ -0,0 +1,664 @@
+"""
+This module contains the streaming frame writer used by `VideoClip.write_videofile`.
+
+Frames are handed to the writer one at a time and go through a bounded queue to a thread which
+pipes them to the stdin of an ffmpeg process. Rendering the next frame and encoding the previous
+ones overlap, and at most `queue_size` frames are held in memory at any time, whatever the length
+of the video.
+
+The writer can also take the audio track as blocks of samples. They are piped as raw PCM through a
+second pipe, passed to ffmpeg as an extra file descriptor, so a single ffmpeg process encodes and
+muxes both streams without any intermediate file. This needs a POSIX system.
+
+`concat_video_files` joins video files encoded with the same settings, like the segments rendered in
+parallel by `VideoClip.write_videofile(workers=...)`, with the concat demuxer and without re-encoding.
+`copy_video_stream` copies a keyframe-aligned range of a video stream without re-encoding it, which is
+how unmodified file clips are exported. `stream_copy_format` tells whether video streams of different
+files can be joined that way.
+"""
+
+import math
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import Callable, Iterable, Sequence
+import ffmpegio
+import numpy as np
+import numpy.typing as npt
+from .ffmpeg_reader import PIX_FMT_CHANNELS, _split_options
+from .. import config
+
+__all__ = [
+    "FFmpegVideoWriter",
+    "concat_video_files",
+    "copy_video_stream",
+    "stream_copy_format",
+    "supports_audio_pipe",
+]
+
+# Properties of a video stream which must be the same for streams to be joined without re-encoding.
+STREAM_COPY_ENTRIES = (
+    "codec_name",
+    "profile",
+    "width",
+    "height",
+    "pix_fmt",
+    "time_base",
+    "r_frame_rate",
+)
+
+# Raw pixel format of the frames written for each number of channels.
+CHANNELS_PIX_FMT = {channels: pix_fmt for pix_fmt, channels in PIX_FMT_CHANNELS.items()}
+
+# Raw PCM format of the samples written for each (dtype kind, itemsize).
+SAMPLE_FORMATS = {
+    ("u", 1): "u8",
+    ("i", 2): "s16le",
+    ("i", 4): "s32le",
+    ("i", 8): "s64le",
+    ("f", 4): "f32le",
+    ("f", 8): "f64le",
+}
+
+
+def supports_audio_pipe() -> bool:
+    """
+    Checks whether audio can be piped to ffmpeg next to the video, which needs file descriptor passing.
+
+    Returns:
+        bool: True on POSIX systems.
+    """
+    return os.name == "posix"
+
+
+def _as_pcm(block: npt.NDArray) -> tuple[npt.NDArray, str]:
+    """
+    Converts a block of samples to little-endian raw PCM.
+
+    Args:
+        block (npt.NDArray): The samples, shaped (samples,) or (samples, channels).
+
+    Returns:
+        tuple[npt.NDArray, str]: The samples shaped (samples, channels) and their ffmpeg sample format.
+    """
+    block = np.asarray(block)
+    if block.ndim == 1:
+        block = block[:, None]
+    sample_fmt = SAMPLE_FORMATS.get((block.dtype.kind, block.dtype.itemsize))
+    if sample_fmt is None:
+        block, sample_fmt = block.astype(np.float32), "f32le"
+    return np.ascontiguousarray(block, dtype=block.dtype.newbyteorder("<")), sample_fmt
+
+
+class _AudioPipe:
+    """
+    Pipes blocks of samples to an ffmpeg input from a thread, through a pipe passed to ffmpeg as an extra file descriptor.
+
+    Call `input_args` before starting ffmpeg with `pass_fds`, then `start` once it runs, or `close` if it could not start.
+    """
+
+    def __init__(
+        self,
+        blocks: Iterable[npt.NDArray],
+        fps: int,
+        stopped: Callable[[], bool] = lambda: False,
+    ) -> None:
+        """
+        Args:
+            blocks (Iterable[npt.NDArray]): Blocks of samples shaped (samples,) or (samples, channels).
+            fps (int): The sample rate of the blocks.
+            stopped (Callable[[], bool], optional): Tells the thread to stop piping, for example once ffmpeg failed.
+        """
+        self.fps = fps
+        self.error: BaseException | None = None
+        self._blocks = iter(blocks)
+        self._stopped = stopped
+        self._first_block: npt.NDArray | None = None
+        self._fds: tuple[int, int] | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pass_fds(self) -> tuple[int, ...]:
+        """
+        The file descriptors ffmpeg must inherit.
+        """
+        return self._fds[:1] if self._fds else ()
+
+    def input_args(self) -> list[str]:
+        """
+        Peeks the first block, which gives the sample format and the number of channels, and opens the pipe.
+
+        Returns:
+            list[str]: The ffmpeg arguments of the audio input, empty if there are no samples.
+        """
+        first_block = next(self._blocks, None)
+        if first_block is None:
+            return []
+        self._first_block, sample_fmt = _as_pcm(first_block)
+        self._fds = os.pipe()
+        return [
+            "-f", sample_fmt,
+            "-ar", str(self.fps),
+            "-ac", str(self._first_block.shape[1]),
+            "-i", f"pipe:{self._fds[0]}",
+        ]
+
+    def start(self) -> None:
+        """
+        Starts the thread, once ffmpeg has inherited the read end of the pipe.
+        """
+        if self._fds is None:
+            return
+        # Only ffmpeg reads the pipe, so it sees its end once the thread closes it.
+        os.close(self._fds[0])
+        self._thread = threading.Thread(target=self._pipe, args=(self._fds[1],), daemon=True)
+        self._fds = None
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Closes the pipe if the thread was never started.
+        """
+        if self._fds is not None:
+            os.close(self._fds[0])
+            os.close(self._fds[1])
+            self._fds = None
+
+    def join(self) -> None:
+        """
+        Waits until all blocks are piped.
+        """
+        if self._thread is not None:
+            self._thread.join()
+
+    def _pipe(self, fd: int) -> None:
+        """
+        Runs in the thread: pipes the blocks of samples to ffmpeg.
+
+        Args:
+            fd (int): The write end of the pipe.
+        """
+        try:
+            with os.fdopen(fd, "wb") as pipe:
+                pipe.write(memoryview(self._first_block).cast("B"))  # type: ignore
+                for block in self._blocks:
+                    if self._stopped():
+                        break
+                    pipe.write(memoryview(_as_pcm(block)[0]).cast("B"))
+        except BaseException as error:
+            self.error = error
+
+
+def _audio_input(
+    audio: Iterable[npt.NDArray] | None,
+    audio_fps: int | None,
+    audio_source: tuple[str, float, float] | None,
+) -> tuple[list[str], _AudioPipe | None]:
+    """
+    Builds the second ffmpeg input, which carries the audio track, of the stream copy functions.
+
+    Args:
+        audio (Iterable[npt.NDArray] | None): Blocks of samples to pipe to ffmpeg.
+        audio_fps (int | None): The sample rate of the audio blocks.
+        audio_source (tuple[str, float, float] | None): A file, start time and duration to take the audio from instead.
+
+    Returns:
+        tuple[list[str], _AudioPipe | None]: The arguments of the input and its map, and the pipe to start once ffmpeg runs.
+
+    Raises:
+        ValueError: If `audio` is given without `audio_fps`.
+        OSError: If `audio` is given on a system which cannot pipe it, see `supports_audio_pipe`.
+    """
+    if audio_source is not None:
+        path, start, duration = audio_source
+        args = ["-ss", repr(float(start)), "-t", repr(float(duration)), "-i", str(path)]
+        return args + ["-map", "0:v:0", "-map", "1:a:0?"], None
+    if audio is None:
+        return ["-map", "0:v:0"], None
+    if not audio_fps:
+        raise ValueError("audio_fps is required to write audio")
+    if not supports_audio_pipe():
+        raise OSError("Piping audio to ffmpeg is not supported on this system")
+    audio_pipe = _AudioPipe(audio, audio_fps)
+    args = audio_pipe.input_args()
+    if not args:
+        return ["-map", "0:v:0"], None
+    return args + ["-map", "0:v:0", "-map", "1:a"], audio_pipe
+
+
+def _run_ffmpeg(
+    args: list[str], output: str, show_log: bool, audio_pipe: _AudioPipe | None
+) -> None:
+    """
+    Runs ffmpeg to completion while the audio pipe, if any, feeds it.
+
+    Args:
+        args (list[str]): The ffmpeg command line.
+        output (str): The path of the output file, for error messages.
+        show_log (bool): Whether to show the log of ffmpeg.
+        audio_pipe (_AudioPipe | None): The audio pipe whose read end ffmpeg inherits.
+
+    Raises:
+        IOError: If ffmpeg failed.
+    """
+    try:
+        proc = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=None if show_log else subprocess.PIPE,
+            pass_fds=audio_pipe.pass_fds if audio_pipe else (),
+        )
+    except BaseException:
+        if audio_pipe:
+            audio_pipe.close()
+        raise
+    if audio_pipe:
+        audio_pipe.start()
+    stderr = proc.stderr.read() if proc.stderr else b""
+    proc.wait()
+    if audio_pipe:
+        audio_pipe.join()
+    if proc.returncode:
+        log = stderr.decode(errors="replace").strip() if stderr else ""
+        raise IOError(f"ffmpeg failed to write '{output}': {log}")
+    if audio_pipe and audio_pipe.error is not None:
+        raise IOError(f"ffmpeg stopped accepting audio for '{output}'") from audio_pipe.error
+
+
+def _ffmpeg_args(show_log: bool, overwrite: bool) -> list[str]:
+    """
+    Returns the start of an ffmpeg command line.
+
+    Args:
+        show_log (bool): Whether to show the log of ffmpeg.
+        overwrite (bool): Whether to overwrite an existing output file.
+
+    Returns:
+        list[str]: The ffmpeg binary and its global options.
+    """
+    args = [config.FFMPEG_BINARY or ffmpegio.get_path(), "-nostdin"]
+    if not show_log:
+        args += ["-v", "error"]
+    return args + ["-y" if overwrite else "-n"]
+
+
+def concat_video_files(
+    filenames: Sequence[str],
+    output: str,
+    ffmpeg_options: dict | None = None,
+    overwrite: bool = True,
+    show_log: bool = False,
+    audio: Iterable[npt.NDArray] | None = None,
+    audio_fps: int | None = None,
+    audio_source: tuple[str, float, float] | None = None,
+) -> None:
+    """
+    Joins video files with the ffmpeg concat demuxer, copying the video stream without re-encoding it.
+
+    The files must have been encoded with the same codec and settings. The audio track of the output is
+    either piped as blocks of samples with `audio`, or taken from a range of another file with `audio_source`.
+
+    Args:
+        filenames (Sequence[str]): The files to join, in order.
+        output (str): The path of the output file.
+        ffmpeg_options (dict | None, optional): ffmpegio style output options, for example the audio codec. Defaults to None.
+        overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+        show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+        audio (Iterable[npt.NDArray] | None, optional): Blocks of samples shaped (samples, channels) to mux as the audio track. Defaults to None.
+        audio_fps (int | None, optional): The sample rate of the audio blocks. Required with `audio`.
+        audio_source (tuple[str, float, float] | None, optional): The file, start time and duration of the audio track. Defaults to None.
+
+    Raises:
+        ValueError: If there is no file to join or `audio` is given without `audio_fps`.
+        OSError: If `audio` is given on a system which cannot pipe it, see `supports_audio_pipe`.
+        IOError: If ffmpeg failed.
+
+    Example:
+        >>> concat_video_files(["part-0.mp4", "part-1.mp4"], "output.mp4")
+    """
+    if not filenames:
+        raise ValueError("need at least one file to concatenate")
+    output = str(output)
+    fd, list_file = tempfile.mkstemp(
+        suffix=".txt", prefix="concat-", dir=os.path.dirname(os.path.abspath(output))
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for filename in filenames:
+                path = os.path.abspath(filename).replace("'", "'\\''")
+                f.write(f"file '{path}'\n")
+        _, output_args = _split_options(ffmpeg_options or {})
+        audio_args, audio_pipe = _audio_input(audio, audio_fps, audio_source)
+        args = _ffmpeg_args(show_log, overwrite)
+        args += ["-f", "concat", "-safe", "0", "-i", list_file]
+        args += audio_args + output_args + ["-c:v", "copy", output]
+        _run_ffmpeg(args, output, show_log, audio_pipe)
+    finally:
+        os.remove(list_file)
+
+
+def stream_copy_format(filename: str) -> tuple:
+    """
+    Returns the properties of the first video stream of a file which `concat_video_files` needs to match.
+
+    Streams of files with the same format can be joined by the concat demuxer without re-encoding them.
+
+    Args:
+        filename (str): The path of the video file.
+
+    Returns:
+        tuple: The values of `STREAM_COPY_ENTRIES`.
+
+    Raises:
+        IOError: If the file has no video stream.
+
+    Example:
+        >>> stream_copy_format("part-0.mp4") == stream_copy_format("part-1.mp4")
+        True
+    """
+    streams = ffmpegio.probe.full_details(
+        str(filename), show_format=False, select_streams="v:0"
+    )["streams"]
+    if not streams:
+        raise IOError(f"'{filename}' has no video stream")
+    return tuple(streams[0].get(entry) for entry in STREAM_COPY_ENTRIES)
+
+
+def copy_video_stream(
+    filename: str,
+    output: str,
+    start: float = 0.0,
+    frames: int | None = None,
+    ffmpeg_options: dict | None = None,
+    overwrite: bool = True,
+    show_log: bool = False,
+    audio: Iterable[npt.NDArray] | None = None,
+    audio_fps: int | None = None,
+    audio_source: tuple[str, float, float] | None = None,
+) -> None:
+    """
+    Copies the first video stream of a file, or a range of it, without re-encoding it.
+
+    A stream can only be cut without re-encoding at a keyframe, so `start` must be the presentation time of
+    a keyframe, see `KeyframeIndex`. The audio track is handled like in `concat_video_files`.
+
+    Args:
+        filename (str): The path of the source file.
+        output (str): The path of the output file.
+        start (float, optional): The time of the keyframe to start at, relative to the start of the file. Defaults to 0.0.
+        frames (int | None, optional): The number of frames to copy. Defaults to None, up to the end.
+        ffmpeg_options (dict | None, optional): ffmpegio style output options, for example the audio codec. Defaults to None.
+        overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+        show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+        audio (Iterable[npt.NDArray] | None, optional): Blocks of samples shaped (samples, channels) to mux as the audio track. Defaults to None.
+        audio_fps (int | None, optional): The sample rate of the audio blocks. Required with `audio`.
+        audio_source (tuple[str, float, float] | None, optional): The file, start time and duration of the audio track. Defaults to None.
+
+    Raises:
+        ValueError: If `audio` is given without `audio_fps`.
+        OSError: If `audio` is given on a system which cannot pipe it, see `supports_audio_pipe`.
+        IOError: If ffmpeg failed.
+
+    Example:
+        >>> copy_video_stream("camera.mp4", "cut.mp4", start=12.0, frames=240)
+    """
+    output = str(output)
+    _, output_args = _split_options(ffmpeg_options or {})
+    audio_args, audio_pipe = _audio_input(audio, audio_fps, audio_source)
+    args = _ffmpeg_args(show_log, overwrite)
+    if start > 0:
+        # Input seeking with stream copy starts at the last keyframe before the seek point. ffmpeg reads the point in
+        # microseconds, rounding it up never lands on the previous keyframe and leaves the keyframe at time 0, where
+        # the audio starts too, instead of a little before it where it would be dropped.
+        args += ["-ss", f"{math.ceil(round(float(start) * 1e6, 3)) / 1e6:.6f}"]
+    args += ["-i", str(filename)]
+    args += audio_args + output_args + ["-c:v", "copy"]
+    if frames is not None:
+        args += ["-frames:v", str(frames)]
+    args += [output]
+    _run_ffmpeg(args, output, show_log, audio_pipe)
+
+
+class FFmpegVideoWriter:
+    """
+    A class used to encode frames to a video file as they are rendered.
+
+    The ffmpeg process is started with the first frame, whose shape gives the size and raw pixel format
+    of the video. All frames must have the same shape.
+
+    If `audio` is given, its blocks of samples are piped to the same ffmpeg process from a second thread,
+    and ffmpeg muxes both streams into the output file.
+
+    Attributes:
+        filename (str): The path of the output file.
+        fps (float | int): The frame rate of the output video.
+        ffmpeg_options (dict): Additional ffmpegio style options; options ending with `_in` apply to the raw input.
+        overwrite (bool): Whether to overwrite an existing output file.
+        show_log (bool): Whether to show the log of ffmpeg.
+        queue_size (int): The maximum number of frames waiting to be encoded.
+        audio_fps (int | None): The sample rate of the audio blocks.
+        frames_written (int): The number of frames piped to ffmpeg so far.
+
+    Methods:
+        write_frame(frame): Queues a frame for encoding, blocking while the queue is full.
+        close(): Waits until all queued frames are encoded and ffmpeg has finished the file.
+
+    Example:
+        >>> with FFmpegVideoWriter("output.mp4", 24) as writer:
+        ...     for frame in clip.iterate_frames_array_t(24):
+        ...         writer.write_frame(frame)
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        fps: float | int,
+        ffmpeg_options: dict | None = None,
+        overwrite: bool = True,
+        show_log: bool = False,
+        queue_size: int | None = None,
+        audio: Iterable[npt.NDArray] | None = None,
+        audio_fps: int | None = None,
+    ) -> None:
+        """
+        Initializes a new instance of the FFmpegVideoWriter class.
+
+        Args:
+            filename (str): The path of the output file.
+            fps (float | int): The frame rate of the output video.
+            ffmpeg_options (dict | None, optional): Additional ffmpegio style options. Defaults to None.
+            overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+            queue_size (int | None, optional): The maximum number of frames waiting to be encoded. Defaults to `config.WRITE_QUEUE_SIZE`.
+            audio (Iterable[npt.NDArray] | None, optional): Blocks of samples shaped (samples, channels) to mux as the audio track. Defaults to None.
+            audio_fps (int | None, optional): The sample rate of the audio blocks. Required with `audio`.
+
+        Raises:
+            ValueError: If `audio` is given without `audio_fps`.
+            OSError: If `audio` is given on a system which cannot pipe it, see `supports_audio_pipe`.
+        """
+        if audio is not None and not audio_fps:
+            raise ValueError("audio_fps is required to write audio")
+        if audio is not None and not supports_audio_pipe():
+            raise OSError("Piping audio to ffmpeg is not supported on this system")
+        self.filename = str(filename)
+        self.fps = fps
+        self.ffmpeg_options = dict(ffmpeg_options) if ffmpeg_options else {}
+        self.overwrite = overwrite
+        self.show_log = show_log
+        self.queue_size = max(
+            1, queue_size if queue_size is not None else config.WRITE_QUEUE_SIZE
+        )
+        self.frames_written = 0
+        self._shape: tuple[int, ...] | None = None
+        self._proc: subprocess.Popen | None = None
+        self._queue: queue.Queue = queue.Queue(self.queue_size)
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+        self.audio_fps = audio_fps
+        self._audio: _AudioPipe | None = (
+            _AudioPipe(audio, audio_fps, lambda: self._error is not None)  # type: ignore
+            if audio is not None
+            else None
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(filename={self.filename}, fps={self.fps}, queue_size={self.queue_size}, frames_written={self.frames_written})"
+
+    def __enter__(self) -> "FFmpegVideoWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
+
+    def write_frame(self, frame: npt.NDArray) -> None:
+        """
+        Queues a frame for encoding, blocking while `queue_size` frames are already waiting.
+
+        Args:
+            frame (npt.NDArray): The frame, (height, width) or (height, width, channels) with 1 to 4 channels.
+
+        Raises:
+            ValueError: If the frame does not have the shape of the first frame or has an unsupported number of channels.
+            IOError: If ffmpeg failed.
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if self._proc is None:
+            self._open(frame.shape)
+        elif frame.shape != self._shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} differs from the first frame shape {self._shape}"
+            )
+        self._raise_error()
+        self._queue.put(frame)
+
+    def close(self) -> None:
+        """
+        Waits until all queued frames are encoded and ffmpeg has finished the file.
+
+        Raises:
+            IOError: If ffmpeg failed or no frame was written.
+        """
+        if self._proc is None:
+            raise IOError(f"No frame was written to '{self.filename}'")
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+        if self._audio is not None:
+            self._audio.join()
+        proc, self._proc = self._proc, None
+        # The writer threads closed their pipes, so ffmpeg finishes the file and exits
+        stderr = proc.stderr.read() if proc.stderr else b""
+        proc.wait()
+        self._raise_error()
+        if proc.returncode:
+            log = stderr.decode(errors="replace").strip() if stderr else ""
+            raise IOError(f"ffmpeg failed to write '{self.filename}': {log}")
+
+    def _open(self, shape: tuple[int, ...]) -> None:
+        """
+        Starts ffmpeg and the writer thread for frames of the given shape.
+
+        Args:
+            shape (tuple[int, ...]): The shape of the frames.
+
+        Raises:
+            ValueError: If the number of channels is not supported.
+        """
+        channels = 1 if len(shape) == 2 else shape[2]
+        if len(shape) not in (2, 3) or channels not in CHANNELS_PIX_FMT:
+            raise ValueError(f"Unsupported frame shape {shape}")
+        self._shape = shape
+        input_args, output_args = _split_options(self.ffmpeg_options)
+        args = [config.FFMPEG_BINARY or ffmpegio.get_path(), "-nostdin"]
+        if not self.show_log:
+            args += ["-v", "error"]
+        args += ["-y" if self.overwrite else "-n"]
+        args += ["-f", "rawvideo", "-pix_fmt", CHANNELS_PIX_FMT[channels]]
+        args += ["-s", f"{shape[1]}x{shape[0]}", "-r", str(self.fps)]
+        args += input_args
+        args += ["-i", "-"]
+
+        audio_args = self._audio.input_args() if self._audio is not None else []
+        if audio_args:
+            args += audio_args + ["-map", "0:v", "-map", "1:a"]
+
+        args += output_args
+        args += [self.filename]
+        try:
+            self._proc = subprocess.Popen(
+                args,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=None if self.show_log else subprocess.PIPE,
+                pass_fds=self._audio.pass_fds if self._audio is not None else (),
+            )
+        except BaseException:
+            if self._audio is not None:
+                self._audio.close()
+            raise
+        self._thread = threading.Thread(target=self._pipe_frames, daemon=True)
+        self._thread.start()
+        if self._audio is not None:
+            self._audio.start()
+
+    def _pipe_frames(self) -> None:
+        """
+        Runs in the writer thread: pipes queued frames to ffmpeg until the end marker is queued.
+        """
+        stdin = self._proc.stdin  # type: ignore
+        try:
+            while (frame := self._queue.get()) is not None:
+                if self._error is None:
+                    stdin.write(memoryview(frame).cast("B"))
+                    self.frames_written += 1
+        except BaseException as error:
+            self._error = error
+            # Keep draining the queue so the renderer never blocks on a dead encoder
+            while self._queue.get() is not None:
+                ...
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                ...
+
+    def _raise_error(self) -> None:
+        """
+        Raises the error of the writer thread, if any.
+
+        Raises:
+            IOError: If piping frames to ffmpeg failed.
+        """
+        if self._error is not None:
+            raise IOError(
+                f"ffmpeg stopped accepting frames for '{self.filename}'"
+            ) from self._error
+        if self._audio is not None and self._audio.error is not None:
+            raise IOError(
+                f"ffmpeg stopped accepting audio for '{self.filename}'"
+            ) from self._audio.error
+
+    def _abort(self) -> None:
+        """
+        Stops ffmpeg and the writer thread without waiting for queued frames.
+        """
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        proc.kill()
+        self._error = self._error or IOError("aborted")
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+        if self._audio is not None:
+            self._audio.join()
+        if proc.stderr:
+            proc.stderr.read()
+        proc.wait()
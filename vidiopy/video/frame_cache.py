@@ -0,0 +1,187 @@
+"""
+This module contains the process-wide cache of decoded video frames.
+
+Effects like `loop`, `time_mirror` or `speedx` and composites ask for the same source frames many
+times. Decoded frames are therefore kept in one LRU cache shared by all clips of the process, keyed by
+(source, frame index, pixel format, size). The cache never holds more than
+`config.FRAME_CACHE_MAX_BYTES` bytes of frames; the least recently used frames are evicted first.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable
+import numpy.typing as npt
+from .. import config
+
+__all__ = ["FrameCache", "frame_cache", "file_source"]
+
+FrameKey = tuple[Hashable, int, str, tuple[int, int] | None]
+
+
+def file_source(path: str, *extra: Hashable) -> Hashable:
+    """
+    Builds the source part of a cache key for a file.
+
+    The key changes when the file is modified, so stale frames are never returned for a rewritten file.
+
+    Args:
+        path (str): The path of the file.
+        *extra (Hashable): Anything else which changes the decoded frames, like decoding options.
+
+    Returns:
+        Hashable: The absolute path, size and modification time of the file, followed by `extra`.
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, *extra)
+    return (path, stat.st_size, stat.st_mtime_ns, *extra)
+
+
+class FrameCache:
+    """
+    A class used to cache decoded frames under a global byte budget.
+
+    Cached frames are made read-only, since the same array is handed out to every clip asking for it.
+
+    Attributes:
+        hits (int): The number of lookups which found their frame.
+        misses (int): The number of lookups which did not find their frame.
+        evictions (int): The number of frames dropped to stay within the byte budget.
+        nbytes (int): The number of bytes of the cached frames.
+
+    Methods:
+        get(key): Returns the cached frame for a key, or None.
+        put(key, frame): Caches a frame, evicting the least recently used frames if needed.
+        clear(): Drops all cached frames.
+        stats(): Returns the counters of the cache.
+    """
+
+    def __init__(self, max_bytes: int | None = None) -> None:
+        """
+        Initializes a new instance of the FrameCache class.
+
+        Args:
+            max_bytes (int | None, optional): The byte budget of the cache. If None, `config.FRAME_CACHE_MAX_BYTES` is used, read every time a frame is added so it can be changed at runtime.
+        """
+        self._max_bytes = max_bytes
+        self._frames: OrderedDict[FrameKey, npt.NDArray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(frames={len(self)}, nbytes={self.nbytes}, max_bytes={self.max_bytes}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, key: FrameKey) -> bool:
+        return key in self._frames
+
+    @property
+    def max_bytes(self) -> int:
+        """
+        The byte budget of the cache.
+
+        Returns:
+            int: The maximum number of bytes of cached frames. 0 disables the cache.
+        """
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return config.FRAME_CACHE_MAX_BYTES
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes: int | None) -> None:
+        self._max_bytes = max_bytes
+        with self._lock:
+            self._evict(self.max_bytes)
+
+    def get(self, key: FrameKey) -> npt.NDArray | None:
+        """
+        Returns the cached frame for a key and marks it as most recently used.
+
+        Args:
+            key (FrameKey): The (source, frame index, pixel format, size) key of the frame.
+
+        Returns:
+            npt.NDArray | None: The read-only frame, or None if it is not cached.
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key: FrameKey, frame: npt.NDArray) -> npt.NDArray:
+        """
+        Caches a frame, evicting the least recently used frames to stay within the byte budget.
+
+        Frames larger than the whole budget are not cached.
+
+        Args:
+            key (FrameKey): The (source, frame index, pixel format, size) key of the frame.
+            frame (npt.NDArray): The decoded frame.
+
+        Returns:
+            npt.NDArray: The frame, made read-only.
+        """
+        frame.flags.writeable = False
+        max_bytes = self.max_bytes
+        if frame.nbytes > max_bytes:
+            return frame
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._frames[key] = frame
+            self.nbytes += frame.nbytes
+            self._evict(max_bytes)
+        return frame
+
+    def clear(self) -> None:
+        """
+        Drops all cached frames. The counters are kept.
+        """
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            dict[str, int]: The hits, misses, evictions, number of frames, bytes and byte budget of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "frames": len(self._frames),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _evict(self, max_bytes: int) -> None:
+        """
+        Drops least recently used frames until the cache fits in `max_bytes`. Must hold the lock.
+
+        Args:
+            max_bytes (int): The byte budget to fit in.
+        """
+        while self._frames and self.nbytes > max_bytes:
+            _, frame = self._frames.popitem(last=False)
+            self.nbytes -= frame.nbytes
+            self.evictions += 1
+
+
+# The cache shared by all clips of the process.
+frame_cache = FrameCache()
@@ -0,0 +1,117 @@
+"""
+This module contains the on-disk frame store used to materialize clips without holding them in RAM.
+
+The frames are written one after the other to a raw file in `config.SCRATCH_DIR` and mapped back
+with `np.memmap`. The result indexes exactly like the stacked ndarray it replaces, but its pages are
+managed by the OS page cache, and processes forked while it is open share it without copying.
+The file is removed once the store and all its views are garbage collected.
+"""
+
+import os
+import tempfile
+import weakref
+from typing import Iterable
+import numpy as np
+import numpy.typing as npt
+from .. import config
+
+__all__ = ["FrameStore", "write_frame_store", "open_frame_store"]
+
+
+def _remove(path: str) -> None:
+    """
+    Removes a frame file, ignoring errors such as a file which is still mapped on Windows.
+
+    Args:
+        path (str): The path of the frame file.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        ...
+
+
+class FrameStore(np.memmap):
+    """
+    A memory-mapped array of frames backed by a raw file.
+
+    It behaves like the ndarray of stacked frames it replaces. Copying a store of frames with
+    `copy.copy` writes a new frame file instead of pulling all frames into RAM.
+    """
+
+    def __copy__(self) -> npt.NDArray:
+        if self.ndim < 4:
+            return np.array(self)
+        return write_frame_store(self)
+
+
+def write_frame_store(
+    frames: Iterable[npt.NDArray], directory: str | None = None
+) -> FrameStore:
+    """
+    Writes frames to a raw file and maps them back as a FrameStore.
+
+    Frames are consumed one at a time, so a generator of frames is never held in memory as a whole.
+
+    Args:
+        frames (Iterable[npt.NDArray]): The frames, all with the same shape and dtype.
+        directory (str | None, optional): The directory of the frame file. Defaults to `config.SCRATCH_DIR`.
+
+    Returns:
+        FrameStore: The frames stacked along the first axis, mapped read-write.
+
+    Raises:
+        ValueError: If there are no frames or if they do not all have the same shape and dtype.
+
+    Example:
+        >>> store = write_frame_store(clip.iterate_frames_array_t(24))
+        >>> store[0].shape
+        (1080, 1920, 3)
+    """
+    directory = directory or config.SCRATCH_DIR
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".raw", prefix="frames-", dir=directory)
+    shape: tuple[int, ...] | None = None
+    dtype: np.dtype | None = None
+    count = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for frame in frames:
+                frame = np.ascontiguousarray(frame)
+                if shape is None:
+                    shape, dtype = frame.shape, frame.dtype
+                elif frame.shape != shape or frame.dtype != dtype:
+                    raise ValueError("all frames must have the same shape and dtype")
+                f.write(memoryview(frame).cast("B"))
+                count += 1
+        if shape is None:
+            raise ValueError("need at least one frame to create a frame store")
+        store = open_frame_store(path, (count, *shape), dtype, mode="r+")
+    except BaseException:
+        _remove(path)
+        raise
+    weakref.finalize(store, _remove, path)
+    return store
+
+
+def open_frame_store(
+    filename: str,
+    shape: tuple[int, ...],
+    dtype: npt.DTypeLike = np.uint8,
+    mode: str = "r",
+) -> FrameStore:
+    """
+    Maps an existing frame file, for example one written by another process.
+
+    The returned store does not remove the file when it is collected; the store which wrote it does.
+
+    Args:
+        filename (str): The path of the frame file.
+        shape (tuple[int, ...]): The shape of the stacked frames.
+        dtype (npt.DTypeLike, optional): The dtype of the frames. Defaults to np.uint8.
+        mode (str, optional): The `np.memmap` mode. Defaults to "r".
+
+    Returns:
+        FrameStore: The mapped frames.
+    """
+    return FrameStore(filename, dtype=dtype, mode=mode, shape=tuple(shape))
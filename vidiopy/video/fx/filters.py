@@ -1,83 +1,70 @@
 from vidiopy.video.VideoClip import VideoClip
-from PIL import Image, ImageFilter, ImageEnhance
+from vidiopy.video.color_ops import BrightnessOp, ContrastOp, SaturationOp, apply_color_op
+from vidiopy.video.effect_graph import frame_to_pil
+from PIL import ImageFilter, ImageEnhance
 import numpy as np
 
 
-def gaussian_blur(video: VideoClip, radius=2):
-    """Return a video with a Gaussian blur effect."""
+def _gaussian_blur_frame(frame: np.ndarray, radius=2):
+    return np.asarray(frame_to_pil(frame).filter(ImageFilter.GaussianBlur(radius)))
 
-    def _blur(frame: np.ndarray, radius=radius):
-        return np.array(Image.fromarray(frame).filter(ImageFilter.GaussianBlur(radius)))
 
-    return video.fl_frame_transform(_blur, radius)
+def _box_blur_frame(frame: np.ndarray, radius=2):
+    return np.asarray(frame_to_pil(frame).filter(ImageFilter.BoxBlur(radius)))
 
 
-def box_blur(video: VideoClip, radius=2):
-    """Return a video with a box blur effect."""
+def _unsharp_mask_frame(frame: np.ndarray, radius=0.5, percent=150, threshold=3):
+    return np.asarray(
+        frame_to_pil(frame).filter(
+            ImageFilter.UnsharpMask(radius, percent, threshold)
+        )
+    )
 
-    def _blur(frame: np.ndarray, radius=radius):
-        return np.array(Image.fromarray(frame).filter(ImageFilter.BoxBlur(radius)))
 
-    return video.fl_frame_transform(_blur, radius)
+def _median_filter_frame(frame: np.ndarray, size=3):
+    return np.asarray(frame_to_pil(frame).filter(ImageFilter.MedianFilter(size)))
 
 
-def unsharp_mask(video: VideoClip, radius=0.5, percent=150, threshold=3):
-    """Return a video with an unsharp mask effect."""
+def _sharpness_frame(frame: np.ndarray, factor=1.0):
+    enhancer = ImageEnhance.Sharpness(frame_to_pil(frame))
+    return np.asarray(enhancer.enhance(factor))
 
-    def _mask(frame: np.ndarray, radius=radius, percent=percent, threshold=threshold):
-        return np.array(
-            Image.fromarray(frame).filter(
-                ImageFilter.UnsharpMask(radius, percent, threshold)
-            )
-        )
 
-    return video.fl_frame_transform(_mask, radius, percent, threshold)
+def gaussian_blur(video: VideoClip, radius=2):
+    """Return a video with a Gaussian blur effect."""
+    return video.fl_frame_transform(_gaussian_blur_frame, radius)
 
 
-def median_filter(video: VideoClip, size=3):
-    """Return a video with a median filter effect."""
+def box_blur(video: VideoClip, radius=2):
+    """Return a video with a box blur effect."""
+    return video.fl_frame_transform(_box_blur_frame, radius)
 
-    def _filter(frame: np.ndarray, size=size):
-        return np.array(Image.fromarray(frame).filter(ImageFilter.MedianFilter(size)))
 
-    return video.fl_frame_transform(_filter, size)
+def unsharp_mask(video: VideoClip, radius=0.5, percent=150, threshold=3):
+    """Return a video with an unsharp mask effect."""
+    return video.fl_frame_transform(_unsharp_mask_frame, radius, percent, threshold)
 
 
-def contrast(video: VideoClip, factor=1.0):
-    """Return a video with a contrast effect."""
+def median_filter(video: VideoClip, size=3):
+    """Return a video with a median filter effect."""
+    return video.fl_frame_transform(_median_filter_frame, size)
 
-    def _contrast(frame: np.ndarray, factor=factor):
-        enhancer = ImageEnhance.Contrast(Image.fromarray(frame))
-        return np.array(enhancer.enhance(factor))
 
-    return video.fl_frame_transform(_contrast, factor)
+def contrast(video: VideoClip, factor=1.0):
+    """Return a video with a contrast effect."""
+    return apply_color_op(video, ContrastOp(factor))
 
 
 def brightness(video: VideoClip, factor=1.0):
     """Return a video with a brightness effect."""
-
-    def _brightness(frame: np.ndarray, factor=factor):
-        enhancer = ImageEnhance.Brightness(Image.fromarray(frame))
-        return np.array(enhancer.enhance(factor))
-
-    return video.fl_frame_transform(_brightness, factor)
+    return apply_color_op(video, BrightnessOp(factor))
 
 
 def saturation(video: VideoClip, factor=1.0):
     """Return a video with a saturation effect."""
-
-    def _saturation(frame: np.ndarray, factor=factor):
-        enhancer = ImageEnhance.Color(Image.fromarray(frame))
-        return np.array(enhancer.enhance(factor))
-
-    return video.fl_frame_transform(_saturation, factor)
+    return apply_color_op(video, SaturationOp(factor))
 
 
 def sharpness(video: VideoClip, factor=1.0):
     """Return a video with a sharpness effect."""
-
-    def _sharpness(frame: np.ndarray, factor=factor):
-        enhancer = ImageEnhance.Sharpness(Image.fromarray(frame))
-        return np.array(enhancer.enhance(factor))
-
-    return video.fl_frame_transform(_sharpness, factor)
+    return video.fl_frame_transform(_sharpness_frame, factor)
@@ -1,5 +1,11 @@
+from functools import partial
 from vidiopy.video.VideoClip import VideoClip
 
+
+def _loop_time(duration: float, t: float) -> float:
+    return t % duration
+
+
 def loop(clip: VideoClip, n: int = None, duration: float = None) -> VideoClip:
     """
     Returns a clip that loops the current clip.
@@ -10,7 +16,7 @@ def loop(clip: VideoClip, n: int = None, duration: float = None) -> VideoClip:
     if clip.duration is None:
         raise ValueError("loop requires a clip with a defined duration.")
     
-    new_clip = clip.fl_time_transform(lambda t: t % clip.duration)
+    new_clip = clip.fl_time_transform(partial(_loop_time, clip.duration))
     
     if duration is not None:
         new_clip.duration = duration
@@ -1,23 +1,37 @@
 from vidiopy.video.VideoClip import VideoClip
+from vidiopy.video.effect_graph import FrameOpNode, apply_node
 import numpy as np
-from PIL import Image, ImageOps
+
+
+def _fill_value(color, frame: np.ndarray) -> np.ndarray:
+    fill = np.asarray(color, dtype=frame.dtype).reshape(-1)
+    if frame.ndim == 2:
+        return fill[0]
+    channels = frame.shape[2]
+    if fill.size == 1:
+        return np.repeat(fill, channels)
+    # Like PIL, a colour without alpha fills RGBA frames opaquely
+    return np.concatenate([fill[:channels], np.full(max(channels - fill.size, 0), 255, dtype=frame.dtype)])
+
+
+def _margin_frame(frame: np.ndarray, border: tuple[int, int, int, int], color) -> np.ndarray:
+    left, top, right, bottom = border
+    h, w = frame.shape[:2]
+    out = np.empty((top + h + bottom, left + w + right) + frame.shape[2:], dtype=frame.dtype)
+    fill = _fill_value(color, frame)
+    out[:top] = fill
+    out[top + h :] = fill
+    out[top : top + h, :left] = fill
+    out[top : top + h, left + w :] = fill
+    out[top : top + h, left : left + w] = frame
+    return out
+
 
 def margin(clip: VideoClip, top: int = 0, right: int = 0, bottom: int = 0, left: int = 0, color: tuple[int, int, int] = (0, 0, 0)) -> VideoClip:
     """
     Adds a margin around the video clip.
     """
-    original_make_frame_array = clip.make_frame_array
-    original_make_frame_pil = clip.make_frame_pil
-
-    def modified_make_frame_pil(t):
-        img = original_make_frame_pil(t)
-        return ImageOps.expand(img, border=(left, top, right, bottom), fill=color)
-
-    def modified_make_frame_array(t):
-        return np.array(modified_make_frame_pil(t))
-
-    clip.make_frame_array = modified_make_frame_array
-    clip.make_frame_pil = modified_make_frame_pil
+    apply_node(clip, FrameOpNode(clip.graph, _margin_frame, ((left, top, right, bottom), color)))
     if clip.size is not None:
         clip.size = (clip.size[0] + left + right, clip.size[1] + top + bottom)
     return clip
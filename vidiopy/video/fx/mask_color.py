@@ -1,39 +1,25 @@
 from vidiopy.video.VideoClip import VideoClip
+from vidiopy.video.effect_graph import FrameOpNode, apply_node
 import numpy as np
-from PIL import Image
 
-def mask_color(clip: VideoClip, color: tuple[int, int, int], threshold: int = 10) -> VideoClip:
-    """
-    Returns a video clip where the specified color is made transparent (Chroma Key).
-    """
-    original_make_frame_array = clip.make_frame_array
-    original_make_frame_pil = clip.make_frame_pil
 
-    def process_array(frame):
-        if frame.shape[2] == 3:
-            rgba = np.concatenate([frame, np.full((frame.shape[0], frame.shape[1], 1), 255, dtype=np.uint8)], axis=2)
-        else:
-            rgba = frame.copy()
-            
-        r, g, b = color
-        
-        dist = np.sqrt(
-            (rgba[:, :, 0].astype(np.int32) - r) ** 2 +
-            (rgba[:, :, 1].astype(np.int32) - g) ** 2 +
-            (rgba[:, :, 2].astype(np.int32) - b) ** 2
-        )
-        
-        rgba[:, :, 3] = np.where(dist < threshold, 0, rgba[:, :, 3])
-        return rgba
+def _mask_color_frame(frame: np.ndarray, color: tuple[int, int, int], threshold: int) -> np.ndarray:
+    h, w, channels = frame.shape
+    rgba = np.empty((h, w, 4), dtype=np.uint8)
+    rgba[:, :, :channels] = frame
+    if channels == 3:
+        rgba[:, :, 3] = 255
+
+    diff = frame[:, :, :3].astype(np.int32) - np.asarray(color, dtype=np.int32)
+    # Squared distances, compared with the squared threshold
+    dist = np.einsum("ijk,ijk->ij", diff, diff)
 
-    def modified_make_frame_array(t):
-        frame = original_make_frame_array(t)
-        return process_array(frame)
+    rgba[:, :, 3][dist < threshold * threshold] = 0
+    return rgba
 
-    def modified_make_frame_pil(t):
-        arr = modified_make_frame_array(t)
-        return Image.fromarray(arr, mode="RGBA")
 
-    clip.make_frame_array = modified_make_frame_array
-    clip.make_frame_pil = modified_make_frame_pil
-    return clip
+def mask_color(clip: VideoClip, color: tuple[int, int, int], threshold: int = 10) -> VideoClip:
+    """
+    Returns a video clip where the specified color is made transparent (Chroma Key).
+    """
+    return apply_node(clip, FrameOpNode(clip.graph, _mask_color_frame, (tuple(color), threshold)))
@@ -1,7 +1,16 @@
 from vidiopy.video.VideoClip import VideoClip
+from vidiopy.video.effect_graph import FrameOpNode, apply_node, frame_to_pil
 import numpy as np
 from PIL import Image
 
+
+def _resize_frame(frame: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    if frame.shape[1::-1] == size:
+        return frame
+    # Lanczos resampling is left to PIL
+    return np.asarray(frame_to_pil(frame).resize(size, Image.Resampling.LANCZOS))
+
+
 def resize(clip: VideoClip, new_size: tuple[int, int] = None, height: int = None, width: int = None) -> VideoClip:
     """
     Returns a video clip that is resized to the specified size.
@@ -14,20 +23,7 @@ def resize(clip: VideoClip, new_size: tuple[int, int] = None, height: int = None
         size = (width, int(clip.size[1] * (width / clip.size[0])))
     else:
         raise ValueError("Must provide either new_size, height, or width.")
-    
-    original_make_frame_array = clip.make_frame_array
-    original_make_frame_pil = clip.make_frame_pil
-
-    def modified_make_frame_array(t):
-        frame = original_make_frame_array(t)
-        img = Image.fromarray(frame)
-        return np.array(img.resize(size, Image.Resampling.LANCZOS))
-
-    def modified_make_frame_pil(t):
-        img = original_make_frame_pil(t)
-        return img.resize(size, Image.Resampling.LANCZOS)
 
-    clip.make_frame_array = modified_make_frame_array
-    clip.make_frame_pil = modified_make_frame_pil
+    apply_node(clip, FrameOpNode(clip.graph, _resize_frame, (tuple(size),)))
     clip.size = size
     return clip
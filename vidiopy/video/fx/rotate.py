@@ -1,31 +1,31 @@
 from vidiopy.video.VideoClip import VideoClip
+from vidiopy.video.effect_graph import FrameOpNode, apply_node, frame_to_pil
 import numpy as np
 from PIL import Image
 
+
+def _rotate_frame(frame: np.ndarray, angle: float, resample: Image.Resampling, expand: bool) -> np.ndarray:
+    turns, rest = divmod(angle % 360, 90)
+    # Quarter turns which keep the whole frame are a view of it, like PIL's transpose for them
+    if rest == 0 and (expand or turns % 2 == 0 or frame.shape[0] == frame.shape[1]):
+        return np.rot90(frame, int(turns))
+    return np.asarray(frame_to_pil(frame).rotate(angle, resample=resample, expand=expand))
+
+
 def rotate(clip: VideoClip, angle: float, resample: Image.Resampling = Image.Resampling.BICUBIC, expand: bool = False) -> VideoClip:
     """
     Rotates the video clip by the given angle (in degrees).
     """
-    original_make_frame_array = clip.make_frame_array
-    original_make_frame_pil = clip.make_frame_pil
+    source = clip.graph
+    apply_node(clip, FrameOpNode(source, _rotate_frame, (angle, resample, expand)))
 
-    def modified_make_frame_pil(t):
-        img = original_make_frame_pil(t)
-        return img.rotate(angle, resample=resample, expand=expand)
-
-    def modified_make_frame_array(t):
-        return np.array(modified_make_frame_pil(t))
-
-    clip.make_frame_array = modified_make_frame_array
-    clip.make_frame_pil = modified_make_frame_pil
-    
     if expand:
         # We need to compute the new size
         # A simple way is to process one frame and get its size
         try:
-            sample_img = original_make_frame_pil(0)
-            clip.size = sample_img.rotate(angle, resample=resample, expand=expand).size
+            sample = _rotate_frame(np.asarray(source.render(0)), angle, resample, expand)
+            clip.size = sample.shape[1::-1]
         except Exception:
             pass
-            
+
     return clip
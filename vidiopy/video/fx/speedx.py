@@ -1,5 +1,11 @@
+from functools import partial
 from vidiopy.video.VideoClip import VideoClip
 
+
+def _speedx_time(factor: float, t: float) -> float:
+    return t * factor
+
+
 def speedx(clip: VideoClip, factor: float) -> VideoClip:
     """
     Returns a new clip playing `factor` times faster than the original.
@@ -7,7 +13,7 @@ def speedx(clip: VideoClip, factor: float) -> VideoClip:
     if factor <= 0:
         raise ValueError("speedx factor must be positive.")
     
-    new_clip = clip.fl_time_transform(lambda t: t * factor)
+    new_clip = clip.fl_time_transform(partial(_speedx_time, factor))
     
     if new_clip.duration is not None:
         new_clip.duration /= factor
@@ -1,5 +1,11 @@
+from functools import partial
 from vidiopy.video.VideoClip import VideoClip
 
+
+def _time_mirror_time(duration: float, t: float) -> float:
+    return duration - t
+
+
 def time_mirror(clip: VideoClip) -> VideoClip:
     """
     Returns a clip that plays the current clip backwards.
@@ -7,4 +13,4 @@ def time_mirror(clip: VideoClip) -> VideoClip:
     if clip.duration is None:
         raise ValueError("time_mirror requires a clip with a defined duration.")
     
-    return clip.fl_time_transform(lambda t: clip.duration - t)
+    return clip.fl_time_transform(partial(_time_mirror_time, clip.duration))
@@ -0,0 +1,237 @@
+"""
+This module contains the keyframe index used for random access into video files.
+
+The index lists the presentation timestamp of every frame of the first video stream and which of
+those frames are keyframes. It is built from the packet list ffprobe reports, so no frame is decoded,
+and it is persisted in `config.CACHE_DIR` keyed by the path, size and modification time of the file,
+so reopening the same file does not scan it again.
+"""
+
+import bisect
+import hashlib
+import os
+import subprocess
+import tempfile
+from fractions import Fraction
+import ffmpegio
+import numpy as np
+import numpy.typing as npt
+from .. import config
+
+__all__ = ["KeyframeIndex"]
+
+
+class KeyframeIndex:
+    """
+    A class used to represent the frame timestamps and keyframes of a video stream.
+
+    Attributes:
+        filename (str): The path of the indexed video file.
+        pts (npt.NDArray[np.float64]): The presentation time of each frame in seconds, relative to the start of the file, in presentation order.
+        keyframes (npt.NDArray[np.int64]): The sorted indices of the frames which are keyframes.
+
+    Methods:
+        load(filename): Returns the index of a file, from memory, from the cache directory or by scanning the file.
+        build(filename): Scans a file with ffprobe and returns its index.
+        keyframe_before(index): Returns the index of the last keyframe at or before a frame.
+        keyframe_after(index): Returns the index of the first keyframe after a frame.
+        time_of(index): Returns the presentation time of a frame.
+    """
+
+    # Indexes already loaded in this process, by cache key.
+    _loaded: dict[str, "KeyframeIndex"] = {}
+
+    def __init__(
+        self,
+        filename: str,
+        pts: npt.NDArray[np.float64],
+        keyframes: npt.NDArray[np.int64],
+    ) -> None:
+        """
+        Initializes a new instance of the KeyframeIndex class.
+
+        Args:
+            filename (str): The path of the indexed video file.
+            pts (npt.NDArray[np.float64]): The presentation time of each frame in seconds, in presentation order.
+            keyframes (npt.NDArray[np.int64]): The sorted indices of the keyframes.
+        """
+        self.filename = str(filename)
+        self.pts = np.asarray(pts, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self._keyframe_list: list[int] = self.keyframes.tolist()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(filename={self.filename}, frames={len(self)}, keyframes={len(self.keyframes)})"
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @staticmethod
+    def cache_key(filename: str) -> str:
+        """
+        Computes the key under which the index of a file is cached.
+
+        Args:
+            filename (str): The path of the video file.
+
+        Returns:
+            str: A hash of the absolute path, the size and the modification time of the file.
+        """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        return hashlib.sha1(
+            f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+        ).hexdigest()
+
+    @staticmethod
+    def cache_path(key: str) -> str:
+        """
+        Returns the path of the sidecar file for a cache key.
+
+        Args:
+            key (str): The cache key, see `cache_key`.
+
+        Returns:
+            str: The path of the `.npz` file in `config.CACHE_DIR`.
+        """
+        return os.path.join(config.CACHE_DIR, "keyframe_index", f"{key}.npz")
+
+    @classmethod
+    def load(cls, filename: str) -> "KeyframeIndex":
+        """
+        Returns the index of a file.
+
+        The index is taken from memory if it was already loaded, otherwise from the sidecar file in the cache directory.
+        If neither exists, the file is scanned and the index is saved for the next time.
+
+        Args:
+            filename (str): The path of the video file.
+
+        Returns:
+            KeyframeIndex: The index of the file.
+
+        Raises:
+            ValueError: If the file has no video packets.
+        """
+        key = cls.cache_key(filename)
+        index = cls._loaded.get(key)
+        if index is not None:
+            return index
+        path = cls.cache_path(key)
+        try:
+            with np.load(path) as data:
+                index = cls(filename, data["pts"], data["keyframes"])
+        except Exception:
+            index = cls.build(filename)
+            index.save(path)
+        cls._loaded[key] = index
+        return index
+
+    @classmethod
+    def build(cls, filename: str) -> "KeyframeIndex":
+        """
+        Scans the packets of the first video stream of a file with ffprobe and builds its index.
+
+        Args:
+            filename (str): The path of the video file.
+
+        Returns:
+            KeyframeIndex: The index of the file.
+
+        Raises:
+            ValueError: If the file has no video packets.
+        """
+        args = [
+            config.FFPROBE_BINARY or ffmpegio.get_path(probe=True),
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=time_base:format=start_time:packet=pts,dts,flags",
+            "-of", "compact",
+            str(filename),
+        ]
+        output = subprocess.run(args, capture_output=True, text=True, check=True).stdout
+
+        time_base = Fraction(1)
+        start_time = 0.0
+        packets: list[tuple[int, bool]] = []
+        for line in output.splitlines():
+            section, _, fields = line.partition("|")
+            values = dict(field.split("=", 1) for field in fields.split("|") if "=" in field)
+            if section == "packet":
+                ts = values.get("pts", "N/A")
+                if ts == "N/A":
+                    ts = values.get("dts", "N/A")
+                if ts == "N/A":
+                    continue
+                packets.append((int(ts), values.get("flags", "").startswith("K")))
+            elif section == "stream" and values.get("time_base", "N/A") != "N/A":
+                time_base = Fraction(values["time_base"])
+            elif section == "format" and values.get("start_time", "N/A") != "N/A":
+                start_time = float(values["start_time"])
+
+        if not packets:
+            raise ValueError(f"No video packets found in '{filename}'")
+        # Packets come in decoding order, frames are shown in presentation order
+        packets.sort(key=lambda packet: packet[0])
+        timestamps = np.array([ts for ts, _ in packets], dtype=np.float64)
+        pts = timestamps * float(time_base) - start_time
+        keyframes = np.flatnonzero([is_key for _, is_key in packets])
+        if len(keyframes) == 0 or keyframes[0] != 0:
+            keyframes = np.concatenate(([0], keyframes))
+        return cls(filename, pts, keyframes)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a sidecar file, ignoring errors such as a read-only cache directory.
+
+        Args:
+            path (str): The path of the `.npz` file to write.
+        """
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, pts=self.pts, keyframes=self.keyframes)
+            os.replace(tmp, path)
+        except OSError:
+            ...
+
+    def keyframe_before(self, index: int) -> int:
+        """
+        Returns the index of the last keyframe at or before a frame.
+
+        Args:
+            index (int): The index of the frame.
+
+        Returns:
+            int: The index of the keyframe, 0 if the frame is before all keyframes.
+        """
+        position = bisect.bisect_right(self._keyframe_list, index) - 1
+        return self._keyframe_list[position] if position >= 0 else 0
+
+    def keyframe_after(self, index: int) -> int | None:
+        """
+        Returns the index of the first keyframe after a frame.
+
+        Args:
+            index (int): The index of the frame.
+
+        Returns:
+            int | None: The index of the keyframe, None if there is no later keyframe.
+        """
+        position = bisect.bisect_right(self._keyframe_list, index)
+        if position < len(self._keyframe_list):
+            return self._keyframe_list[position]
+        return None
+
+    def time_of(self, index: int) -> float:
+        """
+        Returns the presentation time of a frame, relative to the start of the file.
+
+        Args:
+            index (int): The index of the frame, clamped to the indexed frames.
+
+        Returns:
+            float: The time in seconds.
+        """
+        return float(self.pts[min(max(0, index), len(self.pts) - 1)])
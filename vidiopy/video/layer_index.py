@@ -0,0 +1,122 @@
+"""
+This module contains the interval index used to find the active layers of a composite.
+
+The time line is cut into buckets of `BUCKET_SIZE` seconds, and every layer is listed in the buckets its
+interval [start, end) overlaps; layers without an end are kept apart, since they overlap every bucket after
+their start, and so are the few very long ones. Finding the layers active at a time only looks at the layers
+of one bucket, whatever the number of layers of the composite, so timelines of thousands of short layers
+composite as fast as small ones.
+Layers are numbered in stacking order and every list is kept sorted, so the active layers come out bottom first.
+"""
+
+import heapq
+import math
+
+__all__ = ["LayerIndex"]
+
+# Width of a bucket of the index in seconds.
+BUCKET_SIZE = 1.0
+
+# Layers spanning more buckets than this, like a background, are kept with the layers without an end.
+MAX_BUCKETS = 1024
+
+
+class LayerIndex:
+    """
+    A class used to look up which of a stack of time intervals contain a time.
+
+    Attributes:
+        bucket_size (float): The width of a bucket in seconds.
+
+    Methods:
+        add(start, end): Adds an interval on top of the stack and returns its number.
+        active(t): Returns the numbers of the intervals containing a time, bottom first.
+    """
+
+    def __init__(
+        self,
+        intervals=(),
+        bucket_size: float = BUCKET_SIZE,
+    ) -> None:
+        """
+        Initializes a new instance of the LayerIndex class.
+
+        Args:
+            intervals (Iterable[tuple[int | float, int | float | None]], optional): The (start, end) of each layer,
+                bottom first; an end of None or 0 means the layer never ends. Defaults to no layers.
+            bucket_size (float, optional): The width of a bucket in seconds. Defaults to `BUCKET_SIZE`.
+
+        Raises:
+            ValueError: If the bucket size is not positive.
+        """
+        if bucket_size <= 0:
+            raise ValueError("bucket_size must be positive")
+        self.bucket_size = float(bucket_size)
+        self._starts: list[float] = []
+        self._ends: list[float] = []
+        self._buckets: dict[int, list[int]] = {}
+        # Layers without an end or spanning more than MAX_BUCKETS buckets
+        self._open: list[int] = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(layers={len(self)}, bucket_size={self.bucket_size}, buckets={len(self._buckets)})"
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __copy__(self) -> "LayerIndex":
+        # Adding to a copy must not change the original
+        index = self.__class__(bucket_size=self.bucket_size)
+        index._starts = self._starts.copy()
+        index._ends = self._ends.copy()
+        index._buckets = {key: layers.copy() for key, layers in self._buckets.items()}
+        index._open = self._open.copy()
+        return index
+
+    def add(self, start: int | float, end: int | float | None) -> int:
+        """
+        Adds an interval on top of the stack.
+
+        Args:
+            start (int | float): The start of the interval in seconds.
+            end (int | float | None): The end of the interval in seconds, excluded; None or 0 for no end.
+
+        Returns:
+            int: The number of the interval, its position in the stack.
+        """
+        layer = len(self._starts)
+        start = float(start)
+        end = float(end) if end else math.inf
+        self._starts.append(start)
+        self._ends.append(end)
+        first = math.floor(start / self.bucket_size)
+        stop = math.ceil(end / self.bucket_size) if end != math.inf else math.inf
+        if stop - first > MAX_BUCKETS:
+            self._open.append(layer)
+        else:
+            for key in range(first, stop):
+                self._buckets.setdefault(key, []).append(layer)
+        return layer
+
+    def active(self, t: int | float) -> list[int]:
+        """
+        Returns the numbers of the intervals containing time `t`.
+
+        Args:
+            t (int | float): The time in seconds.
+
+        Returns:
+            list[int]: The numbers of the intervals with start <= t < end, bottom first.
+
+        Example:
+            >>> index = LayerIndex([(0, 10), (2, 3), (5, None)])
+            >>> index.active(2.5)
+            [0, 1]
+        """
+        candidates = self._buckets.get(math.floor(t / self.bucket_size), ())
+        if self._open:
+            candidates = heapq.merge(candidates, self._open)
+        starts, ends = self._starts, self._ends
+        return [layer for layer in candidates if starts[layer] <= t < ends[layer]]
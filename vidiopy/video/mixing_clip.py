@@ -1,8 +1,349 @@
-from typing import Callable, Sequence
+import bisect
+import os
+import shutil
+import tempfile
+from itertools import accumulate
+from typing import Callable, Self, Sequence
 from PIL import Image, ImageOps
+import numpy as np
 from ..audio.AudioClip import SilenceClip, concatenate_audioclips, composite_audioclips
 from .ImageSequenceClip import ImageSequenceClip
+from .VideoFileClip import VideoFileClip
+from .ffmpeg_writer import concat_video_files, stream_copy_format
+from .compositor import FrameCompositor
+from .layer_index import LayerIndex
+from .effect_graph import Node, CompositeNode, ConcatNode, frame_to_pil
+from .frame_store import write_frame_store
 from .VideoClip import VideoClip
+from .. import config
+
+
+def _layer_position(
+    clip: VideoClip, t: int | float, size: tuple[int, int], frame_size: tuple[int, int]
+) -> tuple[int, int]:
+    """
+    Returns the top left corner of a frame of `clip` at clip time `t` on a background of `size`.
+    """
+    pos_: tuple[int | str | float, int | str | float] = clip.pos(t)
+    if isinstance(pos_[0], str):
+        if pos_[0] == "center":
+            pos_x = size[0] // 2 - frame_size[0] // 2
+        elif pos_[0] == "left":
+            pos_x = 0
+        elif pos_[0] == "right":
+            pos_x = size[0] - frame_size[0]
+        else:
+            raise ValueError(f"pos[0] must be 'center', 'left' or 'right'")
+    elif isinstance(pos_[0], (int, float)):
+        if clip.relative_pos:
+            pos_x = int(pos_[0] * size[0])
+        else:
+            pos_x = int(pos_[0])
+    else:
+        raise TypeError(
+            f"pos must output tuple of str or float or int, not {type(pos_[0])}"
+        )
+
+    if isinstance(pos_[1], str):
+        if pos_[1] == "center":
+            pos_y = size[1] // 2 - frame_size[1] // 2
+        elif pos_[1] == "top":
+            pos_y = 0
+        elif pos_[1] == "bottom":
+            pos_y = size[1] - frame_size[1]
+        else:
+            raise ValueError(f"pos[1] must be 'center', 'top' or 'bottom'")
+    elif isinstance(pos_[1], (int, float)):
+        if clip.relative_pos:
+            pos_y = int(pos_[1] * size[1])
+        else:
+            pos_y = int(pos_[1])
+    else:
+        raise TypeError(
+            f"pos must output tuple of str or float or int, not {type(pos_[1])}"
+        )
+    return pos_x, pos_y
+
+
+class _LazyVideoClip(VideoClip):
+    """
+    A base class of the clips which render each frame from other clips when it is requested.
+
+    Subclasses implement `_render(t)`. Frame transforms add nodes to the effect graph and cuts only move the time
+    the frames are rendered at, nothing is rendered up front, so the clips stay lazy.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Time of the rendered timeline at time 0 of this clip, moved by sub_clip
+        self._offset = 0.0
+
+    def _render(self, t: int | float) -> np.ndarray:
+        """
+        Returns the frame at time `t` of the rendered timeline, before any cut or effect.
+        """
+        raise NotImplementedError("_render method must be overridden in the subclass.")
+
+    def make_frame_array(self, t: int | float) -> np.ndarray:
+        """
+        Renders the frame at time `t` and returns it as a numpy array.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            np.ndarray: The frame.
+        """
+        return self._render(t + self._offset)
+
+    def make_frame_pil(self, t: int | float) -> Image.Image:
+        """
+        Renders the frame at time `t` and returns it as a PIL Image.
+
+        Args:
+            t (int | float): The time of the frame.
+
+        Returns:
+            Image.Image: The frame.
+        """
+        return frame_to_pil(self._render(t + self._offset))
+
+    def sub_clip(
+        self, t_start: int | float | None = None, t_end: int | float | None = None
+    ) -> Self:
+        """
+        Cuts the clip to the time range [t_start, t_end).
+
+        Only the time mapping of the clip changes, the frames are rendered from `t_start` on when they are requested.
+
+        Args:
+            t_start (int | float | None, optional): The start time of the cut in seconds. Defaults to None, 0.
+            t_end (int | float | None, optional): The end time of the cut in seconds. Defaults to None, the end of the clip.
+
+        Returns:
+            Self: The current instance.
+
+        Note:
+            This method modifies the current instance in-place.
+        """
+        if t_start is None and t_end is None:
+            return self
+        if t_start is None:
+            t_start = 0.0
+        if t_end is None:
+            t_end = self._dur
+        self._offset += t_start
+        self._dur = t_end - t_start
+        if self.audio:
+            audio = self.audio.sub_clip(t_start, t_end)
+            audio.set_start(self.start).set_end(self.end)
+            self.set_audio(audio)
+        return self
+
+    def sub_clip_copy(
+        self, t_start: int | float | None = None, t_end: int | float | None = None
+    ) -> Self:
+        """
+        Returns a copy of the clip cut to the time range [t_start, t_end).
+
+        Args:
+            t_start (int | float | None, optional): The start time of the cut in seconds. Defaults to None, 0.
+            t_end (int | float | None, optional): The end time of the cut in seconds. Defaults to None, the end of the clip.
+
+        Returns:
+            Self: The cut copy.
+        """
+        return self.copy().sub_clip(t_start, t_end)
+
+
+class CompositeVideoClip(_LazyVideoClip):
+    """
+    A class used to represent video clips layered on top of each other, composited frame by frame.
+
+    Nothing is rendered up front: every call of `make_frame_array` or `make_frame_pil` evaluates the layers active at
+    that time and blends them over the background with a `FrameCompositor`. The clip can therefore be written with
+    `write_videofile` while it is composited, holding a single output frame at a time, and be used as a layer of
+    another composite.
+
+    The start and end of the layers are indexed by a `LayerIndex` when they are added, so a frame only touches the
+    layers active at its time however many layers there are. Moving a layer afterwards is not seen by the index.
+
+    Attributes:
+        clips (tuple[VideoClip, ...]): The layers, bottom first, without the background clip.
+        bg_clip (VideoClip | None): The clip used as background, if any.
+        bg_color (tuple[int, ...]): The RGBA color of the background when there is no background clip.
+        fps (int): The frames per second of the composite.
+        size (tuple[int, int]): The size of the composite.
+
+    Methods:
+        add_clip(clip): Adds a layer on top of the composite.
+        make_frame_array(t): Composites the frame at time t as a numpy array.
+        make_frame_pil(t): Composites the frame at time t as a PIL Image.
+        fl_frame_transform(func, *args, **kwargs): Applies a function to each composited frame.
+        fl_clip_transform(func, *args, **kwargs): Applies a function to each composited frame and its time.
+        sub_clip(t_start, t_end): Cuts the composite to [t_start, t_end).
+        sub_clip_copy(t_start, t_end): Returns a cut copy of the composite.
+
+    Example:
+        >>> background = ImageClip("background.png", duration=10, fps=24)
+        >>> logo = ImageClip("logo.png", duration=10).set_position(("right", "top"))
+        >>> CompositeVideoClip([background, logo], use_bg_clip=True).write_videofile("out.mp4")
+    """
+
+    def __init__(
+        self,
+        clips: Sequence[VideoClip],
+        fps: int | float | None = None,
+        bg_color: tuple[int, ...] = (0, 0, 0, 0),
+        use_bg_clip: bool = False,
+        audio: bool = True,
+        audio_fps=44100,
+    ) -> None:
+        """
+        Initializes an instance of the CompositeVideoClip class.
+
+        Args:
+            clips (Sequence[VideoClip]): The sequence of video clips to composite, bottom first.
+            fps (int | float | None, optional): The frames per second of the composite clip. If not specified, it is set to the maximum fps of the clips in the sequence.
+            bg_color (tuple[int, ...], optional): The background color of the composite clip as a tuple of integers representing RGBA values. Default is (0, 0, 0, 0) which is transparent.
+            use_bg_clip (bool, optional): Whether to use the first clip in the sequence as the background of the composite clip. Default is False.
+            audio (bool, optional): Whether to include audio in the composite clip. If True, the audio of the clips in the sequence is also composited. Default is True.
+            audio_fps (int, optional): The frames per second of the audio of the composite clip. Default is 44100.
+
+        Raises:
+            ValueError: If none of the clips have fps set and fps is not given.
+            ValueError: If the duration or size of the composite can not be derived from the clips.
+        """
+        super().__init__()
+        fps_val = fps or max(*(clip.fps if clip.fps else 0.0 for clip in clips), 0.0)
+        if not fps_val:
+            raise ValueError("fps is not set")
+        self.fps = int(fps_val)
+        self.bg_color = bg_color
+        self.bg_clip: VideoClip | None = None
+
+        if use_bg_clip:
+            self.bg_clip = clips[0]
+            clips = clips[1:]
+            duration = self.bg_clip.duration
+            if not duration:
+                duration = self.bg_clip.end
+            if not duration:
+                raise ValueError("duration is not set of bg_clip")
+            self.size = self.bg_clip.size
+        else:
+            size = [0, 0]
+            duration = 0.0
+            for clip in clips:
+                if clip.end:
+                    duration = max(clip.end, duration)
+                elif clip.duration:
+                    duration = max(clip.duration, duration)
+                else:
+                    ...
+                if clip.size:
+                    if size[0] < clip.size[0]:
+                        size[0] = clip.size[0]
+                    if size[1] < clip.size[1]:
+                        size[1] = clip.size[1]
+            if size == [0, 0]:
+                raise ValueError("size is not set of any clip")
+            if duration == 0.0:
+                raise ValueError("duration is not set of any clip")
+            self.size = (size[0], size[1])
+        self.clips: tuple[VideoClip, ...] = tuple(clips)
+        self._dur = duration
+        # Finds the layers active at a time without scanning every clip
+        self._layers = LayerIndex((clip.start, clip.end) for clip in self.clips)
+        self._compositor: FrameCompositor | None = None
+
+        if audio:
+            aud_ = []
+            for clip in self.clips:
+                if clip.audio is not None:
+                    aud_.append(clip.audio)
+                else:
+                    aud_.append(SilenceClip(duration=duration))
+            self.set_audio(
+                composite_audioclips(aud_, fps=audio_fps, use_bg_audio=use_bg_clip)
+            )
+
+    def add_clip(self, clip: VideoClip) -> "CompositeVideoClip":
+        """
+        Adds a layer on top of the composite.
+
+        The layer is added to the index of active layers, which is not rebuilt. Without a background clip, the size
+        and duration of the composite grow to fit the layer. Its audio, if any, is mixed into the audio of the
+        composite.
+
+        Args:
+            clip (VideoClip): The clip to add, placed by its start, end and position like the other layers.
+
+        Returns:
+            CompositeVideoClip: The current instance of the CompositeVideoClip class.
+
+        Example:
+            >>> composite = CompositeVideoClip([background], use_bg_clip=True)
+            >>> for caption in captions:
+            ...     composite.add_clip(caption)
+        """
+        self.clips += (clip,)
+        self._layers.add(clip.start, clip.end)
+        if self.bg_clip is None:
+            if clip.size:
+                self.size = (max(self.size[0], clip.size[0]), max(self.size[1], clip.size[1]))
+            end = clip.end or clip.duration
+            if end and end - self._offset > self._dur:
+                self._dur = end - self._offset
+        if self.audio is not None and clip.audio is not None:
+            audio = clip.audio.copy()
+            # The audio of the composite starts at its own time 0
+            audio.start = clip.start - self._offset
+            self.set_audio(
+                composite_audioclips(
+                    [self.audio, audio],
+                    fps=self.audio.fps,
+                    use_bg_audio=self.bg_clip is not None,
+                )
+            )
+        return self
+
+    def _source_node(self) -> Node:
+        """
+        Returns the node rendering the composite, with the graphs of its layers as inputs.
+        """
+        return CompositeNode(self)
+
+    def _render(self, t: int | float) -> np.ndarray:
+        """
+        Blends the layers active at layer time `t` over the background.
+        """
+        if self.bg_clip is not None:
+            background = np.asarray(self.bg_clip.make_frame_array(t))
+            size = background.shape[1::-1]
+            channels = 4 if background.ndim == 3 and background.shape[2] in (2, 4) else 3
+            dtype = background.dtype if background.dtype == np.uint16 else np.uint8
+        else:
+            background = self.bg_color
+            size, channels, dtype = self.size, 4, np.uint8
+        compositor = self._compositor
+        if compositor is None or (compositor.size, compositor.channels, compositor.dtype) != (
+            tuple(size),
+            channels,
+            np.dtype(dtype),
+        ):
+            compositor = self._compositor = FrameCompositor(size, channels, dtype)
+        compositor.start(background)
+        for layer in self._layers.active(t):
+            clip = self.clips[layer]
+            frame = np.asarray(clip.make_frame_array(t - clip.start))
+            compositor.paste(
+                frame,
+                _layer_position(
+                    clip, t - clip.start, compositor.size, frame.shape[1::-1]
+                ),
+            )
+        return compositor.result()
 
 
 def composite_videoclips(
@@ -12,6 +353,8 @@ def composite_videoclips(
     use_bg_clip: bool = False,
     audio: bool = True,
     audio_fps=44100,
+    memmap: bool = False,
+    lazy: bool = False,
 ):
     """
     Composites multiple video clips into a single video clip.
@@ -25,9 +368,11 @@ def composite_videoclips(
         use_bg_clip (bool, optional): Whether to use the first clip in the sequence as the background of the composite clip. Default is False.
         audio (bool, optional): Whether to include audio in the composite clip. If True, the audio of the clips in the sequence is also composited. Default is True.
         audio_fps (int, optional): The frames per second of the audio of the composite clip. Default is 44100.
+        memmap (bool, optional): Whether to write the composited frames to a memory-mapped file in `config.SCRATCH_DIR` as they are rendered, instead of keeping them in RAM. Default is False.
+        lazy (bool, optional): Whether to return a CompositeVideoClip which composites each frame when it is requested, instead of rendering every frame up front. Default is False.
 
     Returns:
-        ImageSequenceClip: The composite video clip as an instance of the ImageSequenceClip class.
+        ImageSequenceClip | CompositeVideoClip: The composite video clip as an instance of the ImageSequenceClip class, or of the CompositeVideoClip class if `lazy` is True.
 
     Raises:
         ValueError: If neither fps nor duration is set for any of the clips in the sequence.
@@ -40,115 +385,297 @@ def composite_videoclips(
         >>> composite_clip = composite_videoclips([clip1, clip2], fps=24)
 
     Note:
-        This function uses the ImageSequenceClip class to create the composite video clip and the composite_audioclips function to composite the audio of the clips.
+        This function renders the frames of a CompositeVideoClip into an ImageSequenceClip.
     """
-    fps_val = fps or max(*(clip.fps if clip.fps else 0.0 for clip in clips), 0.0)
-    if not fps_val:
-        raise ValueError("fps is not set")
-    fps = int(fps_val)
-
-    if use_bg_clip:
-        bg_clip = clips[0]
-        clips = clips[1:]
-        duration = bg_clip.duration
-        if not duration:
-            duration = bg_clip.end
-        if not duration:
-            raise ValueError("duration is not set of bg_clip")
-        bg_make_frame = bg_clip.make_frame_pil
+    composite = CompositeVideoClip(
+        clips,
+        fps=fps,
+        bg_color=bg_color,
+        use_bg_clip=use_bg_clip,
+        audio=audio,
+        audio_fps=audio_fps,
+    )
+    if lazy:
+        return composite
+
+    def render_frames():
+        t = 0.0
+        while t < composite.duration:
+            yield composite.make_frame_array(t)
+            t += 1 / composite.fps
+
+    if memmap:
+        f_frames = write_frame_store(render_frames())
     else:
-        size = [0, 0]
-        duration = 0.0
+        f_frames = tuple(render_frames())
+
+    return ImageSequenceClip(
+        f_frames, fps=composite.fps, duration=composite.duration, audio=composite.audio
+    )
+
+
+class ConcatenateVideoClip(_LazyVideoClip):
+    """
+    A class used to represent video clips played one after the other, rendered frame by frame.
+
+    Only the time line is computed up front: the start of every clip is kept as a prefix sum of the durations, so
+    the clip playing at a time and its local time are found with a binary search, and its frame is rendered and
+    scaled to the size of the concatenation when it is requested. The clip can therefore be written with
+    `write_videofile` while it is rendered, holding a single output frame at a time.
+
+    When all clips are file clips, or cuts of them, showing their frames unchanged and the files share one video
+    stream format, `write_videofile` joins the streams with the ffmpeg concat demuxer and copies them instead.
+
+    Attributes:
+        clips (tuple[VideoClip, ...]): The clips, in playing order.
+        starts (list[float]): The time at which each clip starts.
+        durations (list[int | float]): The duration of each clip.
+        scaling_strategy (str): How frames are fitted to the size, 'scale_same', 'scale_up' or 'scale_down'.
+        transparent (bool): Whether the frames are RGBA rather than RGB.
+        fps (int | float): The frames per second of the concatenation.
+        size (tuple[int, int]): The size of the concatenation, the largest width and height of the clips.
+
+    Methods:
+        clip_at(t): Returns the index of the clip playing at time t and its local time.
+
+    Example:
+        >>> clips = [VideoFileClip(f"part{i}.mp4") for i in range(20)]
+        >>> ConcatenateVideoClip(clips).write_videofile("full.mp4")
+    """
+
+    def __init__(
+        self,
+        clips: Sequence[VideoClip],
+        transparent: bool = False,
+        fps: int | float | None = None,
+        scaling_strategy: str = "scale_same",
+        audio: bool = True,
+        audio_fps: int | None = None,
+    ) -> None:
+        """
+        Initializes an instance of the ConcatenateVideoClip class.
+
+        Args:
+            clips (Sequence[VideoClip]): The sequence of video clips to concatenate.
+            transparent (bool, optional): Whether to use a transparent background for the concatenated clip. Default is False.
+            fps (int | float | None, optional): The frames per second of the concatenated clip. If not specified, it is set to the maximum fps of the clips in the sequence.
+            scaling_strategy (str, optional): 'scale_same' centers the frames without scaling them, 'scale_up' pads them to the size and 'scale_down' crops them to it. Default is 'scale_same'.
+            audio (bool, optional): Whether to include audio in the concatenated clip. If True, the audio of the clips is concatenated lazily as well. Default is True.
+            audio_fps (int | None, optional): The frames per second of the audio of the concatenated clip. Default is None.
+
+        Raises:
+            TypeError: If the scaling strategy is not one of the above.
+            ValueError: If fps is 0, or if the duration or size of a clip is not set.
+        """
+        super().__init__()
+        if scaling_strategy not in ("scale_same", "scale_up", "scale_down"):
+            raise TypeError(
+                f"scaling_strategy must be 'scale_same', 'scale_up' or 'scale_down', not '{scaling_strategy}'"
+            )
+        fps = (
+            fps if fps is not None else max(clip.fps if clip.fps else 0.0 for clip in clips)
+        )
+        if fps == 0:
+            raise ValueError("fps is 0")
+        durations: list[int | float] = []
         for clip in clips:
-            if clip.end:
-                duration = max(clip.end, duration)
+            frames = (
+                clip._unchanged_frames() if isinstance(clip, VideoFileClip) else None
+            )
+            if frames is not None:
+                # A cut of a file plays its frames, its end may still be that of the cut in the file
+                durations.append((frames[1] - frames[0]) / clip.fps)
+            elif clip.end:
+                durations.append(clip.end)
             elif clip.duration:
-                duration = max(clip.duration, duration)
+                durations.append(clip.duration)
             else:
-                ...
-            if clip.size:
-                if size[0] < clip.size[0]:
-                    size[0] = clip.size[0]
-                if size[1] < clip.size[1]:
-                    size[1] = clip.size[1]
-        if size == [0, 0]:
-            raise ValueError("size is not set of any clip")
-        if duration == 0.0:
-            raise ValueError("duration is not set of any clip")
-        bg = Image.new("RGBA", tuple(size), bg_color)
-
-        def bg_make_frame(t):
-            return bg.copy()
-
-    t = 0.0
-    frames = []
-    while t < duration:
-        f = bg_make_frame(t)
+                raise ValueError(f"Clip duration and end is not set __str__={clip.__str__()}")
         for clip in clips:
-            if clip.start <= t < (clip.end or float("inf")):
-                pos_x = 0
-                pos_y = 0
-                frame = clip.make_frame_pil(t - clip.start)
-                pos_: tuple[int | str | float, int | str | float] = clip.pos(t - clip.start)
-                if isinstance(pos_[0], str):
-                    if pos_[0] == "center":
-                        pos_x = f.size[0] // 2 - frame.size[0] // 2
-                    elif pos_[0] == "left":
-                        pos_x = 0
-                    elif pos_[0] == "right":
-                        pos_x = f.size[0] - frame.size[0]
-                    else:
-                        raise ValueError(f"pos[0] must be 'center', 'left' or 'right'")
-                elif isinstance(pos_[0], (int, float)):
-                    if clip.relative_pos:
-                        pos_x = int(pos_[0] * f.size[0])
-                    else:
-                        pos_x = int(pos_[0])
-                else:
-                    raise TypeError(
-                        f"pos must output tuple of str or float or int, not {type(pos_[0])}"
-                    )
-
-                if isinstance(pos_[1], str):
-                    if pos_[1] == "center":
-                        pos_y = f.size[1] // 2 - frame.size[1] // 2
-                    elif pos_[1] == "top":
-                        pos_y = 0
-                    elif pos_[1] == "bottom":
-                        pos_y = f.size[1] - frame.size[1]
-                    else:
-                        raise ValueError(f"pos[1] must be 'center', 'top' or 'bottom'")
-                elif isinstance(pos_[1], int) or isinstance(pos_[1], float):
-                    if clip.relative_pos:
-                        pos_y = int(pos_[1] * f.size[1])
-                    else:
-                        pos_y = int(pos_[1])
+            if not clip.size or not clip.size[0] or not clip.size[1]:
+                raise ValueError(f"Clip Size is not set, clip.__str__ = {clip.__str__()}")
+
+        self.clips: tuple[VideoClip, ...] = tuple(clips)
+        self.starts: list[float] = [0.0, *accumulate(durations)][:-1]
+        self.durations = durations
+        self.scaling_strategy = scaling_strategy
+        self.transparent = transparent
+        self.fps = fps
+        self.size = (
+            max(clip.size[0] for clip in clips),
+            max(clip.size[1] for clip in clips),
+        )
+        self._dur = sum(durations)
+
+        if audio:
+            audios = []
+            for clip, duration in zip(self.clips, durations):
+                if clip.audio is not None:
+                    audios.append(clip.audio)
                 else:
-                    raise TypeError(
-                        f"pos must output tuple of str or float or int, not {type(pos_[1])}"
-                    )
-                f.paste(
-                    frame,
-                    (pos_x, pos_y),
-                    frame if frame.has_transparency_data else None,
+                    audios.append(SilenceClip(duration=duration))
+            self.set_audio(
+                concatenate_audioclips(
+                    audios, fps=audio_fps, lazy=True, durations=durations
                 )
-        frames.append(f)
-        t += 1 / fps
-    f_frames = tuple(frames)
-    del frames
-
-    if audio:
-        aud_ = []
-        for clip in clips:
-            if clip.audio is not None:
-                aud_.append(clip.audio)
-            else:
-                aud_.append(SilenceClip(duration=duration))
-        aud = composite_audioclips(aud_, fps=audio_fps, use_bg_audio=use_bg_clip)
-    else:
-        aud = None
+            )
 
-    return ImageSequenceClip(f_frames, fps=fps, duration=duration, audio=aud)
+    def clip_at(self, t: int | float) -> tuple[int, float]:
+        """
+        Returns the clip playing at time `t` of the concatenation.
+
+        Args:
+            t (int | float): The time in seconds.
+
+        Returns:
+            tuple[int, float]: The index of the clip, and the time in that clip. Times before the start or after the
+                end fall in the first or last clip.
+
+        Example:
+            >>> ConcatenateVideoClip([clip_of_2s, clip_of_3s]).clip_at(2.5)
+            (1, 0.5)
+        """
+        index = min(max(bisect.bisect_right(self.starts, t) - 1, 0), len(self.clips) - 1)
+        return index, t - self.starts[index]
+
+    def _fit(self, frame: Image.Image) -> Image.Image:
+        """
+        Fits a frame to the size of the concatenation with the scaling strategy.
+        """
+        mode = "RGBA" if self.transparent else "RGB"
+        if self.scaling_strategy == "scale_up":
+            return ImageOps.pad(frame, self.size, color=(0, 0, 0, 0)).convert(mode)
+        if self.scaling_strategy == "scale_down":
+            return ImageOps.fit(frame, self.size).convert(mode)
+        new_frame = Image.new(mode, self.size)
+        new_frame.paste(
+            frame,
+            (
+                self.size[0] // 2 - frame.size[0] // 2,
+                self.size[1] // 2 - frame.size[1] // 2,
+            ),
+        )
+        return new_frame
+
+    def _clip_frame(self, index: int, t: int | float) -> np.ndarray:
+        """
+        Returns the frame of clip `index` at its local time `t`, fitted to the size.
+        """
+        return np.asarray(self._fit(self.clips[index].make_frame_pil(t)))
+
+    def _source_node(self) -> Node:
+        """
+        Returns the node rendering the concatenation, with the graphs of its clips as inputs.
+        """
+        return ConcatNode(self)
+
+    def _render(self, t: int | float) -> np.ndarray:
+        """
+        Renders the frame of the clip playing at time `t`.
+        """
+        return self._clip_frame(*self.clip_at(t))
+
+    def _stream_copy_parts(self) -> list[tuple[VideoFileClip, bool]] | None:
+        """
+        Returns the clips to join without re-encoding, each with whether it is a whole file, if they can be.
+
+        That is when every clip is a file clip showing the frames of its file unchanged, at the fps and size of the
+        concatenation, and all files have the same video stream format, see `stream_copy_format`.
+
+        Returns:
+            list[tuple[VideoFileClip, bool]] | None: The clips and whether each shows its whole file, or None if the
+                concatenation must be rendered.
+        """
+        if (
+            self._offset
+            or self.transparent
+            or "make_frame_array" in self.__dict__
+            or "make_frame_pil" in self.__dict__
+        ):
+            return None
+        parts = []
+        formats = set()
+        for clip in self.clips:
+            if (
+                not isinstance(clip, VideoFileClip)
+                or clip.fps != self.fps
+                or tuple(clip.size) != tuple(self.size)
+            ):
+                return None
+            frames = clip._unchanged_frames()
+            if frames is None:
+                return None
+            try:
+                formats.add(stream_copy_format(str(clip.filename)))
+            except Exception:
+                return None
+            parts.append((clip, frames == (0, clip._source_frames)))
+        return parts if len(formats) == 1 else None
+
+    def _write_stream_copy(
+        self,
+        filename: str,
+        audio_options: dict | None,
+        smart_cut: bool = False,
+        overwrite: bool = True,
+        show_log: bool = False,
+    ) -> bool:
+        """
+        Writes the concatenation by joining the video streams of the files of its clips, without decoding them.
+
+        Whole files are passed to the concat demuxer as they are; cuts are first copied to scratch files with
+        `VideoFileClip._write_stream_copy`, so a cut which cannot be copied whole needs `smart_cut`. The audio is
+        rendered and piped to ffmpeg.
+
+        Args:
+            filename (str): The name of the file to write.
+            audio_options (dict | None): The ffmpegio style audio output options, None to write no audio.
+            smart_cut (bool, optional): Whether to re-encode the frames of a cut which cannot be copied. Defaults to False.
+            overwrite (bool, optional): Whether to overwrite an existing output file. Defaults to True.
+            show_log (bool, optional): Whether to show the log of ffmpeg. Defaults to False.
+
+        Returns:
+            bool: True if the file was written, False if the concatenation must be rendered and encoded.
+        """
+        parts = self._stream_copy_parts()
+        if parts is None:
+            return False
+        audio_kwargs: dict = {}
+        if audio_options is not None and self.audio:
+            self._sync_audio_video_s_e_d()
+            audio_rate = audio_options.get("ar") or self.audio.fps
+            audio_kwargs = {
+                "audio": self.audio._iter_output_blocks(audio_rate),
+                "audio_fps": audio_rate,
+            }
+        os.makedirs(config.SCRATCH_DIR, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix="concat-", dir=config.SCRATCH_DIR)
+        try:
+            extension = os.path.splitext(filename)[1] or ".mp4"
+            filenames = []
+            for i, (clip, whole) in enumerate(parts):
+                if whole:
+                    filenames.append(str(clip.filename))
+                    continue
+                part_file = os.path.join(directory, f"part-{i}{extension}")
+                if not clip._write_stream_copy(
+                    part_file, None, smart_cut, True, show_log
+                ):
+                    return False
+                filenames.append(part_file)
+            concat_video_files(
+                filenames,
+                filename,
+                audio_options if audio_kwargs else None,
+                overwrite,
+                show_log,
+                **audio_kwargs,
+            )
+        except (IOError, ValueError):
+            return False
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return True
 
 
 def concatenate_videoclips(
@@ -161,6 +688,7 @@ def concatenate_videoclips(
     ) = None,
     audio: bool = True,
     audio_fps: int | None = None,
+    lazy: bool = False,
 ):
     """
     Concatenates multiple video clips into a single video clip.
@@ -175,9 +703,10 @@ def concatenate_videoclips(
         transition (VideoClip | Callable[[Image.Image, Image.Image, int | float], VideoClip] | None, optional): The transition to use between the clips in the concatenated clip. If a VideoClip, it is used as the transition. If a callable, it is called with the last frame of the previous clip, the first frame of the next clip, and the duration of the transition to generate the transition. If None, no transition is used. Default is None.
         audio (bool, optional): Whether to include audio in the concatenated clip. If True, the audio of the clips in the sequence is also concatenated. Default is True.
         audio_fps (int | None, optional): The frames per second of the audio of the concatenated clip. Default is None.
+        lazy (bool, optional): Whether to return a ConcatenateVideoClip which renders each frame when it is requested, instead of rendering every frame up front. Its `write_videofile` joins unchanged file clips whose video streams have the same format with the concat demuxer, without re-encoding them. Default is False.
 
     Returns:
-        ImageSequenceClip: The concatenated video clip as an instance of the ImageSequenceClip class.
+        ImageSequenceClip | ConcatenateVideoClip: The concatenated video clip as an instance of the ImageSequenceClip class, or of the ConcatenateVideoClip class if `lazy` is True.
 
     Raises:
         ValueError: If neither fps nor duration is set for any of the clips in the sequence.
@@ -190,172 +719,49 @@ def concatenate_videoclips(
         >>> concatenated_clip = concatenate_videoclips([clip1, clip2], fps=24)
 
     Note:
-        This function uses the ImageSequenceClip class to create the concatenated video clip and the concatenate_audioclips function to concatenate the audio of the clips.
+        This function renders the frames of a ConcatenateVideoClip into an ImageSequenceClip.
     """
     # TODO: Add transition support
     if transition is not None:
         raise NotImplementedError("transition is not supported yet")
 
-    fps = (
-        fps if fps is not None else max(clip.fps if clip.fps else 0.0 for clip in clips)
+    concatenation = ConcatenateVideoClip(
+        clips,
+        transparent=transparent,
+        fps=fps,
+        scaling_strategy=scaling_strategy,
+        audio=audio,
+        audio_fps=audio_fps,
     )
-    duration_per_clip: list[int | float] = []
-    for clip in clips:
-        if clip.end:
-            duration_per_clip.append(clip.end)
-        elif clip.duration:
-            duration_per_clip.append(clip.duration)
-        else:
-            raise ValueError(f"Clip duration and end is not set __str__={clip.__str__()}")
-    if fps == 0:
-        raise ValueError("fps is 0")
-    td = 1 / fps
-    duration: int | float = sum(duration_per_clip)
-
-    if scaling_strategy == "scale_same":
-
-        def increase_scale(
-            frame: Image.Image, new_size: tuple[int, int]
-        ) -> Image.Image:
-            new_frame = Image.new("RGBA" if transparent else "RGB", new_size)
-            new_frame.paste(
-                frame,
-                (
-                    new_size[0] // 2 - frame.size[0] // 2,
-                    new_size[1] // 2 - frame.size[1] // 2,
-                ),
-            )
-            return new_frame
-
-        sizes = []
-        for clip in clips:
-            if not clip.size or not clip.size[0] or not clip.size[1]:
-                raise ValueError(f"Clip Size is not set, clip.__str__ = {clip.__str__()}")
-            sizes.append(clip.size)
-        size: tuple[int, int] = (max(s[0] for s in sizes), max(s[1] for s in sizes))
-
-        frames = []
-        for i, clip in enumerate(clips):
-            current_clip_current_time = 0.0
-            while current_clip_current_time < duration_per_clip[i]:
-                current_clip_current_frame = clip.make_frame_pil(
-                    current_clip_current_time
-                )
-                current_clip_current_frame = increase_scale(
-                    current_clip_current_frame, size
-                )
-                frames.append(current_clip_current_frame)
-                current_clip_current_time += td
-        f_frames = tuple(frames)
-        del frames
-
-        if audio:
-            audios = []
-            for i, clip in enumerate(clips):
-                if clip.audio is not None:
-                    audios.append(clip.audio)
-                else:
-                    audios.append(SilenceClip(duration=duration_per_clip[i]))
-            return ImageSequenceClip(
-                f_frames,
-                fps=fps,
-                duration=duration,
-                audio=concatenate_audioclips(audios, fps=audio_fps),
-            )
-        else:
-            return ImageSequenceClip(f_frames, fps=fps, duration=duration)
-
-    elif scaling_strategy == "scale_up":
-
-        def increase_scale(
-            frame: Image.Image, new_size: tuple[int, int]
-        ) -> Image.Image:
-            return ImageOps.pad(frame, new_size, color=(0, 0, 0, 0)).convert(
-                "RGBA" if transparent else "RGB"
-            )
+    if lazy:
+        return concatenation
 
-        sizes = []
-        for clip in clips:
-            if not clip.size or not clip.size[0] or not clip.size[1]:
-                raise ValueError(f"Clip Size is not set, clip.__str__ = {clip.__str__()}")
-            sizes.append(clip.size)
-        size: tuple[int, int] = (max(s[0] for s in sizes), max(s[1] for s in sizes))
-        frames = []
-        for i, clip in enumerate(clips):
-            current_clip_current_time = 0.0
-            while current_clip_current_time < duration_per_clip[i]:
-                current_clip_current_frame = clip.make_frame_pil(
-                    current_clip_current_time
-                )
-                current_clip_current_frame = increase_scale(
-                    current_clip_current_frame, size
-                )
-                frames.append(current_clip_current_frame)
-                current_clip_current_time += td
-        f_frames = tuple(frames)
-        del frames
-
-        if audio:
-            audios = []
-            for i, clip in enumerate(clips):
-                if clip.audio is not None:
-                    audios.append(clip.audio)
-                else:
-                    audios.append(SilenceClip(duration=duration_per_clip[i]))
-            return ImageSequenceClip(
-                f_frames,
-                fps=fps,
-                duration=duration,
-                audio=concatenate_audioclips(audios, fps=audio_fps),
-            )
-        else:
-            return ImageSequenceClip(f_frames, fps=fps, duration=duration)
-    elif scaling_strategy == "scale_down":
-
-        def increase_scale(
-            frame: Image.Image, new_size: tuple[int, int]
-        ) -> Image.Image:
-            return ImageOps.fit(frame, new_size).convert(
-                "RGBA" if transparent else "RGB"
-            )
-
-        sizes = []
-        for clip in clips:
-            if not clip.size or not clip.size[0] or not clip.size[1]:
-                raise ValueError(f"Clip Size is not set, clip.__str__ = {clip.__str__()}")
-            sizes.append(clip.size)
-        size: tuple[int, int] = (max(s[0] for s in sizes), max(s[1] for s in sizes))
-        frames = []
-        for i, clip in enumerate(clips):
-            current_clip_current_time = 0.0
-            while current_clip_current_time < duration_per_clip[i]:
-                current_clip_current_frame = clip.make_frame_pil(
-                    current_clip_current_time
-                )
-                current_clip_current_frame = increase_scale(
-                    current_clip_current_frame, size
-                )
-                frames.append(current_clip_current_frame)
-                current_clip_current_time += td
-        f_frames = tuple(frames)
-        del frames
+    td = 1 / concatenation.fps
+    frames = []
+    for i, clip_duration in enumerate(concatenation.durations):
+        current_clip_current_time = 0.0
+        while current_clip_current_time < clip_duration:
+            frames.append(concatenation._clip_frame(i, current_clip_current_time))
+            current_clip_current_time += td
+    f_frames = tuple(frames)
+    del frames
 
-        if audio:
-            audios = []
-            for i, clip in enumerate(clips):
-                if clip.audio is not None:
-                    audios.append(clip.audio)
-                else:
-                    audios.append(SilenceClip(duration=duration_per_clip[i]))
-            return ImageSequenceClip(
-                f_frames,
-                fps=fps,
-                duration=duration,
-                audio=concatenate_audioclips(audios, fps=audio_fps),
-            )
-        else:
-            return ImageSequenceClip(f_frames, fps=fps, duration=duration)
+    if audio:
+        audios = []
+        for clip, clip_duration in zip(concatenation.clips, concatenation.durations):
+            if clip.audio is not None:
+                audios.append(clip.audio)
+            else:
+                audios.append(SilenceClip(duration=clip_duration))
+        return ImageSequenceClip(
+            f_frames,
+            fps=concatenation.fps,
+            duration=concatenation.duration,
+            audio=concatenate_audioclips(
+                audios, fps=audio_fps, durations=concatenation.durations
+            ),
+        )
     else:
-        raise TypeError(
-            f"scaling_strategy must be 'scale_same', 'scale_up' or 'scale_down', not '{scaling_strategy}'"
+        return ImageSequenceClip(
+            f_frames, fps=concatenation.fps, duration=concatenation.duration
         )